@@ -0,0 +1,187 @@
+"""
+Cache backend and cross-worker invalidation.
+
+The backend (CACHE_BACKEND) is one of:
+
+- memory (default): in-process only, for a single worker
+- file: a SQLite file at CACHE_PATH shared by the workers of one host
+- redis: a Redis-compatible server at CACHE_REDIS_URL, shared by every host
+
+Modules with an in-process cache register a handler per invalidation kind
+(@on_invalidation) and call publish_invalidation() where they used to drop entries
+directly: the handler runs in the calling worker right away and, with a shared
+backend, in every other worker once the event reaches it (start_invalidation_listener,
+started by the app). Expensive results can also be stored in the backend itself
+(shared_get / shared_set, no-ops without a shared backend) so one worker's computation
+serves the others. Backend errors are logged, never raised to the request.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from ..metrics import cache_invalidation_delay, cache_invalidations_total
+from .base import CacheBackend
+from .file import FileCacheBackend
+from .memory import MemoryCacheBackend
+from .redis import RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "securebi-cache.db"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_POLL_INTERVAL = float(os.getenv("CACHE_POLL_INTERVAL", "0.1"))
+
+# Identifies this process's own events, which it has already applied
+_origin = uuid.uuid4().hex
+_handlers: Dict[str, Callable[..., None]] = {}
+_backend: Optional[CacheBackend] = None
+_listening = False
+_lock = threading.Lock()
+
+
+def create_backend(name: str = CACHE_BACKEND) -> CacheBackend:
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "file":
+        return FileCacheBackend(CACHE_PATH, poll_interval=CACHE_POLL_INTERVAL)
+    if name == "redis":
+        return RedisCacheBackend(CACHE_REDIS_URL)
+    raise ValueError(f"CACHE_BACKEND must be 'memory', 'file' or 'redis', got '{name}'")
+
+
+def get_cache() -> CacheBackend:
+    """Process-wide backend, created from the CACHE_* settings on first use"""
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = create_backend()
+            logger.info("Cache backend configured", extra={"backend": _backend.name, "shared": _backend.shared})
+        return _backend
+
+
+def configure_cache(backend: CacheBackend) -> CacheBackend:
+    """Replace the process-wide backend (e.g. with a fakeredis-backed RedisCacheBackend)"""
+    global _backend, _listening
+    with _lock:
+        previous, _backend = _backend, backend
+        listening, _listening = _listening, False
+    if previous is not None:
+        previous.close()
+    if listening:
+        start_invalidation_listener()
+    return backend
+
+
+def shared_get(key: str) -> Optional[str]:
+    """Value from a shared backend; None when missing, unshared or unreachable"""
+    backend = get_cache()
+    if not backend.shared:
+        return None
+    try:
+        return backend.get(key)
+    except Exception as e:
+        logger.warning("Shared cache read failed", extra={"key": key, "error": str(e)})
+        return None
+
+
+def shared_set(key: str, value: str, ttl: Optional[float] = None):
+    """Store in a shared backend (no-op when unshared; failures are logged)"""
+    backend = get_cache()
+    if not backend.shared:
+        return
+    try:
+        backend.set(key, value, ttl)
+    except Exception as e:
+        logger.warning("Shared cache write failed", extra={"key": key, "error": str(e)})
+
+
+def shared_delete(*keys: str):
+    backend = get_cache()
+    if not backend.shared:
+        return
+    try:
+        backend.delete(*keys)
+    except Exception as e:
+        logger.warning("Shared cache delete failed", extra={"keys": list(keys), "error": str(e)})
+
+
+def on_invalidation(kind: str):
+    """Register the function that drops this worker's entries for events of `kind`"""
+    def register(handler: Callable[..., None]):
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+def publish_invalidation(kind: str, **fields):
+    """Apply an invalidation here and broadcast it to the other workers; fields must be JSON-serializable"""
+    _handlers[kind](**fields)
+    cache_invalidations_total.inc(kind=kind, origin="local")
+    backend = get_cache()
+    if not backend.shared:
+        return
+    payload = json.dumps({"origin": _origin, "kind": kind, "fields": fields, "published_at": time.time()})
+    try:
+        backend.publish(payload)
+    except Exception as e:
+        # The other workers catch up when their entries expire
+        logger.warning("Could not broadcast cache invalidation", extra={"kind": kind, "error": str(e)})
+
+
+def _deliver(payload: str):
+    try:
+        event = json.loads(payload)
+        if event["origin"] == _origin:
+            return
+        handler = _handlers.get(event["kind"])
+        if handler is None:
+            return
+        handler(**event["fields"])
+    except Exception as e:
+        logger.warning("Could not apply cache invalidation event", extra={"error": str(e)})
+        return
+    cache_invalidations_total.inc(kind=event["kind"], origin="remote")
+    cache_invalidation_delay.observe(max(time.time() - event["published_at"], 0.0))
+
+
+def start_invalidation_listener():
+    """Apply invalidations published by other workers (no-op for an unshared backend)"""
+    global _listening
+    backend = get_cache()
+    with _lock:
+        if _listening or not backend.shared:
+            return
+        _listening = True
+    backend.subscribe(_deliver)
+
+
+def close_cache():
+    global _backend, _listening
+    with _lock:
+        backend, _backend, _listening = _backend, None, False
+    if backend is not None:
+        backend.close()
+
+
+__all__ = [
+    "CacheBackend",
+    "FileCacheBackend",
+    "MemoryCacheBackend",
+    "RedisCacheBackend",
+    "close_cache",
+    "configure_cache",
+    "create_backend",
+    "get_cache",
+    "on_invalidation",
+    "publish_invalidation",
+    "shared_delete",
+    "shared_get",
+    "shared_set",
+    "start_invalidation_listener",
+]
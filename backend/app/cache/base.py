@@ -0,0 +1,40 @@
+"""
+Backend interface shared by every cache implementation.
+"""
+from typing import Callable, Optional
+
+# Receives the payload of every invalidation event published through the backend
+EventCallback = Callable[[str], None]
+
+
+class CacheBackend:
+    """
+    String values with an optional TTL, plus a broadcast channel for invalidation events.
+
+    Callers serialize values themselves (JSON). `subscribe` delivers every event
+    published after the call, by any process using the same backend, on a background
+    thread; events published while a subscriber is disconnected may be lost, so cached
+    entries should still carry a TTL.
+    """
+
+    name = ""
+    # Entries and events are visible to other worker processes
+    shared = False
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def publish(self, payload: str) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, callback: EventCallback) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Stop subscribers and release connections"""
@@ -0,0 +1,127 @@
+"""
+Shared backend on a local SQLite file, for several workers on one host (uvicorn
+--workers N, or containers sharing a volume) without running a server.
+
+Entries live in ``cache_entries`` with a wall-clock expiry. Events are appended to
+``cache_events`` and picked up by each subscribing process, which polls for new rows
+every `poll_interval` seconds; events older than `event_retention` seconds are pruned.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from .base import CacheBackend, EventCallback
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)",
+    "CREATE TABLE IF NOT EXISTS cache_events "
+    "(id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, created_at REAL NOT NULL)",
+)
+# Expired entries and old events are swept every this many writes
+_SWEEP_EVERY = 500
+
+
+class FileCacheBackend(CacheBackend):
+    name = "file"
+    shared = True
+
+    def __init__(self, path: str, poll_interval: float = 0.1, event_retention: float = 60.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.event_retention = event_retention
+        self._local = threading.local()
+        self._writes = 0
+        self._subscribers: List[EventCallback] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+        self._wrote()
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._conn().executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+
+    def publish(self, payload: str) -> None:
+        self._conn().execute(
+            "INSERT INTO cache_events (payload, created_at) VALUES (?, ?)", (payload, time.time())
+        )
+        self._wrote()
+
+    def _wrote(self):
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % _SWEEP_EVERY == 0
+        if sweep:
+            now = time.time()
+            conn = self._conn()
+            conn.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            conn.execute("DELETE FROM cache_events WHERE created_at < ?", (now - self.event_retention,))
+
+    def subscribe(self, callback: EventCallback) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._poller is None:
+                last_id = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM cache_events").fetchone()[0]
+                self._poller = threading.Thread(
+                    target=self._poll, args=(last_id,), name="cache-events", daemon=True
+                )
+                self._poller.start()
+
+    def _poll(self, last_id: int):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                rows = self._conn().execute(
+                    "SELECT id, payload FROM cache_events WHERE id > ? ORDER BY id", (last_id,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning("Polling cache events failed", extra={"path": self.path, "error": str(e)})
+                continue
+            if not rows:
+                continue
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for event_id, payload in rows:
+                last_id = event_id
+                for callback in subscribers:
+                    callback(payload)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join(timeout=self.poll_interval * 5)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,62 @@
+"""
+In-process backend: the default, for a single worker. Nothing is shared; events only
+reach subscribers in the same process.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .base import CacheBackend, EventCallback
+
+
+class MemoryCacheBackend(CacheBackend):
+    name = "memory"
+    shared = False
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        # key -> (expires_at or None, value)
+        self._entries: Dict[str, Tuple[Optional[float], str]] = {}
+        self._subscribers: List[EventCallback] = []
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                for stale in [k for k, (expires_at, _) in self._entries.items()
+                              if expires_at is not None and expires_at <= now]:
+                    del self._entries[stale]
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + ttl if ttl is not None else None, value)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def publish(self, payload: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(payload)
+
+    def subscribe(self, callback: EventCallback) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def close(self) -> None:
+        with self._lock:
+            self._subscribers.clear()
+            self._entries.clear()
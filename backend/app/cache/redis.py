@@ -0,0 +1,98 @@
+"""
+Shared backend on Redis (or anything speaking its protocol: Valkey, KeyDB, Memorystore),
+for workers spread over several hosts.
+
+Entries are plain keys under `prefix` with a PX expiry; events go out with PUBLISH on
+`channel` and are read by one subscriber thread per process, which reconnects after
+connection errors (events published meanwhile are lost; entry TTLs bound the staleness).
+Pass `client` to use an existing client, e.g. fakeredis.FakeRedis() as a local stand-in.
+"""
+import logging
+import threading
+from typing import List, Optional
+
+from .base import CacheBackend, EventCallback
+
+logger = logging.getLogger(__name__)
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+class RedisCacheBackend(CacheBackend):
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "securebi:cache:",
+                 channel: str = "securebi:cache-events"):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ValueError("redis library not installed. Install with: pip install redis")
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self.channel = channel
+        self._subscribers: List[EventCallback] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+
+    def get(self, key: str) -> Optional[str]:
+        return _text(self.client.get(self.prefix + key))
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl is not None else None)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def publish(self, payload: str) -> None:
+        self.client.publish(self.channel, payload)
+
+    def subscribe(self, callback: EventCallback) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._listener is None:
+                # Subscribe before returning so no event published after this call is missed
+                pubsub = self._open_pubsub()
+                self._listener = threading.Thread(target=self._listen, args=(pubsub,), name="cache-events",
+                                                  daemon=True)
+                self._listener.start()
+
+    def _open_pubsub(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _listen(self, pubsub):
+        while not self._stop.is_set():
+            try:
+                if pubsub is None:
+                    pubsub = self._open_pubsub()
+                message = pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                logger.warning("Cache event subscription failed; reconnecting", extra={"error": str(e)})
+                pubsub = None
+                self._stop.wait(1.0)
+                continue
+            if message is None or message.get("type") != "message":
+                continue
+            payload = _text(message["data"])
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for callback in subscribers:
+                callback(payload)
+        if pubsub is not None:
+            pubsub.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2.0)
+        self.client.close()
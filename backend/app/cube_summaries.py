@@ -0,0 +1,190 @@
+"""
+Compact, cached aggregates of a data cube, used to ground dashboard AI chat.
+
+A summary holds the cube's row count, the total of every measure and the top
+CUBE_SUMMARY_TOP_N values of every dimension (ranked by the first measure, or by row
+count when the cube has no measures). It is computed with a single warehouse query
+and cached per cube version (definition hash + updated_at) and row filter, for
+CUBE_SUMMARY_TTL seconds (default 3600). Users with row-level security policies get
+summaries computed with their filter applied, never someone else's. With a shared
+cache backend summaries are also stored there, so each is computed once for all
+workers.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .cache import on_invalidation, publish_invalidation, shared_get, shared_set
+from .models import DataCube, DataSource
+from .row_security import CompiledRowFilter, get_row_filter
+from .warehouse import get_connector
+
+logger = logging.getLogger(__name__)
+
+CUBE_SUMMARY_TTL_SECONDS = float(os.getenv("CUBE_SUMMARY_TTL", "3600"))
+CUBE_SUMMARY_TOP_N = int(os.getenv("CUBE_SUMMARY_TOP_N", "10"))
+CUBE_SUMMARY_MAX_ENTRIES = int(os.getenv("CUBE_SUMMARY_MAX_ENTRIES", "1000"))
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# (cube_id, cube version, row filter key) -> (expires_at, summary)
+_summaries: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def cube_version(cube: DataCube) -> str:
+    """Changes whenever the cube definition does"""
+    definition = json.dumps(
+        [cube.query, cube.dimensions_json or [], cube.measures_json or []],
+        sort_keys=True,
+        default=str,
+    )
+    updated = cube.updated_at.isoformat() if cube.updated_at else "-"
+    return f"{updated}:{hashlib.sha256(definition.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _row_filter_key(row_filter: Optional[CompiledRowFilter]) -> str:
+    if row_filter is None:
+        return ""
+    return json.dumps([row_filter.predicate, row_filter.parameters], default=str)
+
+
+def summary_columns(cube: DataCube) -> Tuple[List[str], List[str]]:
+    """Dimensions and measures usable as plain column names of the cube query"""
+    dimensions = [d for d in (cube.dimensions_json or []) if isinstance(d, str) and _IDENTIFIER.match(d)]
+    measures = [m for m in (cube.measures_json or []) if isinstance(m, str) and _IDENTIFIER.match(m)]
+    return dimensions, measures
+
+
+def summary_sql(cube_sql: str, dimensions: List[str], measures: List[str], top_n: int) -> str:
+    """One BigQuery statement returning the totals row plus the top-N rows of each dimension"""
+    inner_sql = cube_sql.strip()
+    if inner_sql.endswith(";"):
+        inner_sql = inner_sql[:-1]
+    aggregates = "".join(f", SUM(SAFE_CAST(`{m}` AS FLOAT64)) AS `{m}`" for m in measures)
+    # Rank by the first measure (4th column) or by row count (3rd)
+    rank_column = 4 if measures else 3
+
+    parts = [
+        f"SELECT CAST(NULL AS STRING) AS _dimension, CAST(NULL AS STRING) AS _value, "
+        f"COUNT(*) AS _rows{aggregates} FROM _cube"
+    ]
+    for dimension in dimensions:
+        parts.append(
+            f"(SELECT '{dimension}', CAST(`{dimension}` AS STRING), COUNT(*){aggregates} "
+            f"FROM _cube GROUP BY 2 ORDER BY {rank_column} DESC LIMIT {int(top_n)})"
+        )
+    return f"WITH _cube AS (\n{inner_sql}\n)\n" + "\nUNION ALL\n".join(parts)
+
+
+def _summarize_rows(rows, measures: List[str], version: str, top_n: int) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "cube_version": version,
+        "computed_at": datetime.now().isoformat(),
+        "row_count": 0,
+        "totals": {},
+        "top_n": top_n,
+        "top_values": {},
+    }
+    for row in rows:
+        values = {m: row[m] for m in measures}
+        if row["_dimension"] is None:
+            summary["row_count"] = row["_rows"]
+            summary["totals"] = values
+        else:
+            summary["top_values"].setdefault(row["_dimension"], []).append(
+                {"value": row["_value"], "rows": row["_rows"], **values}
+            )
+    return summary
+
+
+def get_cube_summary(
+    db: Session,
+    cube: DataCube,
+    db_source: DataSource,
+    user_id: str,
+    refresh: bool = False,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Return (summary, cached) for a BigQuery-backed cube as seen by `user_id`.
+
+    `cached` is False when the warehouse was queried for this call (no fresh cached
+    summary, or `refresh`). Warehouse errors propagate to the caller.
+    """
+    version = cube_version(cube)
+    row_filter = get_row_filter(db, user_id, cube.id)
+    key = (cube.id, version, _row_filter_key(row_filter))
+    now = time.monotonic()
+    shared_key = "cube-summary:" + hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    if not refresh:
+        with _lock:
+            cached = _summaries.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1], True
+        shared = shared_get(shared_key)
+        if shared is not None:
+            summary = json.loads(shared)
+            _remember(key, now, summary)
+            return summary, True
+
+    dimensions, measures = summary_columns(cube)
+    cube_sql = cube.query
+    params = None
+    if row_filter is not None:
+        cube_sql = row_filter.apply(cube_sql)
+        params = row_filter.parameters
+    sql = summary_sql(cube_sql, dimensions, measures, CUBE_SUMMARY_TOP_N)
+
+    started = time.perf_counter()
+    result = get_connector(db_source).execute(sql, params=params, operation="cube_summary")
+    summary = _summarize_rows(result.rows, measures, version, CUBE_SUMMARY_TOP_N)
+    logger.info("Computed cube summary", extra={
+        "cube_id": cube.id,
+        "dimensions": len(dimensions),
+        "measures": len(measures),
+        "row_filter": row_filter is not None,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+
+    _remember(key, now, summary)
+    shared_set(shared_key, json.dumps(summary, default=str), ttl=CUBE_SUMMARY_TTL_SECONDS)
+    return summary, False
+
+
+def _remember(key: Tuple[str, str, str], now: float, summary: Dict[str, Any]):
+    with _lock:
+        if len(_summaries) >= CUBE_SUMMARY_MAX_ENTRIES:
+            for stale in [k for k, (expires_at, _) in _summaries.items() if expires_at <= now]:
+                del _summaries[stale]
+            if len(_summaries) >= CUBE_SUMMARY_MAX_ENTRIES:
+                _summaries.clear()
+        _summaries[key] = (now + CUBE_SUMMARY_TTL_SECONDS, summary)
+
+
+def invalidate_cube_summaries(*cube_ids: str):
+    """
+    Drop cached summaries of the given cubes (all cubes when none are given) in every
+    worker. Shared entries are keyed by cube version, so a changed cube never reads
+    them; they expire.
+    """
+    publish_invalidation("cube_summaries", cube_ids=list(cube_ids))
+
+
+@on_invalidation("cube_summaries")
+def _drop_cube_summaries(cube_ids: List[str]):
+    with _lock:
+        if not cube_ids:
+            _summaries.clear()
+        else:
+            dropped = set(cube_ids)
+            for key in [k for k in _summaries if k[0] in dropped]:
+                del _summaries[key]
@@ -1,10 +1,20 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Depends, Request
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 
+from .cache import on_invalidation, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
 # Load .env from backend directory or parent directory
 env_path = Path(__file__).parent.parent / '.env'
 if not env_path.exists():
@@ -30,24 +40,100 @@ if DB_NAME.lower() in ['mysql', 'information_schema', 'performance_schema', 'sys
         "Create one with: CREATE DATABASE securebi;"
     )
 
+# Full SQLAlchemy URL, overriding the MySQL settings (e.g. sqlite:///bench.db for local benchmarks)
+DATABASE_URL_OVERRIDE = os.getenv("DATABASE_URL")
+
+# Connection pool of each engine (sync and async): steady-state connections, extra
+# connections allowed under bursts, seconds to wait for a free one, max connection age
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+# Async engine for read-only endpoints (get_read_db): off by default. The URL is derived
+# from the settings above with DB_ASYNC_DRIVER (aiomysql or asyncmy) unless
+# ASYNC_DATABASE_URL is given; ENV=GCP (Cloud SQL connector) needs ASYNC_DATABASE_URL.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("true", "1", "yes")
+DB_ASYNC_DRIVER = os.getenv("DB_ASYNC_DRIVER", "aiomysql")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Read replica for GET requests (full SQLAlchemy URL, same schema as the primary). A user's
+# reads stay on the primary for REPLICA_STICKY_SECONDS after they write, so they see their
+# own changes despite replication lag. ASYNC_REPLICA_DATABASE_URL defaults to the replica
+# URL with the async driver.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+ASYNC_REPLICA_DATABASE_URL = os.getenv("ASYNC_REPLICA_DATABASE_URL")
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Same default as the routers' get_user_id
+DEFAULT_USER_ID = "user-1"
+
+
+def _pool_options(url: str) -> dict:
+    """Queue pool sizing; in-memory SQLite uses a single shared connection instead"""
+    if url.startswith("sqlite") and (url.endswith("://") or ":memory:" in url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def _with_async_driver(url: str, setting: str) -> str:
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    drivers = {"mysql": DB_ASYNC_DRIVER, "sqlite": "aiosqlite", "postgresql": "asyncpg"}
+    if dialect not in drivers:
+        raise ValueError(f"No async driver known for dialect '{dialect}'; set {setting}")
+    return f"{dialect}+{drivers[dialect]}://{rest}"
+
+
+def _async_url() -> str:
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    if DATABASE_URL_OVERRIDE:
+        return _with_async_driver(DATABASE_URL_OVERRIDE, "ASYNC_DATABASE_URL")
+    if ENV == "GCP":
+        raise ValueError("ASYNC_DATABASE_URL is required for DB_ASYNC=true when ENV=GCP")
+    return f"mysql+{DB_ASYNC_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
 # Create engine based on ENV flag
-if ENV == "GCP":
+if DATABASE_URL_OVERRIDE:
+    engine = create_engine(
+        DATABASE_URL_OVERRIDE,
+        connect_args={"check_same_thread": False} if DATABASE_URL_OVERRIDE.startswith("sqlite") else {},
+        pool_pre_ping=True,
+        echo=False,
+        **_pool_options(DATABASE_URL_OVERRIDE)
+    )
+elif ENV == "GCP":
     # Use Cloud SQL Connector for GCP
-    from google.cloud.sql.connector import Connector, IPTypes
-    
     INSTANCE_CONNECTION_NAME = os.getenv("INSTANCE_CONNECTION_NAME")  # "project:region:instance"
     if not INSTANCE_CONNECTION_NAME:
         raise ValueError("INSTANCE_CONNECTION_NAME environment variable is required when ENV=GCP")
     
     # PUBLIC or PRIVATE depending on how you connected Cloud Run to SQL
     IP_TYPE_STR = os.getenv("IP_TYPE", "PUBLIC").upper()
-    IP_TYPE = IPTypes.PUBLIC if IP_TYPE_STR == "PUBLIC" else IPTypes.PRIVATE
     
-    # Initialize connector (refresh_strategy argument is not supported in current library version)
-    connector = Connector(ip_type=IP_TYPE)
+    # The connector (and its import) is built by the first connection rather than at
+    # import, so startup does not wait on it
+    connector = None
+    _connector_lock = threading.Lock()
+    
+    def _cloud_sql_connector():
+        global connector
+        with _connector_lock:
+            if connector is None:
+                from google.cloud.sql.connector import Connector, IPTypes
+                
+                ip_type = IPTypes.PUBLIC if IP_TYPE_STR == "PUBLIC" else IPTypes.PRIVATE
+                # refresh_strategy argument is not supported in current library version
+                connector = Connector(ip_type=ip_type)
+            return connector
     
     def getconn():
-        conn = connector.connect(
+        conn = _cloud_sql_connector().connect(
             INSTANCE_CONNECTION_NAME,
             "pymysql",
             user=DB_USER,
@@ -60,8 +146,8 @@ if ENV == "GCP":
         "mysql+pymysql://",
         creator=getconn,
         pool_pre_ping=True,
-        pool_recycle=300,
-        echo=False
+        echo=False,
+        **_pool_options("mysql+pymysql://")
     )
 else:
     # Use direct connection for local development
@@ -70,18 +156,155 @@ else:
     engine = create_engine(
         DATABASE_URL,
         pool_pre_ping=True,
-        pool_recycle=300,
-        echo=False
+        echo=False,
+        **_pool_options(DATABASE_URL)
     )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engine = None
+ReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        REPLICA_DATABASE_URL,
+        connect_args={"check_same_thread": False} if REPLICA_DATABASE_URL.startswith("sqlite") else {},
+        pool_pre_ping=True,
+        echo=False,
+        **_pool_options(REPLICA_DATABASE_URL)
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+
+def _create_async_engine(url: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    options = _pool_options(url)
+    if options:
+        # Explicit, since some async dialects (aiosqlite) default to no pooling at all
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return create_async_engine(url, pool_pre_ping=True, echo=False, **options)
+
+
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = _create_async_engine(_async_url())
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if REPLICA_DATABASE_URL:
+        async_replica_engine = _create_async_engine(
+            ASYNC_REPLICA_DATABASE_URL or _with_async_driver(REPLICA_DATABASE_URL, "ASYNC_REPLICA_DATABASE_URL")
+        )
+        AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+    logger.info("Async metadata database engine enabled", extra={
+        "driver": async_engine.dialect.driver,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "replica": async_replica_engine is not None,
+    })
+
 Base = declarative_base()
 
-def get_db():
-    """Dependency for getting database session"""
-    db = SessionLocal()
+# user_id -> monotonic time until which the user's reads go to the primary
+_recent_writers: Dict[str, float] = {}
+_recent_writers_lock = threading.Lock()
+
+
+def mark_recent_write(*user_ids: str):
+    """Keep the users' reads on the primary for the next REPLICA_STICKY_SECONDS, in every worker"""
+    if replica_engine is None:
+        return
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if user_ids:
+        # The user's next request may land on another worker (or instance)
+        publish_invalidation("recent_write", user_ids=user_ids)
+
+
+@on_invalidation("recent_write")
+def note_recent_writes(user_ids: List[str]):
+    """Start the users' sticky window in this worker only (for callers already running in every worker)"""
+    if replica_engine is None:
+        return
+    now = time.monotonic()
+    with _recent_writers_lock:
+        if len(_recent_writers) >= 10000:
+            for user_id in [u for u, until in _recent_writers.items() if until <= now]:
+                del _recent_writers[user_id]
+        for user_id in user_ids:
+            if user_id:
+                _recent_writers[user_id] = now + REPLICA_STICKY_SECONDS
+
+
+def _request_user_id(request: Request) -> str:
+    return request.headers.get("x-user-id") or DEFAULT_USER_ID
+
+
+def _reads_from_replica(request: Request) -> bool:
+    """GET/HEAD requests of users who have not written within the sticky window"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    with _recent_writers_lock:
+        until = _recent_writers.get(_request_user_id(request))
+    return until is None or until <= time.monotonic()
+
+
+def _mark_committing_user(session):
+    mark_recent_write(session.info.get("user_id"))
+
+
+event.listen(SessionLocal, "after_commit", _mark_committing_user)
+
+
+def get_db(request: Request):
+    """Dependency for getting database session (the replica's for GET requests when configured)"""
+    if ReplicaSessionLocal is not None and _reads_from_replica(request):
+        db = ReplicaSessionLocal()
+    else:
+        db = SessionLocal()
+        # Commits keep this user's following reads on the primary
+        db.info["user_id"] = _request_user_id(request)
     try:
         yield db
     finally:
         db.close()
+
+
+class ReadSession:
+    """
+    Runs read-only ORM code, written against a regular Session, for an async endpoint.
+
+    With the async engine the function runs through AsyncSession.run_sync on the event
+    loop (the driver awaits I/O, no thread is held); otherwise it runs in the threadpool
+    with a session from get_db.
+    """
+
+    def __init__(self, db: Session = None, async_session=None):
+        self._db = db
+        self._async_session = async_session
+
+    async def run(self, fn, *args, **kwargs):
+        """Return fn(session, *args, **kwargs)"""
+        if self._async_session is not None:
+            return await self._async_session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self._db, *args, **kwargs)
+
+
+async def _async_read_db(request: Request):
+    if AsyncReplicaSessionLocal is not None and _reads_from_replica(request):
+        session_factory = AsyncReplicaSessionLocal
+    else:
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
+        yield ReadSession(async_session=session)
+
+
+async def _threadpool_read_db(db: Session = Depends(get_db)):
+    yield ReadSession(db)
+
+
+# Dependency for read-only endpoints: await db.run(fn, ...) with fn(session, ...)
+get_read_db = _async_read_db if AsyncSessionLocal is not None else _threadpool_read_db
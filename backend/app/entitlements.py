@@ -0,0 +1,255 @@
+"""
+Entitlement helpers shared by the routers.
+
+- Resolves display names for entitled resources in batches (one ``IN`` query per
+  resource type) and keeps them in a short-lived, process-wide cache so repeated
+  calls to ``GET /api/data-entitlement`` do not hit the database for every grant.
+- Maintains a per-user ACL index (readable resource ids per resource type) loaded
+  with a single query from ``data_entitlements``. Index entries are versioned: any
+  grant/revoke for a user bumps that user's version so the next request reloads it.
+- Grants the creator of a resource read/write access on it (grant_owner_access), so
+  what a user creates is visible to them while entitlements are enforced.
+
+Both invalidations are broadcast to the other workers through app.cache.
+"""
+import os
+import threading
+import time
+import uuid
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .cache import on_invalidation, publish_invalidation
+from .database import note_recent_writes
+from .models import DataSource, DataCube, Dashboard, DataEntitlement, ResourceType, Permission
+
+# Seconds a resolved resource name stays valid; renames become visible after this.
+NAME_CACHE_TTL_SECONDS = float(os.getenv("ENTITLEMENT_NAME_CACHE_TTL", "30"))
+NAME_CACHE_MAX_ENTRIES = int(os.getenv("ENTITLEMENT_NAME_CACHE_MAX_ENTRIES", "50000"))
+
+# When false, list endpoints return every resource (pre-entitlement behaviour).
+ENFORCE_ENTITLEMENTS = os.getenv("ENFORCE_ENTITLEMENTS", "true").lower() in ("true", "1", "yes")
+# Upper bound on how long an ACL index is trusted without a version bump (covers
+# grants whose invalidation event never reached this worker).
+ACL_INDEX_TTL_SECONDS = float(os.getenv("ENTITLEMENT_ACL_TTL", "60"))
+ACL_INDEX_MAX_USERS = int(os.getenv("ENTITLEMENT_ACL_MAX_USERS", "10000"))
+
+# Granted to the user who creates a resource
+OWNER_PERMISSIONS = [Permission.read.value, Permission.write.value]
+
+_RESOURCE_MODELS = {
+    ResourceType.dataSource: DataSource,
+    ResourceType.dataCube: DataCube,
+    ResourceType.dashboard: Dashboard,
+}
+
+_FALLBACK_LABELS = {
+    ResourceType.dataSource: "Data Source",
+    ResourceType.dataCube: "Data Cube",
+    ResourceType.dashboard: "Dashboard",
+}
+
+# (resource_type, resource_id) -> (expires_at, name or None when the resource no longer exists)
+_name_cache: Dict[Tuple[ResourceType, str], Tuple[float, Optional[str]]] = {}
+_name_cache_lock = threading.Lock()
+
+
+def fallback_resource_name(resource_type: ResourceType, resource_id: str) -> str:
+    """Label used when an entitled resource no longer exists"""
+    label = _FALLBACK_LABELS.get(ResourceType(resource_type))
+    return f"{label} {resource_id}" if label else "Unknown Resource"
+
+
+def resolve_resource_names(
+    db: Session,
+    keys: Iterable[Tuple[ResourceType, str]],
+) -> Dict[Tuple[ResourceType, str], Optional[str]]:
+    """
+    Resolve names for (resource_type, resource_id) pairs.
+
+    Cached names are served from memory; the remaining ids are loaded with at most
+    one ``SELECT id, name ... WHERE id IN (...)`` per resource type. Ids that do not
+    exist map to None (and are cached as such, so dangling grants stay cheap).
+    """
+    now = time.monotonic()
+    resolved: Dict[Tuple[ResourceType, str], Optional[str]] = {}
+    missing: Dict[ResourceType, set] = {}
+
+    with _name_cache_lock:
+        for resource_type, resource_id in keys:
+            key = (ResourceType(resource_type), resource_id)
+            cached = _name_cache.get(key)
+            if cached is not None and cached[0] > now:
+                resolved[key] = cached[1]
+            else:
+                missing.setdefault(key[0], set()).add(resource_id)
+
+    loaded: Dict[Tuple[ResourceType, str], Optional[str]] = {}
+    for resource_type, ids in missing.items():
+        model = _RESOURCE_MODELS.get(resource_type)
+        if model is None:
+            continue
+        rows = db.query(model.id, model.name).filter(model.id.in_(ids)).all()
+        names = {row.id: row.name for row in rows}
+        for resource_id in ids:
+            loaded[(resource_type, resource_id)] = names.get(resource_id)
+
+    if loaded:
+        expires_at = now + NAME_CACHE_TTL_SECONDS
+        with _name_cache_lock:
+            if len(_name_cache) + len(loaded) > NAME_CACHE_MAX_ENTRIES:
+                _evict_expired(now)
+                if len(_name_cache) + len(loaded) > NAME_CACHE_MAX_ENTRIES:
+                    _name_cache.clear()
+            for key, name in loaded.items():
+                _name_cache[key] = (expires_at, name)
+        resolved.update(loaded)
+
+    return resolved
+
+
+def invalidate_resource_names(resource_type: Optional[ResourceType] = None, *resource_ids: str):
+    """Drop cached names in every worker (all of them, one resource type, or the given resources)"""
+    publish_invalidation(
+        "resource_names",
+        resource_type=ResourceType(resource_type).value if resource_type is not None else None,
+        resource_ids=list(resource_ids),
+    )
+
+
+@on_invalidation("resource_names")
+def _drop_resource_names(resource_type: Optional[str], resource_ids: List[str]):
+    with _name_cache_lock:
+        if resource_type is None:
+            _name_cache.clear()
+        elif resource_ids:
+            for resource_id in resource_ids:
+                _name_cache.pop((ResourceType(resource_type), resource_id), None)
+        else:
+            for key in [k for k in _name_cache if k[0] == ResourceType(resource_type)]:
+                del _name_cache[key]
+
+
+def _evict_expired(now: float):
+    """Remove expired entries; caller must hold the cache lock"""
+    for key in [k for k, (expires_at, _) in _name_cache.items() if expires_at <= now]:
+        del _name_cache[key]
+
+
+class AclIndex:
+    """Readable resource ids per resource type for one user, at a given entitlement version"""
+
+    __slots__ = ("user_id", "version", "loaded_at", "_permissions", "_readable")
+
+    def __init__(self, user_id: str, version: int, permissions: Dict[ResourceType, Dict[str, FrozenSet[str]]]):
+        self.user_id = user_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self._permissions = permissions
+        # Precomputed once per load: list endpoints only ever ask for readable ids
+        self._readable = {
+            resource_type: frozenset(rid for rid, perms in grants.items() if Permission.read.value in perms)
+            for resource_type, grants in permissions.items()
+        }
+
+    def ids(self, resource_type: ResourceType, permission: Permission = Permission.read) -> FrozenSet[str]:
+        """Ids of resources of the given type on which the user holds `permission`"""
+        resource_type = ResourceType(resource_type)
+        if permission == Permission.read:
+            return self._readable.get(resource_type, frozenset())
+        grants = self._permissions.get(resource_type, {})
+        return frozenset(rid for rid, perms in grants.items() if permission.value in perms)
+
+    def allows(self, resource_type: ResourceType, resource_id: str, permission: Permission = Permission.read) -> bool:
+        perms = self._permissions.get(ResourceType(resource_type), {}).get(resource_id)
+        return bool(perms) and permission.value in perms
+
+
+_acl_versions: Dict[str, int] = {}
+_acl_cache: Dict[str, AclIndex] = {}
+_acl_lock = threading.Lock()
+
+
+def bump_acl_version(*user_ids: str):
+    """Invalidate the ACL index of the given users in every worker (call after their grants change)"""
+    publish_invalidation("acl", user_ids=list(user_ids))
+
+
+@on_invalidation("acl")
+def _bump_acl_versions(user_ids: List[str]):
+    with _acl_lock:
+        for user_id in user_ids:
+            _acl_versions[user_id] = _acl_versions.get(user_id, 0) + 1
+            _acl_cache.pop(user_id, None)
+    # Reload their ACL from the primary, not a replica that may not have the change yet
+    # (this handler already runs in every worker, so no second broadcast)
+    note_recent_writes(user_ids)
+
+
+def acl_version(user_id: str) -> int:
+    """Current entitlement version for a user"""
+    with _acl_lock:
+        return _acl_versions.get(user_id, 0)
+
+
+def get_acl_index(db: Session, user_id: str) -> AclIndex:
+    """Return the cached ACL index for a user, reloading it if its version is stale"""
+    now = time.monotonic()
+    with _acl_lock:
+        version = _acl_versions.get(user_id, 0)
+        cached = _acl_cache.get(user_id)
+        if cached is not None and cached.version == version and now - cached.loaded_at < ACL_INDEX_TTL_SECONDS:
+            return cached
+
+    rows = db.query(
+        DataEntitlement.resource_type,
+        DataEntitlement.resource_id,
+        DataEntitlement.permissions_json,
+    ).filter(DataEntitlement.user_id == user_id).all()
+
+    permissions: Dict[ResourceType, Dict[str, FrozenSet[str]]] = {}
+    for resource_type, resource_id, perms in rows:
+        grants = permissions.setdefault(ResourceType(resource_type), {})
+        # A user can hold several grants on the same resource; merge them
+        grants[resource_id] = grants.get(resource_id, frozenset()) | frozenset(perms or [])
+
+    index = AclIndex(user_id, version, permissions)
+    with _acl_lock:
+        # Only publish if no grant changed while we were loading
+        if _acl_versions.get(user_id, 0) == version:
+            if len(_acl_cache) >= ACL_INDEX_MAX_USERS:
+                _acl_cache.clear()
+            _acl_cache[user_id] = index
+    return index
+
+
+def grant_owner_access(db: Session, user_id: str, resource_type: ResourceType, *resource_ids: str):
+    """
+    Add OWNER_PERMISSIONS grants for the creator of new resources to the session's
+    transaction; commit it together with the resources, then bump_acl_version(user_id).
+    """
+    if not resource_ids:
+        return
+    db.execute(insert(DataEntitlement), [
+        {
+            "id": f"ent-{uuid.uuid4().hex[:12]}",
+            "user_id": user_id,
+            "resource_type": ResourceType(resource_type),
+            "resource_id": resource_id,
+            "permissions_json": OWNER_PERMISSIONS,
+            "granted_by": user_id,
+        }
+        for resource_id in resource_ids
+    ])
+
+
+def visible_resource_ids(db: Session, user_id: str, resource_type: ResourceType) -> Optional[FrozenSet[str]]:
+    """
+    Ids of resources of `resource_type` the user may read, or None when entitlement
+    enforcement is disabled (meaning: do not filter).
+    """
+    if not ENFORCE_ENTITLEMENTS:
+        return None
+    return get_acl_index(db, user_id).ids(resource_type)
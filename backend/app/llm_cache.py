@@ -0,0 +1,113 @@
+"""
+Metadata-database tier for the LLM response cache.
+
+Stores parsed generation results in the ``llm_response_cache`` table so cache hits
+are shared by every worker and survive restarts. Uses its own short-lived sessions
+so cache reads/writes never interfere with the request's transaction.
+
+Entries older than LLM_CACHE_TTL seconds (default 7 days) are ignored on read. At
+most every LLM_CACHE_PRUNE_INTERVAL seconds a write also deletes them, together with
+entries of other prompt template versions, which can never be hit again.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from genai.cache import PersistentStore
+
+from .database import SessionLocal
+from .models import LLMResponseCacheEntry
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_PRUNE_INTERVAL_SECONDS = float(os.getenv("LLM_CACHE_PRUNE_INTERVAL", "3600"))
+
+
+class SqlResponseStore(PersistentStore):
+    """PersistentStore backed by the llm_response_cache table"""
+
+    def __init__(
+        self,
+        session_factory=None,
+        template_version: Optional[str] = None,
+        ttl: float = LLM_CACHE_TTL_SECONDS,
+        prune_interval: float = LLM_CACHE_PRUNE_INTERVAL_SECONDS,
+    ):
+        self.session_factory = session_factory or SessionLocal
+        # Current prompt template version; pruning drops entries of any other
+        self.template_version = template_version
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._last_prune = float("-inf")
+        self._prune_lock = threading.Lock()
+
+    def _cutoff(self) -> datetime:
+        # created_at is written in UTC (see save)
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def load(self, key: str) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            row = db.query(LLMResponseCacheEntry.response_json).filter(
+                LLMResponseCacheEntry.cache_key == key,
+                LLMResponseCacheEntry.created_at >= self._cutoff(),
+            ).first()
+            return row.response_json if row else None
+        finally:
+            db.close()
+
+    def save(self, key: str, value: str, model: str, template_version: str) -> None:
+        self._maybe_prune()
+        db = self.session_factory()
+        try:
+            # An expired entry under the same key is replaced
+            db.merge(LLMResponseCacheEntry(
+                cache_key=key,
+                model=model,
+                template_version=template_version,
+                response_json=value,
+                created_at=datetime.utcnow(),
+            ))
+            db.commit()
+        except IntegrityError:
+            # Another worker cached the same generation first
+            db.rollback()
+        finally:
+            db.close()
+
+    def prune(self) -> int:
+        """Delete expired entries and entries of other template versions; returns how many"""
+        conditions = [LLMResponseCacheEntry.created_at < self._cutoff(), LLMResponseCacheEntry.created_at.is_(None)]
+        if self.template_version is not None:
+            conditions.append(LLMResponseCacheEntry.template_version != self.template_version)
+        db = self.session_factory()
+        try:
+            deleted = db.query(LLMResponseCacheEntry).filter(or_(*conditions)).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        with self._prune_lock:
+            if now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        try:
+            deleted = self.prune()
+        except Exception as e:
+            logger.warning("LLM cache prune failed", extra={"error": str(e)})
+            return
+        if deleted:
+            logger.info("Pruned LLM cache entries", extra={"deleted": deleted})
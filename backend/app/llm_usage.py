@@ -0,0 +1,24 @@
+"""
+Attribution of LLM calls to the API request that made them (see genai.usage).
+"""
+from typing import Optional
+
+from fastapi import Header, Request
+
+from genai.usage import LLMCallContext, set_llm_call_context
+
+
+async def track_llm_usage(
+    request: Request,
+    x_user_id: Optional[str] = Header(None, alias="x-user-id"),
+) -> LLMCallContext:
+    """
+    Dependency attributing the request's LLM calls to its route and user.
+
+    Async on purpose: it runs in the request task, so the context also reaches work the
+    endpoint hands to the threadpool and streamed responses. Endpoints fill in
+    `data_source_id` once they know it.
+    """
+    route = request.scope.get("route")
+    endpoint = f"{request.method} {route.path}" if route is not None else request.url.path
+    return set_llm_call_context(endpoint=endpoint, user_id=x_user_id or "user-1")
@@ -1,17 +1,32 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import data_sources, data_cubes, dashboards, data_marketplace, data_entitlement, app_config
+from fastapi.responses import PlainTextResponse
+from .cache import close_cache, start_invalidation_listener
+from .database import async_engine, async_replica_engine, engine, replica_engine, Base
+from .routers import data_sources, data_cubes, dashboards, data_marketplace, data_entitlement, app_config, llm_usage, debug
+from .llm_cache import SqlResponseStore
+from .metrics import CONTENT_TYPE, METRICS_ENABLED, MetricsMiddleware, instrument_engine, render_metrics
+from .startup import STARTUP_MODE, STARTUP_PREWARM, prewarm
+from .tracing import TracingMiddleware, instrument_engine_tracing
+from genai.cache import configure_response_cache
+from genai.data_cube_prompt import PROMPT_TEMPLATE_VERSION
+from genai.tracing import install_log_trace_context
+import asyncio
 import logging
 
 # Configure application logging so router loggers (e.g. data_sources) emit INFO logs
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+    format="%(asctime)s [%(levelname)s] [trace=%(trace_id)s span=%(span_id)s] %(name)s - %(message)s",
 )
+install_log_trace_context()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables (STARTUP_MODE=fast leaves this to `python -m app.migrate`)
+if STARTUP_MODE == "standard":
+    Base.metadata.create_all(bind=engine)
+
+# Share cached LLM generations across workers and restarts via the metadata DB
+configure_response_cache(persistent_store=SqlResponseStore(template_version=PROMPT_TEMPLATE_VERSION))
 
 app = FastAPI(
     title="SecureBI Backend API",
@@ -28,6 +43,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metadata engines by pool label; only the primary is always configured
+database_engines = {
+    name: db_engine
+    for name, db_engine in (
+        ("primary", engine),
+        ("async", async_engine),
+        ("replica", replica_engine),
+        ("async_replica", async_replica_engine),
+    )
+    if db_engine is not None
+}
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    for name, db_engine in database_engines.items():
+        instrument_engine(db_engine, name)
+
+# Outermost, so the request span covers every other middleware and the trace id reaches all logs
+app.add_middleware(TracingMiddleware)
+for name, db_engine in database_engines.items():
+    instrument_engine_tracing(db_engine, name)
+
 # Include routers
 app.include_router(data_sources.router)
 app.include_router(data_cubes.router)
@@ -35,6 +72,27 @@ app.include_router(dashboards.router)
 app.include_router(data_marketplace.router)
 app.include_router(data_entitlement.router)
 app.include_router(app_config.router)
+app.include_router(llm_usage.router)
+app.include_router(debug.router)
+
+# Held so the background prewarm task is not garbage-collected while it runs
+_prewarm_tasks = set()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Apply cache invalidations published by the other workers (shared CACHE_BACKEND)
+    start_invalidation_listener()
+    if STARTUP_PREWARM:
+        task = asyncio.get_running_loop().create_task(prewarm(database_engines))
+        _prewarm_tasks.add(task)
+        task.add_done_callback(_prewarm_tasks.discard)
+
+@app.on_event("shutdown")
+async def close_pools():
+    for _engine in (async_engine, async_replica_engine):
+        if _engine is not None:
+            await _engine.dispose()
+    close_cache()
 
 @app.get("/")
 def root():
@@ -44,6 +102,12 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics (text exposition format)"""
+        return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
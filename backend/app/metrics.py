@@ -0,0 +1,434 @@
+"""
+Prometheus-style metrics, rendered in the text exposition format at GET /metrics.
+
+- HTTP: per-route latency histograms, in-flight gauges, request and error counters
+  (MetricsMiddleware; routes are labelled by their path template, never the raw path)
+- SQLAlchemy pool: size, checked-out and overflow connections (read at scrape time),
+  the time spent acquiring a connection and pool timeouts (instrument_engine), for the
+  sync engine ("primary") and the async one ("async") when enabled
+- Warehouse: query durations, failures and bytes processed per source type and
+  operation (track_warehouse_query)
+- Cache: invalidations applied per kind and origin, and cross-worker delivery delay
+- LLM: call latency histograms, tokens, cost, cache hits (from genai.usage) and the
+  resilient client's in-flight calls and circuit state
+
+Values are per worker process; scrape every worker (or aggregate them) when running
+several. Set METRICS_ENABLED=false to turn the middleware and endpoint off.
+"""
+import contextlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match
+
+from genai.tracing import span
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+class _Metric:
+    """A metric family with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [_sample(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [_sample(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def set_cumulative(self, cumulative_counts: List[Tuple[float, int]], total: float, **labels: str):
+        """Set a labelled series from (upper bound, cumulative count) pairs collected elsewhere"""
+        key = self._key(labels)
+        counts, previous = [], 0
+        for _, cumulative in cumulative_counts:
+            counts.append(cumulative - previous)
+            previous = cumulative
+        with self._lock:
+            self._values[key] = [counts, float(total), previous]
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        samples = []
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(_sample(f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(_sample(f"{self.name}_sum", labels, total))
+            samples.append(_sample(f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """Metrics updated as things happen plus collectors that build metrics at scrape time"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# -- HTTP ---------------------------------------------------------------------------
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response body is sent",
+    ("method", "route"),
+))
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by response status", ("method", "route", "status"),
+))
+http_request_errors_total = registry.register(Counter(
+    "http_request_errors_total", "HTTP requests that failed with a 5xx status or an unhandled exception", ("method", "route"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method", "route"),
+))
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(scope) -> str:
+    """Path template of the route serving the request (bounded label cardinality)"""
+    app = scope.get("app")
+    routes = getattr(getattr(app, "router", None), "routes", ())
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and errors per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method, route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            status["code"] = 500
+            raise
+        finally:
+            http_requests_in_flight.dec(method=method, route=route)
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+            http_requests_total.inc(method=method, route=route, status=str(status["code"]))
+            if status["code"] >= 500:
+                http_request_errors_total.inc(method=method, route=route)
+
+
+# -- SQLAlchemy pool ------------------------------------------------------------------
+
+db_pool_acquire_duration = registry.register(Histogram(
+    "db_pool_acquire_duration_seconds",
+    "Time to get a connection from the SQLAlchemy pool (queue wait plus any new connection)",
+    ("pool",),
+))
+db_pool_connections_created_total = registry.register(Counter(
+    "db_pool_connections_created_total", "New DBAPI connections opened by the pool", ("pool",),
+))
+db_pool_timeouts_total = registry.register(Counter(
+    "db_pool_timeouts_total", "Connection requests that gave up after the pool timeout", ("pool",),
+))
+
+_instrumented_engines: List[Tuple[str, object]] = []
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """Record pool wait times and expose pool gauges for a SQLAlchemy engine (sync or async)"""
+    from sqlalchemy import event
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+    engine = getattr(engine, "sync_engine", engine)
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        except PoolTimeoutError:
+            db_pool_timeouts_total.inc(pool=name)
+            raise
+        finally:
+            db_pool_acquire_duration.observe(time.perf_counter() - started, pool=name)
+
+    pool.connect = timed_connect
+    event.listen(engine, "connect", lambda *_: db_pool_connections_created_total.inc(pool=name))
+    _instrumented_engines.append((name, engine))
+
+
+def _collect_pool_metrics() -> Iterable[_Metric]:
+    size = Gauge("db_pool_size", "Configured pool size", ("pool",))
+    checked_out = Gauge("db_pool_checked_out", "Connections currently checked out of the pool", ("pool",))
+    overflow = Gauge("db_pool_overflow", "Connections open beyond the pool size (negative: unused pool slots)", ("pool",))
+    for name, engine in _instrumented_engines:
+        pool = engine.pool
+        for gauge, attr in ((size, "size"), (checked_out, "checkedout"), (overflow, "overflow")):
+            read = getattr(pool, attr, None)
+            if callable(read):
+                gauge.set(read(), pool=name)
+    return [size, checked_out, overflow]
+
+
+registry.add_collector(_collect_pool_metrics)
+
+# -- Warehouse ---------------------------------------------------------------------------
+
+warehouse_query_duration = registry.register(Histogram(
+    "warehouse_query_duration_seconds",
+    "Warehouse query latency including fetching results",
+    ("source_type", "operation"),
+))
+warehouse_query_errors_total = registry.register(Counter(
+    "warehouse_query_errors_total", "Failed warehouse queries", ("source_type", "operation"),
+))
+warehouse_bytes_processed_total = registry.register(Counter(
+    "warehouse_bytes_processed_total", "Bytes processed (scanned) by warehouse queries", ("source_type", "operation"),
+))
+
+
+class WarehouseQuery:
+    """Set `bytes_processed` once the job is done (e.g. BigQuery total_bytes_processed)"""
+
+    __slots__ = ("bytes_processed",)
+
+    def __init__(self):
+        self.bytes_processed: Optional[int] = None
+
+
+@contextlib.contextmanager
+def track_warehouse_query(source_type: str, operation: str):
+    """Time (and trace as ``warehouse.query``) a warehouse query; failures are counted and re-raised"""
+    query = WarehouseQuery()
+    started = time.perf_counter()
+    with span("warehouse.query", source_type=source_type, operation=operation) as query_span:
+        try:
+            yield query
+        except BaseException:
+            warehouse_query_errors_total.inc(source_type=source_type, operation=operation)
+            raise
+        finally:
+            warehouse_query_duration.observe(time.perf_counter() - started, source_type=source_type, operation=operation)
+            if query.bytes_processed:
+                query_span.set_attribute("bytes_processed", query.bytes_processed)
+                warehouse_bytes_processed_total.inc(query.bytes_processed, source_type=source_type, operation=operation)
+
+
+# -- Cache invalidation ------------------------------------------------------------------
+
+cache_invalidations_total = registry.register(Counter(
+    "cache_invalidations_total",
+    "Cache invalidations applied, published by this worker (local) or another one (remote)",
+    ("kind", "origin"),
+))
+cache_invalidation_delay = registry.register(Histogram(
+    "cache_invalidation_delay_seconds",
+    "Time from another worker publishing an invalidation to this worker applying it",
+    (),
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+))
+
+
+# -- LLM ---------------------------------------------------------------------------------
+
+
+def _collect_llm_metrics() -> Iterable[_Metric]:
+    from genai.client import get_llm_client
+    from genai.usage import LATENCY_BUCKETS, get_llm_usage_stats
+
+    labelnames = ("endpoint", "model")
+    duration = Histogram("llm_request_duration_seconds", "LLM call latency including retries", labelnames, LATENCY_BUCKETS)
+    calls = Counter("llm_calls_total", "LLM generations by outcome", labelnames + ("outcome",))
+    tokens = Counter("llm_tokens_total", "LLM tokens by direction", labelnames + ("direction",))
+    retries = Counter("llm_retries_total", "LLM call retries", labelnames)
+    cost = Counter("llm_cost_usd_total", "Estimated LLM cost in USD", labelnames)
+
+    # Per-user series are rolled up here; /api/llm-usage has the per-user breakdown
+    rolled_up: Dict[LabelValues, dict] = {}
+    for labels, series in get_llm_usage_stats().series():
+        key = (labels["endpoint"], labels["model"])
+        totals = rolled_up.setdefault(key, {"buckets": None, "latency": 0.0, "calls": 0, "failed": 0,
+                                            "cache_hits": 0, "prompt": 0, "output": 0, "retries": 0, "cost": 0.0})
+        buckets = series["latency_buckets"]
+        totals["buckets"] = buckets if totals["buckets"] is None else [
+            (bound, a + b) for (bound, a), (_, b) in zip(totals["buckets"], buckets)
+        ]
+        totals["latency"] += series["latency_seconds_sum"]
+        totals["calls"] += series["llm_calls"]
+        totals["failed"] += series["failed"]
+        totals["cache_hits"] += series["cache_hits"]
+        totals["prompt"] += series["prompt_tokens"]
+        totals["output"] += series["output_tokens"]
+        totals["retries"] += series["retries"]
+        totals["cost"] += series["cost_usd"]
+
+    for (endpoint, model), totals in rolled_up.items():
+        labels = {"endpoint": endpoint, "model": model}
+        duration.set_cumulative(totals["buckets"], totals["latency"], **labels)
+        calls.inc(totals["calls"] - totals["failed"], outcome="succeeded", **labels)
+        calls.inc(totals["failed"], outcome="failed", **labels)
+        calls.inc(totals["cache_hits"], outcome="cache_hit", **labels)
+        tokens.inc(totals["prompt"], direction="prompt", **labels)
+        tokens.inc(totals["output"], direction="output", **labels)
+        retries.inc(totals["retries"], **labels)
+        cost.inc(totals["cost"], **labels)
+
+    client_stats = get_llm_client().stats()
+    in_flight = Gauge("llm_requests_in_flight", "LLM calls currently holding a concurrency slot")
+    in_flight.set(client_stats["in_flight"])
+    waiting = Gauge("llm_requests_waiting", "LLM calls waiting for a concurrency slot")
+    waiting.set(client_stats["waiting"])
+    circuit_open = Gauge("llm_circuit_open", "1 when the LLM circuit breaker is open")
+    circuit_open.set(1 if client_stats["circuit"] == "open" else 0)
+    return [duration, calls, tokens, retries, cost, in_flight, waiting, circuit_open]
+
+
+registry.add_collector(_collect_llm_metrics)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,79 @@
+"""
+Create the metadata tables, as a deploy step separate from serving:
+
+    python -m app.migrate
+
+Needed with STARTUP_MODE=fast, where the app no longer runs create_all at import.
+Safe to run repeatedly; existing tables are left as they are.
+
+Resources created before creators were granted access have no owner grant, so with
+ENFORCE_ENTITLEMENTS they are listed to nobody. Backfill grants for them with:
+
+    python -m app.migrate --backfill-owner [USER_ID]
+
+which grants USER_ID (default: the default user, user-1) read/write on every data
+source, data cube and dashboard it holds no grant on. Also safe to run repeatedly.
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import select
+
+from .database import DEFAULT_USER_ID, SessionLocal, engine
+from .entitlements import bump_acl_version, grant_owner_access
+# Base from models, not database: importing it there registers every table on Base.metadata
+from .models import Base, Dashboard, DataCube, DataEntitlement, DataSource, ResourceType
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def migrate():
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    logger.info("Metadata tables created", extra={
+        "tables": len(Base.metadata.tables), "seconds": round(time.perf_counter() - started, 3),
+    })
+
+
+def backfill_owner_grants(user_id: str = DEFAULT_USER_ID) -> int:
+    """Grant `user_id` owner access on every resource it holds no grant on; returns how many"""
+    granted = 0
+    db = SessionLocal()
+    try:
+        for resource_type, model in (
+            (ResourceType.dataSource, DataSource),
+            (ResourceType.dataCube, DataCube),
+            (ResourceType.dashboard, Dashboard),
+        ):
+            held = select(DataEntitlement.resource_id).where(
+                DataEntitlement.user_id == user_id,
+                DataEntitlement.resource_type == resource_type,
+            )
+            ids = [row.id for row in db.query(model.id).filter(model.id.not_in(held))]
+            for start in range(0, len(ids), BACKFILL_BATCH_SIZE):
+                grant_owner_access(db, user_id, resource_type, *ids[start:start + BACKFILL_BATCH_SIZE])
+            granted += len(ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if granted:
+        bump_acl_version(user_id)
+    logger.info("Owner grants backfilled", extra={"user_id": user_id, "granted": granted})
+    return granted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backfill-owner", nargs="?", const=DEFAULT_USER_ID, default=None, metavar="USER_ID",
+                        help="grant this user read/write on every resource it holds no grant on")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    if args.backfill_owner is not None:
+        backfill_owner_grants(args.backfill_owner)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Text, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -26,6 +26,16 @@ class Permission(str, enum.Enum):
     write = "write"
     delete = "delete"
 
+class RowFilterOperator(str, enum.Enum):
+    eq = "eq"
+    neq = "neq"
+    in_ = "in"
+    not_in = "not_in"
+    lt = "lt"
+    lte = "lte"
+    gt = "gt"
+    gte = "gte"
+
 class DataSource(Base):
     __tablename__ = "data_sources"
     
@@ -105,9 +115,39 @@ class DataEntitlement(Base):
     granted_by = Column(String(255), nullable=False)
     
     __table_args__ = (
+        # Serves ACL index loads (user_id) and grant lookups/de-duplication (all three)
+        Index("ix_data_entitlements_user_resource", "user_id", "resource_type", "resource_id"),
+        {"mysql_engine": "InnoDB"},
+    )
+
+class RowLevelPolicy(Base):
+    """Row-level restriction applied to a user's queries against a data cube"""
+    __tablename__ = "row_level_policies"
+    
+    id = Column(String(255), primary_key=True)
+    user_id = Column(String(255), nullable=False)
+    data_cube_id = Column(String(255), ForeignKey("data_cubes.id", ondelete="CASCADE"), nullable=False)
+    column_name = Column(String(255), nullable=False)
+    operator = Column(String(16), nullable=False)  # RowFilterOperator value
+    values_json = Column(JSON, nullable=False)  # Store filter values as JSON array
+    granted_by = Column(String(255), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_row_level_policies_user_cube", "user_id", "data_cube_id"),
         {"mysql_engine": "InnoDB"},
     )
 
+class LLMResponseCacheEntry(Base):
+    """Persistent tier of the LLM response cache (see genai.cache)"""
+    __tablename__ = "llm_response_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256 hex digest
+    model = Column(String(255), nullable=False)
+    template_version = Column(String(64), nullable=False)
+    response_json = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
 class AppConfig(Base):
     __tablename__ = "app_configs"
     
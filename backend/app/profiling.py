@@ -0,0 +1,151 @@
+"""
+On-demand profiling of a live worker (served by routers/debug.py).
+
+- sample_stacks: a sampling CPU profiler. The calling (threadpool) thread reads the stack
+  of every other thread (sys._current_frames) every `interval` seconds and counts identical
+  stacks, returned in the collapsed-stack format understood by flamegraph.pl, speedscope
+  and inferno ("thread;outer (file:line);...;inner (file:line) count").
+- tracemalloc_diff: snapshots allocations, waits, snapshots again and returns the lines
+  whose allocated memory grew the most. tracemalloc is started for the duration of the
+  diff unless it is already running (e.g. PYTHONTRACEMALLOC=25 at startup, which also
+  catches allocations made before the request).
+
+Only one profile runs per worker at a time; both profilers slow the worker down a little
+while they run (tracemalloc noticeably) and nothing at all otherwise.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MIN_INTERVAL = 0.001
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    """Another profile is already running in this worker"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Dict[str, Any]:
+    """
+    Sample every thread's stack for `seconds` (capped at PROFILE_MAX_SECONDS).
+
+    Returns the collapsed stacks ("stacks": {stack: samples}) plus the number of sampling
+    rounds and the effective duration. Raises ProfilerBusyError when a profile is running.
+    """
+    seconds = max(0.0, min(seconds, PROFILE_MAX_SECONDS))
+    interval = max(interval, PROFILE_MIN_INTERVAL)
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running in this worker")
+    try:
+        own_id = threading.get_ident()
+        stacks: Dict[str, int] = collections.Counter()
+        rounds = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks[_collapse(frame, names.get(thread_id, f"thread-{thread_id}"))] += 1
+            rounds += 1
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+        return {
+            "stacks": dict(stacks),
+            "samples": rounds,
+            "duration_seconds": time.perf_counter() - started,
+            "interval_seconds": interval,
+        }
+    finally:
+        _profile_lock.release()
+
+
+def render_collapsed(stacks: Dict[str, int]) -> str:
+    """Collapsed-stack text, hottest stacks first"""
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def tracemalloc_diff(seconds: float, top: int = 25, group_by: str = "lineno") -> Dict[str, Any]:
+    """
+    Allocation growth over `seconds` (capped at PROFILE_MAX_SECONDS), largest first.
+
+    `group_by` is "lineno", "filename" or "traceback" (as in Snapshot.compare_to).
+    Raises ProfilerBusyError when a profile is running.
+    """
+    seconds = max(0.0, min(seconds, PROFILE_MAX_SECONDS))
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running in this worker")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = _snapshot()
+        time.sleep(seconds)
+        after = _snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        stats = after.compare_to(before, group_by)
+        return {
+            "duration_seconds": seconds,
+            "started_tracemalloc": started_here,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [_stat_dict(stat) for stat in stats[:max(1, top)]],
+        }
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _profile_lock.release()
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def _stat_dict(stat) -> Dict[str, Any]:
+    frames: List[str] = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    return {
+        "location": frames[0] if frames else None,
+        "traceback": frames if len(frames) > 1 else None,
+        "size_diff_bytes": stat.size_diff,
+        "size_bytes": stat.size,
+        "count_diff": stat.count_diff,
+        "count": stat.count,
+    }
+
+
+def profiling_status() -> Dict[str, Any]:
+    return {
+        "busy": _profile_lock.locked(),
+        "tracemalloc_tracing": tracemalloc.is_tracing(),
+        "max_seconds": PROFILE_MAX_SECONDS,
+    }
@@ -1,30 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
-from ..database import get_db
-from ..models import Dashboard, DataCube
+from ..database import ReadSession, get_db, get_read_db
+from ..models import Dashboard, DataCube, DataSourceType, ResourceType
 from ..schemas import DashboardCreate, DashboardResponse, AIChatMessage, AIChatResponse
+from ..entitlements import bump_acl_version, grant_owner_access, invalidate_resource_names, visible_resource_ids
+from ..serialization import model_response
+from ..cube_summaries import get_cube_summary
+from ..llm_usage import track_llm_usage
+from genai.client import LLMUnavailableError
+from genai.dashboard_chat import aanswer_dashboard_question
+from genai.usage import LLMCallContext
 from datetime import datetime
 import uuid
 import json
-import random
+import logging
 
 router = APIRouter(prefix="/api/dashboards", tags=["dashboards"])
 
+logger = logging.getLogger(__name__)
+
+GROUNDING_CACHED = "cached_summary"
+GROUNDING_LIVE = "live_query"
+GROUNDING_NONE = "none"
+
 def get_user_id(x_user_id: Optional[str] = Header(None, alias="x-user-id")) -> str:
     """Extract user ID from header or use default"""
     return x_user_id or "user-1"
 
 @router.get("", response_model=list[DashboardResponse])
-def get_dashboards(
-    db: Session = Depends(get_db),
+async def get_dashboards(
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
     user_id: str = Depends(get_user_id)
 ):
-    """Get all dashboards (filtered by entitlements in production)"""
-    dashboards = db.query(Dashboard).all()
-    
-    # TODO: Filter by entitlements based on user_id
-    # For now, return all dashboards
+    """Get all dashboards the user is entitled to read"""
+    return await model_response(request, list[DashboardResponse], await db.run(_list_dashboards, user_id))
+
+
+def _list_dashboards(db: Session, user_id: str):
+    query = db.query(Dashboard)
+    visible_ids = visible_resource_ids(db, user_id, ResourceType.dashboard)
+    if visible_ids is not None:
+        query = query.filter(Dashboard.id.in_(visible_ids))
+    dashboards = query.all()
     
     result = []
     for dashboard in dashboards:
@@ -43,9 +63,10 @@ def get_dashboards(
 @router.post("", response_model=DashboardResponse, status_code=201)
 def create_dashboard(
     dashboard: DashboardCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_user_id)
 ):
-    """Create a new dashboard"""
+    """Create a new dashboard, readable and writable by its creator"""
     # Verify data cube exists
     db_cube = db.query(DataCube).filter(DataCube.id == dashboard.data_cube_id).first()
     if not db_cube:
@@ -64,8 +85,10 @@ def create_dashboard(
     )
     
     db.add(db_dashboard)
+    grant_owner_access(db, user_id, ResourceType.dashboard, dashboard_id)
     db.commit()
     db.refresh(db_dashboard)
+    bump_acl_version(user_id)
     
     return {
         "id": db_dashboard.id,
@@ -78,11 +101,15 @@ def create_dashboard(
     }
 
 @router.get("/{dashboard_id}", response_model=DashboardResponse)
-def get_dashboard(
+async def get_dashboard(
     dashboard_id: str,
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
     """Get a specific dashboard"""
+    return await db.run(_load_dashboard, dashboard_id)
+
+
+def _load_dashboard(db: Session, dashboard_id: str):
     dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
     if not dashboard:
         raise HTTPException(status_code=404, detail="Dashboard not found")
@@ -117,6 +144,7 @@ def update_dashboard(
     
     db.commit()
     db.refresh(db_dashboard)
+    invalidate_resource_names(ResourceType.dashboard, dashboard_id)
     
     return {
         "id": db_dashboard.id,
@@ -140,31 +168,80 @@ def delete_dashboard(
     
     db.delete(dashboard)
     db.commit()
+    invalidate_resource_names(ResourceType.dashboard, dashboard_id)
     
     return None
 
+def _load_chat_context(db: Session, dashboard_id: str, user_id: str, refresh: bool):
+    """(dashboard, cube, summary, grounding) for an AI chat message"""
+    dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    cube = dashboard.data_cube
+    if cube is None:
+        raise HTTPException(status_code=404, detail="Data cube not found")
+
+    db_source = cube.data_source
+    if db_source is None or db_source.type != DataSourceType.bigquery:
+        return dashboard, cube, None, GROUNDING_NONE
+    try:
+        summary, cached = get_cube_summary(db, cube, db_source, user_id, refresh=refresh)
+    except Exception as e:
+        # Still answer (from the cube definition) when the warehouse is unreachable
+        logger.warning("Cube summary unavailable for AI chat", extra={
+            "dashboard_id": dashboard_id,
+            "cube_id": cube.id,
+            "error": str(e),
+        })
+        return dashboard, cube, None, GROUNDING_NONE
+    return dashboard, cube, summary, GROUNDING_CACHED if cached else GROUNDING_LIVE
+
+
 @router.post("/{dashboard_id}/ai-chat", response_model=AIChatResponse)
-def ai_chat(
+async def ai_chat(
     dashboard_id: str,
     message: AIChatMessage,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_user_id),
+    llm_usage: LLMCallContext = Depends(track_llm_usage)
 ):
-    """Send message to AI assistant for a dashboard"""
-    # Verify dashboard exists
-    dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
-    if not dashboard:
-        raise HTTPException(status_code=404, detail="Dashboard not found")
-    
-    # Mock AI response
-    responses = [
-        f"Based on the dashboard '{dashboard.name}' data, I can see that sales have been trending upward. The total sales for Q1 2024 is $405,000.",
-        f"The data shows that sales peaked in February 2024 with $142,000 in revenue.",
-        f"Looking at the metrics for '{dashboard.name}', the average order value is approximately $328.",
-    ]
-    
-    response = random.choice(responses)
-    
+    """
+    Ask the AI assistant about a dashboard.
+
+    Answers are grounded in a cached summary of the dashboard's data cube (totals per
+    measure, top values per dimension), computed with the user's row filter. `grounding`
+    tells whether the cached summary was used, a live query was run, or no data was
+    available (non-BigQuery source or warehouse error).
+    """
+    dashboard, cube, summary, grounding = await run_in_threadpool(
+        _load_chat_context, db, dashboard_id, user_id, message.refresh
+    )
+    llm_usage.data_source_id = cube.data_source_id
+
+    try:
+        answer = await aanswer_dashboard_question(
+            message.message,
+            dashboard.name,
+            cube.name,
+            cube.dimensions_json or [],
+            cube.measures_json or [],
+            summary,
+        )
+    except LLMUnavailableError as e:
+        logger.error("LLM backend unavailable in ai_chat", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        logger.error("ValueError in ai_chat", extra={"error": str(e)})
+        raise HTTPException(status_code=502, detail=str(e))
+
+    logger.info("Answered dashboard AI chat", extra={
+        "dashboard_id": dashboard_id,
+        "cube_id": cube.id,
+        "grounding": grounding,
+    })
     return {
-        "response": response,
-        "timestamp": datetime.now().isoformat()
+        "response": answer,
+        "timestamp": datetime.now().isoformat(),
+        "grounding": grounding,
+        "summaryComputedAt": summary["computed_at"] if summary else None,
     }
@@ -1,23 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from sqlalchemy import func, insert, update
 from typing import Optional
-from ..database import get_db
-from ..models import DataCube, DataSource, Table, DataSourceType
+from ..database import ReadSession, get_db, get_read_db
+from ..models import DataCube, DataSource, ResourceType
 from ..schemas import (
     DataCubeCreate, DataCubeUpdate, DataCubeResponse, DataCubeQuery, DataCubeQueryResponse,
     DataCubeGenerateRequest, DataCubeGenerateResponse, TableSchema, ColumnSchema,
-    DataCubePreviewRequest, SqlPreviewResponse,
+    DataCubePreviewRequest, SqlPreviewResponse, DataCubeImportRequest, DataCubeBatchGenerateRequest,
 )
+from ..entitlements import bump_acl_version, grant_owner_access, invalidate_resource_names, visible_resource_ids
+from ..serialization import model_response
+from ..row_security import get_row_filter
+from ..schema_cache import load_generation_schema
+from ..cube_summaries import invalidate_cube_summaries
+from ..llm_usage import track_llm_usage
+from ..warehouse import UnsupportedWarehouseOperation, WarehouseError, connector_class_for, get_connector
 from datetime import datetime
+import asyncio
 import uuid
 import json
 import os
 import logging
-from genai.data_cube_prompt import generate_data_cube
+from genai.data_cube_prompt import (
+    agenerate_data_cube,
+    agenerate_data_cube_candidates,
+    select_prompt_tables,
+    stream_data_cube,
+)
+from genai.client import LLMUnavailableError
+from genai.cache import get_response_cache
+from genai.structured_output import structured_output_stats
+from genai.usage import LLMCallContext
+from genai.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on cubes per import request
+MAX_CUBE_IMPORT = int(os.getenv("MAX_CUBE_IMPORT", "5000"))
+# Candidates generated per /generate request when the request does not say
+GENERATE_CANDIDATES = int(os.getenv("GENERATE_CANDIDATES", "1"))
+# Batch generation: max requests per batch and concurrent generations per batch
+MAX_BATCH_GENERATE = int(os.getenv("MAX_BATCH_GENERATE", "100"))
+BATCH_GENERATE_CONCURRENCY = int(os.getenv("BATCH_GENERATE_CONCURRENCY", "8"))
+
 router = APIRouter(prefix="/api/data-cubes", tags=["data-cubes"])
 
 def get_user_id(x_user_id: Optional[str] = Header(None, alias="x-user-id")) -> str:
@@ -25,26 +53,30 @@ def get_user_id(x_user_id: Optional[str] = Header(None, alias="x-user-id")) -> s
     return x_user_id or "user-1"
 
 @router.get("", response_model=list[DataCubeResponse])
-def get_data_cubes(
-    db: Session = Depends(get_db),
+async def get_data_cubes(
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
     user_id: str = Depends(get_user_id)
 ):
-    """Get all data cubes from MySQL database (filtered by entitlements in production)"""
+    """Get all data cubes the user is entitled to read from MySQL database"""
+    return await model_response(request, list[DataCubeResponse], await db.run(_list_data_cubes, user_id))
+
+
+def _list_data_cubes(db: Session, user_id: str):
     logger.info("Querying data cubes from MySQL", extra={"user_id": user_id})
     
-    # Query MySQL database for all data cubes
-    # Use expire_all to ensure fresh query from database
-    db.expire_all()
-    data_cubes = db.query(DataCube).order_by(DataCube.created_at.desc()).all()
+    # Query MySQL database for the visible data cubes
+    query = db.query(DataCube)
+    visible_ids = visible_resource_ids(db, user_id, ResourceType.dataCube)
+    if visible_ids is not None:
+        query = query.filter(DataCube.id.in_(visible_ids))
+    data_cubes = query.order_by(DataCube.created_at.desc()).all()
     
     logger.info("Found data cubes in MySQL", extra={
         "cube_count": len(data_cubes),
         "user_id": user_id
     })
     
-    # TODO: Filter by entitlements based on user_id
-    # For now, return all data cubes
-    
     result = []
     for cube in data_cubes:
         # Return dict with camelCase to match frontend expectations and data marketplace format
@@ -71,16 +103,17 @@ def get_data_cubes(
 @router.post("", response_model=DataCubeResponse, status_code=201)
 def create_data_cube(
     data_cube: DataCubeCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_user_id)
 ):
-    """Create a new data cube and persist it to the database"""
+    """Create a new data cube and persist it to the database, readable and writable by its creator"""
     logger.info("Creating data cube", extra={
         "cube_name": data_cube.name,
         "data_source_id": data_cube.data_source_id
     })
     
     # Verify data source exists
-    db_source = db.query(DataSource).filter(DataSource.id == data_cube.data_source_id).first()
+    db_source = db.query(DataSource.id).filter(DataSource.id == data_cube.data_source_id).first()
     if not db_source:
         logger.warning("Data source not found", extra={"data_source_id": data_cube.data_source_id})
         raise HTTPException(status_code=404, detail="Data source not found")
@@ -101,65 +134,14 @@ def create_data_cube(
     
     try:
         db.add(db_cube)
-        db.flush()  # Flush to ensure the object is in the session
+        grant_owner_access(db, user_id, ResourceType.dataCube, cube_id)
         db.commit()  # Commit the transaction to MySQL
         db.refresh(db_cube)  # Refresh to get database-generated fields
-        
-        # Verify the data cube was actually persisted by querying it back
-        # Expire the object to force a fresh query from database
-        db.expire(db_cube)
-        
-        # Query again to verify it's in the database
-        verification = db.query(DataCube).filter(DataCube.id == cube_id).first()
-        if not verification:
-            logger.error("Data cube was not found in database after commit", extra={
-                "cube_id": cube_id
-            })
-            raise HTTPException(
-                status_code=500,
-                detail="Data cube was created but could not be verified in database"
-            )
-        
-        # Also verify total count to ensure data is visible
-        total_cubes = db.query(DataCube).count()
-        logger.info("Data cube persisted and verified successfully", extra={
+        logger.info("Data cube persisted successfully", extra={
             "cube_id": db_cube.id,
             "cube_name": db_cube.name,
-            "data_source_id": db_cube.data_source_id,
-            "verified": True,
-            "total_cubes_in_db": total_cubes
+            "data_source_id": db_cube.data_source_id
         })
-        
-        # Double-check: query all cubes to ensure this one is included
-        all_cubes = db.query(DataCube).all()
-        cube_found_in_all = any(c.id == cube_id for c in all_cubes)
-        if not cube_found_in_all:
-            logger.error("Data cube not found in all cubes query", extra={
-                "cube_id": cube_id,
-                "total_cubes": len(all_cubes)
-            })
-        else:
-            logger.info("Data cube confirmed in all cubes query", extra={
-                "cube_id": cube_id,
-                "total_cubes": len(all_cubes)
-            })
-        
-        # Final verification: Use raw SQL to ensure data is actually in MySQL
-        try:
-            result = db.execute(text("SELECT COUNT(*) as count FROM data_cubes WHERE id = :cube_id"), {"cube_id": cube_id})
-            count = result.scalar()
-            if count == 0:
-                logger.error("Data cube not found in MySQL using raw SQL query", extra={"cube_id": cube_id})
-            else:
-                logger.info("Data cube verified in MySQL using raw SQL", extra={
-                    "cube_id": cube_id,
-                    "sql_count": count
-                })
-        except Exception as e:
-            logger.warning("Could not verify with raw SQL", extra={"error": str(e)})
-    except HTTPException:
-        db.rollback()
-        raise
     except Exception as e:
         db.rollback()
         logger.exception("Failed to persist data cube to database", extra={
@@ -171,6 +153,7 @@ def create_data_cube(
             status_code=500,
             detail=f"Failed to save data cube to database: {str(e)}"
         )
+    bump_acl_version(user_id)
     
     # Return dict with camelCase to match frontend expectations and data marketplace format
     return {
@@ -186,6 +169,101 @@ def create_data_cube(
         "data": []
     }
 
+@router.post("/import", response_model=dict)
+def import_data_cubes(
+    request: DataCubeImportRequest,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_user_id)
+):
+    """Bulk import/upsert data cube definitions (e.g. exported from another environment).
+
+    Runs a fixed number of statements regardless of batch size: one lookup of the referenced
+    data sources, one of the existing cube ids, one multi-row INSERT and one bulk UPDATE,
+    all in a single transaction. The importing user is granted read/write on the new cubes
+    in the same transaction.
+    """
+    if len(request.cubes) > MAX_CUBE_IMPORT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Import contains {len(request.cubes)} cubes; the limit is {MAX_CUBE_IMPORT}"
+        )
+    
+    given_ids = [cube.id for cube in request.cubes if cube.id]
+    if len(given_ids) != len(set(given_ids)):
+        raise HTTPException(status_code=400, detail="Import contains duplicate cube ids")
+    
+    source_ids = {cube.data_source_id for cube in request.cubes}
+    found_sources = {row.id for row in db.query(DataSource.id).filter(DataSource.id.in_(source_ids))}
+    missing_sources = sorted(source_ids - found_sources)
+    if missing_sources:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Data sources not found: {', '.join(missing_sources)}"
+        )
+    
+    existing_ids = set()
+    if given_ids:
+        existing_ids = {row.id for row in db.query(DataCube.id).filter(DataCube.id.in_(given_ids))}
+    
+    new_rows, update_rows, skipped = [], [], []
+    for cube in request.cubes:
+        row = {
+            "id": cube.id or f"cube-{uuid.uuid4().hex[:12]}",
+            "name": cube.name,
+            "description": cube.description,
+            "query": cube.query,
+            "data_source_id": cube.data_source_id,
+            "dimensions_json": cube.dimensions,
+            "measures_json": cube.measures,
+            "metadata_json": cube.metadata,
+        }
+        if row["id"] not in existing_ids:
+            new_rows.append(row)
+        elif request.overwrite:
+            update_rows.append(row)
+        else:
+            skipped.append(row["id"])
+    
+    try:
+        if new_rows:
+            db.execute(insert(DataCube), new_rows)
+            grant_owner_access(db, user_id, ResourceType.dataCube, *(row["id"] for row in new_rows))
+        if update_rows:
+            # ORM bulk UPDATE by primary key (executemany)
+            db.execute(update(DataCube), update_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Failed to import data cubes", extra={
+            "cube_count": len(request.cubes),
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        raise HTTPException(status_code=500, detail=f"Failed to import data cubes: {str(e)}")
+    
+    if new_rows:
+        bump_acl_version(user_id)
+    # Caller-given ids may have grants from before the import, cached with no name
+    imported_ids = [row["id"] for row in new_rows + update_rows if row["id"] in given_ids]
+    if imported_ids:
+        invalidate_resource_names(ResourceType.dataCube, *imported_ids)
+    if update_rows:
+        invalidate_cube_summaries(*(row["id"] for row in update_rows))
+    
+    logger.info("Data cubes imported", extra={
+        # "created" is a reserved LogRecord attribute
+        "inserted": len(new_rows),
+        "updated": len(update_rows),
+        "skipped": len(skipped)
+    })
+    
+    return {
+        "created": len(new_rows),
+        "updated": len(update_rows),
+        "skipped": len(skipped),
+        "ids": [row["id"] for row in new_rows + update_rows],
+    }
+
 @router.put("/{cube_id}", response_model=DataCubeResponse)
 def update_data_cube(
     cube_id: str,
@@ -212,6 +290,8 @@ def update_data_cube(
     try:
         db.commit()
         db.refresh(db_cube)
+        invalidate_resource_names(ResourceType.dataCube, cube_id)
+        invalidate_cube_summaries(cube_id)
         logger.info("Data cube updated successfully", extra={"cube_id": cube_id})
     except Exception as e:
         db.rollback()
@@ -247,6 +327,8 @@ def delete_data_cube(
     try:
         db.delete(db_cube)
         db.commit()
+        invalidate_resource_names(ResourceType.dataCube, cube_id)
+        invalidate_cube_summaries(cube_id)
         logger.info("Data cube deleted successfully", extra={"cube_id": cube_id})
     except Exception as e:
         db.rollback()
@@ -259,8 +341,13 @@ def preview_data_cube(
     cube_id: str,
     request: DataCubePreviewRequest,
     db: Session = Depends(get_db),
+    user_id: str = Depends(get_user_id),
 ):
-    """Execute the data cube's SQL against its data source and return a paginated result set."""
+    """Execute the data cube's SQL against its data source and return a paginated result set.
+
+    The user's row-level security policies for the cube are applied in the warehouse
+    as a parameterized WHERE clause.
+    """
     db_cube = db.query(DataCube).filter(DataCube.id == cube_id).first()
     if not db_cube:
         raise HTTPException(status_code=404, detail="Data cube not found")
@@ -269,21 +356,10 @@ def preview_data_cube(
     if not db_source:
         raise HTTPException(status_code=404, detail="Data source not found for this cube")
 
-    if db_source.type != DataSourceType.bigquery:
-        raise HTTPException(
-            status_code=400,
-            detail="Cube preview is currently only supported for BigQuery data sources.",
-        )
-
     try:
-        from google.cloud import bigquery
-        from google.oauth2 import service_account
-        from google.auth.exceptions import DefaultCredentialsError
-    except ImportError:
-        raise HTTPException(
-            status_code=500,
-            detail="google-cloud-bigquery library not installed.",
-        )
+        connector = get_connector(db_source)
+    except WarehouseError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
     limit = max(1, min(request.limit, 500))
     offset = max(0, request.offset)
@@ -292,193 +368,43 @@ def preview_data_cube(
     inner_sql = db_cube.query.strip()
     if inner_sql.rstrip().endswith(";"):
         inner_sql = inner_sql.rstrip()[:-1]
+    row_filter = get_row_filter(db, user_id, cube_id)
+    params = None
+    if row_filter is not None:
+        if not connector.capabilities.row_filters:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Row-level security is not supported for {connector.source_type} data sources.",
+            )
+        inner_sql = row_filter.apply(inner_sql)
+        params = row_filter.parameters
     sql = f"SELECT * FROM (\n{inner_sql}\n) AS _preview\nLIMIT {limit} OFFSET {offset}"
 
     try:
-        credentials = None
-        if db_source.password:
-            try:
-                service_account_info = json.loads(db_source.password)
-                credentials = service_account.Credentials.from_service_account_info(service_account_info)
-            except json.JSONDecodeError:
-                raise HTTPException(status_code=400, detail="Invalid service account key JSON")
-        project = db_source.project_id or db_source.host
-        if credentials:
-            client = bigquery.Client(
-                credentials=credentials,
-                project=project,
-                location=db_source.location,
-            )
-        else:
-            client = bigquery.Client(project=project, location=db_source.location)
-
-        query_job = client.query(sql)
-        rows_iter = query_job.result(max_results=limit)
-        rows = list(rows_iter)
-
-        if not rows:
-            return SqlPreviewResponse(rows=[], columns=[])
-
-        columns = list(rows[0].keys())
-        data_rows = [dict(row) for row in rows]
-        return SqlPreviewResponse(rows=data_rows, columns=columns)
-    except DefaultCredentialsError:
-        raise HTTPException(
-            status_code=400,
-            detail="Service account credentials not found. Configure GOOGLE_APPLICATION_CREDENTIALS or add a key to the data source.",
-        )
+        result = connector.execute(sql, params=params, max_rows=limit, operation="cube_preview")
+        return SqlPreviewResponse(rows=result.rows, columns=result.columns)
+    except WarehouseError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.exception("preview_data_cube failed", extra={"cube_id": cube_id, "error": str(e)})
         raise HTTPException(status_code=400, detail=f"Failed to execute cube preview: {str(e)}")
 
 
-@router.post("/generate", response_model=DataCubeGenerateResponse)
-def generate_data_cube_ai(
-    request: DataCubeGenerateRequest,
-    db: Session = Depends(get_db)
-):
-    """Generate a data cube structure from natural language using AI/LLM"""
-    logger.info("generate_data_cube_ai called", extra={
-        "data_source_id": request.data_source_id,
-        "user_request_length": len(request.user_request)
-    })
-    
+def _load_generation_source(data_source_id: str, db: Session):
+    """Data source, data source info, schema and schema version for generation"""
     # Verify data source exists
-    db_source = db.query(DataSource).filter(DataSource.id == request.data_source_id).first()
+    db_source = db.query(DataSource).filter(DataSource.id == data_source_id).first()
     if not db_source:
-        logger.warning("Data source not found", extra={"data_source_id": request.data_source_id})
+        logger.warning("Data source not found", extra={"data_source_id": data_source_id})
         raise HTTPException(status_code=404, detail="Data source not found")
     
     # Get schema directly from data source (includes both tables and views)
-    # For BigQuery, this fetches live schema including views
+    # For BigQuery, this fetches live schema including views (cached briefly)
     # For other sources, this uses cached schema
-    available_tables = []
-    
-    # For BigQuery, fetch schema directly (includes views)
-    if db_source.type == DataSourceType.bigquery:
-        try:
-            from google.cloud import bigquery
-            from google.oauth2 import service_account
-            from google.auth.exceptions import DefaultCredentialsError
-            import json as json_lib
-            import os
-            
-            if not db_source.dataset:
-                raise HTTPException(
-                    status_code=400,
-                    detail="BigQuery dataset is not configured for this data source"
-                )
-            
-            project = db_source.project_id or db_source.host
-            dataset_name = db_source.dataset
-            
-            # Get credentials
-            credentials = None
-            if db_source.password:
-                try:
-                    service_account_info = json_lib.loads(db_source.password)
-                    credentials = service_account.Credentials.from_service_account_info(service_account_info)
-                except json_lib.JSONDecodeError:
-                    raise HTTPException(status_code=400, detail="Invalid service account key JSON")
-            
-            # Create BigQuery client
-            if credentials:
-                client = bigquery.Client(
-                    credentials=credentials,
-                    project=project,
-                    location=db_source.location,
-                )
-            else:
-                client = bigquery.Client(
-                    project=project,
-                    location=db_source.location,
-                )
-            
-            # Query INFORMATION_SCHEMA.COLUMNS to get both tables and views
-            columns_query = f"""
-                SELECT
-                  table_name,
-                  column_name,
-                  data_type,
-                  is_nullable,
-                  ordinal_position
-                FROM `{project}.{dataset_name}`.INFORMATION_SCHEMA.COLUMNS
-                ORDER BY table_name, ordinal_position
-            """
-            
-            logger.info("Querying BigQuery INFORMATION_SCHEMA for tables and views", extra={
-                "data_source_id": request.data_source_id,
-                "project": project,
-                "dataset": dataset_name,
-            })
-            
-            columns_result = list(client.query(columns_query))
-            
-            tables_map: dict[str, dict] = {}
-            for row in columns_result:
-                table_name = row["table_name"]
-                column_name = row["column_name"]
-                data_type = row["data_type"]
-                
-                if table_name not in tables_map:
-                    tables_map[table_name] = {
-                        "name": table_name,
-                        "schema": dataset_name,
-                        "columns": [],
-                        "row_count": 0,
-                        "description": None,
-                    }
-                
-                tables_map[table_name]["columns"].append({
-                    "name": column_name,
-                    "type": data_type,
-                    "primary_key": False,
-                    "description": None
-                })
-            
-            available_tables = list(tables_map.values())
-            logger.info("Fetched BigQuery schema", extra={
-                "data_source_id": request.data_source_id,
-                "table_count": len(available_tables)
-            })
-            
-        except Exception as e:
-            logger.exception("Error fetching BigQuery schema", extra={
-                "data_source_id": request.data_source_id,
-                "error": str(e)
-            })
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to fetch BigQuery schema: {str(e)}"
-            )
-    else:
-        # For other data sources, use cached schema from database
-        tables = db.query(Table).filter(Table.data_source_id == request.data_source_id).all()
-        logger.info("Found cached tables for data source", extra={
-            "data_source_id": request.data_source_id,
-            "table_count": len(tables)
-        })
-        
-        for table in tables:
-            columns_data = table.columns_json or []
-            columns = []
-            for col in columns_data:
-                columns.append({
-                    "name": col.get("name", ""),
-                    "type": col.get("type", ""),
-                    "primary_key": col.get("primary_key", False),
-                    "description": col.get("description", "")
-                })
-            
-            available_tables.append({
-                "name": table.name,
-                "schema": table.schema_name,
-                "columns": columns,
-                "row_count": table.row_count or 0
-            })
+    available_tables, schema_version = load_generation_schema(db, db_source)
     
     if not available_tables:
-        logger.warning("No tables or views found for data source", extra={"data_source_id": request.data_source_id})
+        logger.warning("No tables or views found for data source", extra={"data_source_id": data_source_id})
         raise HTTPException(
             status_code=400,
             detail="No tables or views found for this data source. Please sync the schema first or ensure the dataset has tables/views."
@@ -492,14 +418,122 @@ def generate_data_cube_ai(
         "host": db_source.host,
         "port": db_source.port
     }
+    return db_source, data_source_info, available_tables, schema_version
+
+
+def _select_generation_tables(data_source_id: str, user_request: str, available_tables, schema_version: str):
+    """Keep only the tables relevant to the request within the prompt token budget"""
+    selection = select_prompt_tables(user_request, available_tables, schema_version=schema_version)
+    logger.info("Selected schema tables for prompt", extra={
+        "data_source_id": data_source_id,
+        "tables_included": selection.included_tables,
+        "tables_total": selection.total_tables,
+        "estimated_tokens": selection.estimated_tokens,
+        "pruned": selection.pruned,
+    })
+    return selection
+
+
+def _load_generation_inputs(request: DataCubeGenerateRequest, db: Session):
+    """Data source, data source info, schema and prompt table selection for a generate request"""
+    with span("data_cubes.load_generation_source", data_source_id=request.data_source_id):
+        db_source, data_source_info, available_tables, schema_version = _load_generation_source(
+            request.data_source_id, db
+        )
+    with span("data_cubes.select_tables", tables_total=len(available_tables)):
+        selection = _select_generation_tables(
+            request.data_source_id, request.user_request, available_tables, schema_version
+        )
+    return db_source, data_source_info, available_tables, schema_version, selection
+
+
+def _dry_run_estimator(db_source: DataSource):
+    """Function returning the bytes a query would scan on the data source, None without dry-run support"""
+    try:
+        if not connector_class_for(db_source.type.value).capabilities.dry_run:
+            return None
+    except UnsupportedWarehouseOperation:
+        return None
+    try:
+        return get_connector(db_source).dry_run
+    except WarehouseError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+def _generated_cube_response(generated_cube, selection) -> dict:
+    return {
+        "name": generated_cube.name,
+        "description": generated_cube.description,
+        "query": generated_cube.query,
+        "dimensions": generated_cube.dimensions,
+        "measures": generated_cube.measures,
+        "metadata": generated_cube.metadata or {},
+        "tables_included": selection.included_tables,
+        "tables_total": selection.total_tables,
+    }
+
+
+@router.post("/generate", response_model=DataCubeGenerateResponse)
+async def generate_data_cube_ai(
+    request: DataCubeGenerateRequest,
+    db: Session = Depends(get_db),
+    llm_usage: LLMCallContext = Depends(track_llm_usage)
+):
+    """Generate a data cube structure from natural language using AI/LLM"""
+    llm_usage.data_source_id = request.data_source_id
+    logger.info("generate_data_cube_ai called", extra={
+        "data_source_id": request.data_source_id,
+        "user_request_length": len(request.user_request)
+    })
+    
+    # Database/schema work runs in the threadpool; the LLM wait below holds no thread
+    db_source, data_source_info, available_tables, schema_version, selection = await run_in_threadpool(
+        _load_generation_inputs, request, db
+    )
+    candidates = request.candidates or GENERATE_CANDIDATES
     
     try:
+        if candidates > 1 or request.dry_run:
+            estimate_cost = None
+            if request.dry_run:
+                estimate_cost = await run_in_threadpool(_dry_run_estimator, db_source)
+            logger.info("Calling generate_data_cube_candidates with LLM", extra={
+                "candidates": candidates,
+                "dry_run": estimate_cost is not None,
+            })
+            result = await agenerate_data_cube_candidates(
+                user_request=request.user_request,
+                data_source_info=data_source_info,
+                available_tables=available_tables,
+                candidates=candidates,
+                estimate_cost=estimate_cost,
+                schema_version=schema_version,
+                selection=selection,
+            )
+            logger.info("Selected data cube candidate", extra={
+                "cube_name": result.cube.name,
+                "candidates_generated": len(result.candidates),
+                "candidates_valid": result.valid_count,
+                "chosen_index": result.chosen.index,
+                "estimated_bytes_processed": result.chosen.cost,
+            })
+            response = _generated_cube_response(result.cube, selection)
+            response.update({
+                "candidates_generated": len(result.candidates),
+                "candidates_valid": result.valid_count,
+                "validation_errors": result.chosen.problems,
+                "estimated_bytes_processed": result.chosen.cost,
+            })
+            return response
+
         logger.info("Calling generate_data_cube with LLM")
         # Generate data cube using LLM (no persistence here)
-        generated_cube = generate_data_cube(
+        generated_cube = await agenerate_data_cube(
             user_request=request.user_request,
             data_source_info=data_source_info,
-            available_tables=available_tables
+            available_tables=available_tables,
+            schema_version=schema_version,
+            selection=selection,
         )
         
         logger.info("Successfully generated data cube", extra={
@@ -509,14 +543,10 @@ def generate_data_cube_ai(
         })
         
         # Return only the generated structure; persistence is handled separately
-        return {
-            "name": generated_cube.name,
-            "description": generated_cube.description,
-            "query": generated_cube.query,
-            "dimensions": generated_cube.dimensions,
-            "measures": generated_cube.measures,
-            "metadata": generated_cube.metadata or {},
-        }
+        return _generated_cube_response(generated_cube, selection)
+    except LLMUnavailableError as e:
+        logger.error("LLM backend unavailable in generate_data_cube", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         logger.error("ValueError in generate_data_cube", extra={"error": str(e)})
         raise HTTPException(status_code=400, detail=str(e))
@@ -530,6 +560,210 @@ def generate_data_cube_ai(
             detail=f"Failed to generate data cube: {str(e)}"
         )
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/generate/stream")
+def generate_data_cube_ai_stream(
+    request: DataCubeGenerateRequest,
+    db: Session = Depends(get_db),
+    llm_usage: LLMCallContext = Depends(track_llm_usage)
+):
+    """
+    Streaming variant of /generate, as Server-Sent Events.
+
+    Events: `schema` (tables sent to the model), `delta` (a chunk of raw model output),
+    `repair` (streamed output was invalid and is being repaired; discard it), then either
+    `result` (the validated cube, same shape as /generate plus `cached`) or `error`
+    (`status` and `detail`, as /generate would have returned them).
+    """
+    llm_usage.data_source_id = request.data_source_id
+    logger.info("generate_data_cube_ai_stream called", extra={
+        "data_source_id": request.data_source_id,
+        "user_request_length": len(request.user_request)
+    })
+    
+    # Lookup/schema errors are still plain HTTP errors; only the LLM part is streamed
+    _, data_source_info, available_tables, schema_version, selection = _load_generation_inputs(request, db)
+    
+    def events():
+        yield _sse_event("schema", {
+            "tables_included": selection.included_tables,
+            "tables_total": selection.total_tables,
+        })
+        streamed = False
+        try:
+            for event, payload in stream_data_cube(
+                user_request=request.user_request,
+                data_source_info=data_source_info,
+                available_tables=available_tables,
+                schema_version=schema_version,
+                selection=selection,
+            ):
+                if event == "delta":
+                    streamed = True
+                    yield _sse_event("delta", {"text": payload})
+                elif event == "repair":
+                    # Streamed output failed validation; the result comes from a repair call
+                    yield _sse_event("repair", {"detail": payload})
+                else:
+                    logger.info("Successfully generated data cube (stream)", extra={
+                        "cube_name": payload.name,
+                        "cached": not streamed,
+                    })
+                    body = _generated_cube_response(payload, selection)
+                    body["cached"] = not streamed
+                    yield _sse_event("result", body)
+        except LLMUnavailableError as e:
+            logger.error("LLM backend unavailable in stream_data_cube", extra={"error": str(e)})
+            yield _sse_event("error", {"status": 503, "detail": str(e)})
+        except ValueError as e:
+            logger.error("ValueError in stream_data_cube", extra={"error": str(e)})
+            yield _sse_event("error", {"status": 400, "detail": str(e)})
+        except Exception as e:
+            logger.exception("Unexpected error in generate_data_cube_ai_stream", extra={
+                "error": str(e),
+                "error_type": type(e).__name__
+            })
+            yield _sse_event("error", {"status": 500, "detail": f"Failed to generate data cube: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/generate/batch", response_model=dict)
+async def generate_data_cubes_batch(
+    request: DataCubeBatchGenerateRequest,
+    db: Session = Depends(get_db),
+    llm_usage: LLMCallContext = Depends(track_llm_usage),
+    user_id: str = Depends(get_user_id)
+):
+    """Generate one data cube per request against the same data source (e.g. starter cubes).
+
+    The schema is loaded and rendered once for the whole batch and generations run
+    concurrently (at most BATCH_GENERATE_CONCURRENCY at a time). Each item reports its own
+    result or error; one failed item does not fail the batch. With `persist`, all
+    successful cubes are saved in a single transaction, readable and writable by the caller.
+    """
+    if len(request.user_requests) > MAX_BATCH_GENERATE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch contains {len(request.user_requests)} requests; the limit is {MAX_BATCH_GENERATE}"
+        )
+    llm_usage.data_source_id = request.data_source_id
+    logger.info("generate_data_cubes_batch called", extra={
+        "data_source_id": request.data_source_id,
+        "request_count": len(request.user_requests),
+        "persist": request.persist,
+    })
+    
+    db_source, data_source_info, available_tables, schema_version = await run_in_threadpool(
+        _load_generation_source, request.data_source_id, db
+    )
+    selections = await run_in_threadpool(lambda: [
+        _select_generation_tables(request.data_source_id, user_request, available_tables, schema_version)
+        for user_request in request.user_requests
+    ])
+    
+    limit = asyncio.Semaphore(BATCH_GENERATE_CONCURRENCY)
+    
+    async def generate_one(index: int, user_request: str, selection) -> dict:
+        item = {"index": index, "user_request": user_request}
+        async with limit:
+            try:
+                generated_cube = await agenerate_data_cube(
+                    user_request=user_request,
+                    data_source_info=data_source_info,
+                    available_tables=available_tables,
+                    schema_version=schema_version,
+                    selection=selection,
+                )
+            except LLMUnavailableError as e:
+                item.update({"status": "error", "error": {"status": 503, "detail": str(e)}})
+                return item
+            except ValueError as e:
+                item.update({"status": "error", "error": {"status": 400, "detail": str(e)}})
+                return item
+            except Exception as e:
+                logger.exception("Unexpected error in batch generation item", extra={
+                    "index": index,
+                    "error": str(e),
+                    "error_type": type(e).__name__
+                })
+                item.update({"status": "error", "error": {"status": 500, "detail": f"Failed to generate data cube: {str(e)}"}})
+                return item
+        item.update({"status": "ok", "cube": _generated_cube_response(generated_cube, selection)})
+        return item
+    
+    results = await asyncio.gather(*(
+        generate_one(index, user_request, selection)
+        for index, (user_request, selection) in enumerate(zip(request.user_requests, selections))
+    ))
+    succeeded = [item for item in results if item["status"] == "ok"]
+    
+    persisted = 0
+    if request.persist and succeeded:
+        ids = await run_in_threadpool(
+            _persist_generated_cubes, db, db_source.id, user_id, [item["cube"] for item in succeeded]
+        )
+        for item, cube_id in zip(succeeded, ids):
+            item["id"] = cube_id
+        persisted = len(ids)
+    
+    logger.info("Batch generation finished", extra={
+        "data_source_id": request.data_source_id,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "persisted": persisted,
+    })
+    return {
+        "data_source_id": request.data_source_id,
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "persisted": persisted,
+        "results": results,
+    }
+
+def _persist_generated_cubes(db: Session, data_source_id: str, user_id: str, cubes: list) -> list:
+    """Insert generated cubes and the caller's grants on them in one transaction; returns their ids"""
+    rows = [{
+        "id": f"cube-{uuid.uuid4().hex[:12]}",
+        "name": cube["name"],
+        "description": cube["description"],
+        "query": cube["query"],
+        "data_source_id": data_source_id,
+        "dimensions_json": cube["dimensions"],
+        "measures_json": cube["measures"],
+        "metadata_json": cube["metadata"],
+    } for cube in cubes]
+    try:
+        db.execute(insert(DataCube), rows)
+        grant_owner_access(db, user_id, ResourceType.dataCube, *(row["id"] for row in rows))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Failed to persist generated data cubes", extra={
+            "cube_count": len(rows),
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        raise HTTPException(status_code=500, detail=f"Failed to save generated data cubes: {str(e)}")
+    bump_acl_version(user_id)
+    return [row["id"] for row in rows]
+
+@router.get("/generate/cache-stats", response_model=dict)
+def get_generation_cache_stats():
+    """Hit/miss counters for the data cube generation response cache"""
+    return get_response_cache().stats()
+
+@router.get("/generate/output-stats", response_model=dict)
+def get_generation_output_stats():
+    """Structured output parse outcomes (first try / repaired / failed) and their rates"""
+    return structured_output_stats()
+
 @router.post("/query", response_model=DataCubeQueryResponse)
 def query_data_cube(
     query_request: DataCubeQuery,
@@ -545,8 +779,6 @@ def query_data_cube(
     # In production, this could use full-text search or AI/LLM to convert
     # natural language to SQL queries
     
-    db.expire_all()
-    
     # Search for data cubes matching the query string
     # MySQL uses LIKE (case-insensitive by default) or we can use LOWER() for explicit case-insensitive search
     search_term = f"%{query_request.query}%"
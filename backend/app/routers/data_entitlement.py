@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, update, delete, and_, or_
 from typing import Optional
-from ..database import get_db
-from ..models import DataEntitlement, DataSource, DataCube, Dashboard
-from ..schemas import DataEntitlementCreate, EntitledResource
+from ..database import ReadSession, get_db, get_read_db
+from ..models import DataEntitlement, DataCube, RowLevelPolicy, RowFilterOperator
+from ..schemas import (
+    DataEntitlementCreate, EntitledResource, DataEntitlementBulkGrant, DataEntitlementBulkRevoke,
+    RowLevelPolicyCreate, RowLevelPolicyResponse,
+)
+from ..entitlements import resolve_resource_names, fallback_resource_name, bump_acl_version
+from ..serialization import model_response
 from datetime import datetime
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on users x resources per bulk request
+MAX_BULK_ENTITLEMENTS = int(os.getenv("MAX_BULK_ENTITLEMENTS", "50000"))
 
 router = APIRouter(prefix="/api/data-entitlement", tags=["data-entitlement"])
 
@@ -13,27 +27,29 @@ def get_user_id(x_user_id: Optional[str] = Header(None, alias="x-user-id")) -> s
     return x_user_id or "user-1"
 
 @router.get("", response_model=list[EntitledResource])
-def get_entitlements(
-    db: Session = Depends(get_db),
+async def get_entitlements(
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
     user_id: str = Depends(get_user_id)
 ):
     """Get all entitlements for the current user"""
+    return await model_response(request, list[EntitledResource], await db.run(_list_entitlements, user_id))
+
+
+def _list_entitlements(db: Session, user_id: str):
     entitlements = db.query(DataEntitlement).filter(DataEntitlement.user_id == user_id).all()
     
+    # Resolve all resource names up front: one IN query per resource type (cached briefly)
+    resource_names = resolve_resource_names(
+        db, [(ent.resource_type, ent.resource_id) for ent in entitlements]
+    )
+    
     entitled_resources = []
     
     for ent in entitlements:
-        resource_name = "Unknown Resource"
-        
-        if ent.resource_type == "dataSource":
-            resource = db.query(DataSource).filter(DataSource.id == ent.resource_id).first()
-            resource_name = resource.name if resource else f"Data Source {ent.resource_id}"
-        elif ent.resource_type == "dataCube":
-            resource = db.query(DataCube).filter(DataCube.id == ent.resource_id).first()
-            resource_name = resource.name if resource else f"Data Cube {ent.resource_id}"
-        elif ent.resource_type == "dashboard":
-            resource = db.query(Dashboard).filter(Dashboard.id == ent.resource_id).first()
-            resource_name = resource.name if resource else f"Dashboard {ent.resource_id}"
+        resource_name = resource_names.get((ent.resource_type, ent.resource_id))
+        if resource_name is None:
+            resource_name = fallback_resource_name(ent.resource_type, ent.resource_id)
         
         entitled_resources.append({
             "resourceType": ent.resource_type,
@@ -51,8 +67,6 @@ def create_entitlement(
     db: Session = Depends(get_db)
 ):
     """Create a new data entitlement"""
-    import uuid
-    
     entitlement_id = f"ent-{uuid.uuid4().hex[:12]}"
     
     db_entitlement = DataEntitlement(
@@ -67,6 +81,7 @@ def create_entitlement(
     db.add(db_entitlement)
     db.commit()
     db.refresh(db_entitlement)
+    bump_acl_version(db_entitlement.user_id)
     
     return {
         "id": db_entitlement.id,
@@ -88,7 +103,243 @@ def delete_entitlement(
     if not entitlement:
         raise HTTPException(status_code=404, detail="Entitlement not found")
     
+    user_id = entitlement.user_id
     db.delete(entitlement)
     db.commit()
+    bump_acl_version(user_id)
+    
+    return None
+
+def _bulk_resource_filter(resources):
+    """WHERE clause matching any of the (resource_type, resource_id) pairs: one IN per resource type"""
+    ids_by_type: dict = {}
+    for ref in resources:
+        ids_by_type.setdefault(ref.resource_type, set()).add(ref.resource_id)
+    return or_(*[
+        and_(DataEntitlement.resource_type == resource_type, DataEntitlement.resource_id.in_(ids))
+        for resource_type, ids in ids_by_type.items()
+    ])
+
+def _check_bulk_size(user_ids: set, resources: set):
+    requested = len(user_ids) * len(resources)
+    if requested > MAX_BULK_ENTITLEMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bulk request covers {requested} grants; the limit is {MAX_BULK_ENTITLEMENTS}"
+        )
+    return requested
+
+@router.post("/bulk-grant", response_model=dict)
+def bulk_grant_entitlements(
+    request: DataEntitlementBulkGrant,
+    db: Session = Depends(get_db)
+):
+    """Grant permissions on many resources to many users in a single transaction.
+
+    Users without a grant on a resource get a new one (granted). Users whose grants on
+    a resource lack some of the requested permissions get them merged into an existing
+    grant (updated). Users who already hold all of them are left untouched (skipped).
+    """
+    user_ids = set(request.user_ids)
+    resources = {(ref.resource_type, ref.resource_id) for ref in request.resources}
+    requested = _check_bulk_size(user_ids, resources)
+    
+    # (user, type, id) -> (one of its grant ids, permissions held across all of its grants)
+    existing: dict = {}
+    for row in db.query(
+        DataEntitlement.id, DataEntitlement.user_id, DataEntitlement.resource_type,
+        DataEntitlement.resource_id, DataEntitlement.permissions_json,
+    ).filter(
+        DataEntitlement.user_id.in_(user_ids),
+        _bulk_resource_filter(request.resources),
+    ).order_by(DataEntitlement.id):
+        key = (row.user_id, row.resource_type, row.resource_id)
+        grant_id, held = existing.get(key, (row.id, []))
+        existing[key] = (grant_id, list(dict.fromkeys(held + list(row.permissions_json or []))))
+    
+    permissions = list(dict.fromkeys(p.value for p in request.permissions))
+    rows, update_rows = [], []
+    for user_id in sorted(user_ids):
+        for resource_type, resource_id in sorted(resources):
+            key = (user_id, resource_type, resource_id)
+            if key not in existing:
+                rows.append({
+                    "id": f"ent-{uuid.uuid4().hex[:12]}",
+                    "user_id": user_id,
+                    "resource_type": resource_type,
+                    "resource_id": resource_id,
+                    "permissions_json": permissions,
+                    "granted_by": request.granted_by,
+                })
+                continue
+            grant_id, held = existing[key]
+            if not set(permissions) <= set(held):
+                update_rows.append({"id": grant_id, "permissions_json": list(dict.fromkeys(held + permissions))})
+    
+    try:
+        if rows:
+            # executemany -> multi-row INSERT statements, all in one transaction
+            db.execute(insert(DataEntitlement), rows)
+        if update_rows:
+            # ORM bulk UPDATE by primary key (executemany)
+            db.execute(update(DataEntitlement), update_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Bulk entitlement grant failed", extra={"error": str(e), "requested": requested})
+        raise HTTPException(status_code=500, detail=f"Failed to grant entitlements: {str(e)}")
+    
+    bump_acl_version(*user_ids)
+    skipped = requested - len(rows) - len(update_rows)
+    logger.info("Bulk entitlement grant completed", extra={
+        "requested": requested,
+        "granted": len(rows),
+        "updated": len(update_rows),
+        "skipped": skipped,
+    })
+    
+    return {
+        "requested": requested,
+        "granted": len(rows),
+        "updated": len(update_rows),
+        "skipped": skipped,
+    }
+
+@router.post("/bulk-revoke", response_model=dict)
+def bulk_revoke_entitlements(
+    request: DataEntitlementBulkRevoke,
+    db: Session = Depends(get_db)
+):
+    """Revoke permissions of the given users on the given resources in a single transaction.
+
+    Without `permissions`, every matching grant is removed with a single DELETE. With
+    them, only those permissions are removed: grants left with none are deleted
+    (revoked), the others keep their remaining permissions (updated).
+    """
+    user_ids = set(request.user_ids)
+    resources = {(ref.resource_type, ref.resource_id) for ref in request.resources}
+    requested = _check_bulk_size(user_ids, resources)
+    matching = and_(DataEntitlement.user_id.in_(user_ids), _bulk_resource_filter(request.resources))
+    
+    delete_ids, update_rows = None, []
+    if request.permissions is not None:
+        removed = {p.value for p in request.permissions}
+        delete_ids = []
+        for row in db.query(DataEntitlement.id, DataEntitlement.permissions_json).filter(matching):
+            held = list(row.permissions_json or [])
+            remaining = [p for p in held if p not in removed]
+            if not remaining:
+                delete_ids.append(row.id)
+            elif len(remaining) < len(held):
+                update_rows.append({"id": row.id, "permissions_json": remaining})
+    
+    try:
+        if delete_ids is None:
+            revoked = db.execute(
+                delete(DataEntitlement).where(matching).execution_options(synchronize_session=False)
+            ).rowcount
+        else:
+            revoked = len(delete_ids)
+            if delete_ids:
+                db.execute(
+                    delete(DataEntitlement)
+                    .where(DataEntitlement.id.in_(delete_ids))
+                    .execution_options(synchronize_session=False)
+                )
+            if update_rows:
+                # ORM bulk UPDATE by primary key (executemany)
+                db.execute(update(DataEntitlement), update_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Bulk entitlement revoke failed", extra={"error": str(e), "requested": requested})
+        raise HTTPException(status_code=500, detail=f"Failed to revoke entitlements: {str(e)}")
+    
+    bump_acl_version(*user_ids)
+    logger.info("Bulk entitlement revoke completed", extra={
+        "requested": requested,
+        "revoked": revoked,
+        "updated": len(update_rows),
+    })
+    
+    return {
+        "requested": requested,
+        "revoked": revoked,
+        "updated": len(update_rows),
+    }
+
+def _row_policy_response(policy: RowLevelPolicy) -> dict:
+    return {
+        "id": policy.id,
+        "user_id": policy.user_id,
+        "data_cube_id": policy.data_cube_id,
+        "column": policy.column_name,
+        "operator": policy.operator,
+        "values": policy.values_json or [],
+        "granted_by": policy.granted_by,
+        "createdAt": policy.created_at.isoformat() if policy.created_at else datetime.now().isoformat()
+    }
+
+@router.get("/row-policies", response_model=list[RowLevelPolicyResponse])
+def get_row_policies(
+    user_id: Optional[str] = None,
+    data_cube_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """List row-level security policies, optionally filtered by user and/or data cube"""
+    query = db.query(RowLevelPolicy)
+    if user_id:
+        query = query.filter(RowLevelPolicy.user_id == user_id)
+    if data_cube_id:
+        query = query.filter(RowLevelPolicy.data_cube_id == data_cube_id)
+    return [_row_policy_response(policy) for policy in query.all()]
+
+@router.post("/row-policies", response_model=RowLevelPolicyResponse, status_code=201)
+def create_row_policy(
+    policy: RowLevelPolicyCreate,
+    db: Session = Depends(get_db)
+):
+    """Restrict the rows a user can see in a data cube"""
+    value_types = {type(value) for value in policy.values}
+    if len(value_types) > 1:
+        raise HTTPException(status_code=400, detail="Row policy values must all have the same type")
+    if policy.operator not in (RowFilterOperator.in_, RowFilterOperator.not_in) and len(policy.values) != 1:
+        raise HTTPException(status_code=400, detail=f"Operator '{policy.operator.value}' takes exactly one value")
+    
+    if not db.query(DataCube.id).filter(DataCube.id == policy.data_cube_id).first():
+        raise HTTPException(status_code=404, detail="Data cube not found")
+    
+    db_policy = RowLevelPolicy(
+        id=f"rls-{uuid.uuid4().hex[:12]}",
+        user_id=policy.user_id,
+        data_cube_id=policy.data_cube_id,
+        column_name=policy.column,
+        operator=policy.operator.value,
+        values_json=policy.values,
+        granted_by=policy.granted_by
+    )
+    
+    db.add(db_policy)
+    db.commit()
+    db.refresh(db_policy)
+    # Compiled row filters are cached by entitlement version
+    bump_acl_version(db_policy.user_id)
+    
+    return _row_policy_response(db_policy)
+
+@router.delete("/row-policies/{policy_id}", status_code=204)
+def delete_row_policy(
+    policy_id: str,
+    db: Session = Depends(get_db)
+):
+    """Delete a row-level security policy"""
+    policy = db.query(RowLevelPolicy).filter(RowLevelPolicy.id == policy_id).first()
+    if not policy:
+        raise HTTPException(status_code=404, detail="Row policy not found")
+    
+    user_id = policy.user_id
+    db.delete(policy)
+    db.commit()
+    bump_acl_version(user_id)
     
     return None
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, Request
 from sqlalchemy.orm import Session
 from typing import Optional
-from ..database import get_db
-from ..models import DataSource, DataCube, Dashboard, Table
+from ..database import ReadSession, get_read_db
+from ..models import DataSource, DataCube, Dashboard, Table, ResourceType
 from ..schemas import DataMarketplaceResponse, DataSourceResponse, DataCubeResponse, DashboardResponse, TableSchema, ColumnSchema
+from ..entitlements import visible_resource_ids
+from ..serialization import model_response
 from datetime import datetime
 import logging
 
@@ -16,21 +18,37 @@ def get_user_id(x_user_id: Optional[str] = Header(None, alias="x-user-id")) -> s
     return x_user_id or "user-1"
 
 @router.get("", response_model=DataMarketplaceResponse)
-def get_marketplace(
-    db: Session = Depends(get_db),
+async def get_marketplace(
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
     user_id: str = Depends(get_user_id)
 ):
-    """Get all resources for the data marketplace (filtered by entitlements)"""
+    """Get all resources for the data marketplace the user is entitled to read"""
+    return await model_response(request, DataMarketplaceResponse, await db.run(_load_marketplace, user_id))
+
+
+def _load_marketplace(db: Session, user_id: str):
     logger.info("=" * 50)
     logger.info("BACKEND: GET /api/data-marketplace endpoint called", extra={"user_id": user_id})
     logger.info("=" * 50)
     
-    # Get all data sources with their tables
-    data_sources = db.query(DataSource).all()
+    # Get the visible data sources with their tables (one tables query for all sources)
+    sources_query = db.query(DataSource)
+    visible_source_ids = visible_resource_ids(db, user_id, ResourceType.dataSource)
+    if visible_source_ids is not None:
+        sources_query = sources_query.filter(DataSource.id.in_(visible_source_ids))
+    data_sources = sources_query.all()
+    
+    tables_by_source: dict[str, list] = {}
+    if data_sources:
+        source_tables = db.query(Table).filter(Table.data_source_id.in_([s.id for s in data_sources])).all()
+        for table in source_tables:
+            tables_by_source.setdefault(table.data_source_id, []).append(table)
+    
     data_sources_list = []
     
     for source in data_sources:
-        tables = db.query(Table).filter(Table.data_source_id == source.id).all()
+        tables = tables_by_source.get(source.id, [])
         tables_list = []
         
         for table in tables:
@@ -63,14 +81,13 @@ def get_marketplace(
         data_sources_list.append(source_dict)
     
     # Get all data cubes from MySQL database
-    # Use explicit query to ensure we're reading committed data
-    # Expire any cached objects to force fresh query
     try:
-        # Ensure we're reading from the database, not session cache
-        db.expire_all()
-        
-        # Query all data cubes ordered by creation date
-        data_cubes = db.query(DataCube).order_by(DataCube.created_at.desc()).all()
+        # Query the visible data cubes ordered by creation date
+        cubes_query = db.query(DataCube)
+        visible_cube_ids = visible_resource_ids(db, user_id, ResourceType.dataCube)
+        if visible_cube_ids is not None:
+            cubes_query = cubes_query.filter(DataCube.id.in_(visible_cube_ids))
+        data_cubes = cubes_query.order_by(DataCube.created_at.desc()).all()
         
         logger.info("Querying data cubes from database", extra={
             "cube_count": len(data_cubes),
@@ -116,8 +133,12 @@ def get_marketplace(
         "cube_ids": [c["id"] for c in data_cubes_list]
     })
     
-    # Get all dashboards
-    dashboards = db.query(Dashboard).all()
+    # Get the visible dashboards
+    dashboards_query = db.query(Dashboard)
+    visible_dashboard_ids = visible_resource_ids(db, user_id, ResourceType.dashboard)
+    if visible_dashboard_ids is not None:
+        dashboards_query = dashboards_query.filter(Dashboard.id.in_(visible_dashboard_ids))
+    dashboards = dashboards_query.all()
     dashboards_list = []
     for dashboard in dashboards:
         dashboards_list.append({
@@ -130,9 +151,6 @@ def get_marketplace(
             "updatedAt": dashboard.updated_at.isoformat() if dashboard.updated_at else datetime.now().isoformat()
         })
     
-    # TODO: Filter by entitlements based on user_id
-    # For now, return all resources
-    
     logger.info("Marketplace data prepared", extra={
         "data_sources_count": len(data_sources_list),
         "data_cubes_count": len(data_cubes_list),
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from sqlalchemy.orm import Session
 from typing import Optional
-from ..database import get_db
-from ..models import DataSource, Table, DataSourceType, DataSourceStatus
+from ..database import ReadSession, get_db, get_read_db
+from ..models import DataSource, Table, DataSourceType, DataSourceStatus, ResourceType
 from ..schemas import (
     DataSourceCreate,
     DataSourceResponse,
@@ -12,11 +12,13 @@ from ..schemas import (
     SqlPreviewRequest,
     SqlPreviewResponse,
 )
+from ..entitlements import bump_acl_version, grant_owner_access, invalidate_resource_names, visible_resource_ids
+from ..serialization import model_response
+from ..schema_cache import invalidate_generation_schema
+from ..warehouse import WarehouseError, WarehousePermissionError, get_connector, invalidate_connector
 from datetime import datetime
 import uuid
-import json
 import tempfile
-import os
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,15 +30,21 @@ def get_user_id(x_user_id: Optional[str] = Header(None, alias="x-user-id")) -> s
     return x_user_id or "user-1"
 
 @router.get("", response_model=list[DataSourceResponse])
-def get_data_sources(
-    db: Session = Depends(get_db),
+async def get_data_sources(
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
     user_id: str = Depends(get_user_id)
 ):
-    """Get all data sources (filtered by entitlements in production)"""
-    data_sources = db.query(DataSource).all()
-    
-    # TODO: Filter by entitlements based on user_id
-    # For now, return all data sources
+    """Get all data sources the user is entitled to read"""
+    return await model_response(request, list[DataSourceResponse], await db.run(_list_data_sources, user_id))
+
+
+def _list_data_sources(db: Session, user_id: str):
+    query = db.query(DataSource)
+    visible_ids = visible_resource_ids(db, user_id, ResourceType.dataSource)
+    if visible_ids is not None:
+        query = query.filter(DataSource.id.in_(visible_ids))
+    data_sources = query.all()
     
     # Format response to match frontend expectations
     result = []
@@ -61,9 +69,10 @@ def get_data_sources(
 @router.post("", response_model=DataSourceResponse, status_code=201)
 def create_data_source(
     data_source: DataSourceCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_user_id)
 ):
-    """Create a new data source"""
+    """Create a new data source, readable and writable by its creator"""
     source_id = f"source-{uuid.uuid4().hex[:12]}"
     
     db_source = DataSource(
@@ -82,8 +91,10 @@ def create_data_source(
     )
     
     db.add(db_source)
+    grant_owner_access(db, user_id, ResourceType.dataSource, source_id)
     db.commit()
     db.refresh(db_source)
+    bump_acl_version(user_id)
     
     # Format response to match frontend expectations
     return {
@@ -117,125 +128,16 @@ def get_data_source_schema(
 
     # Live schema inspection for BigQuery
     if db_source.type == DataSourceType.bigquery:
+        logger.info("Introspecting BigQuery schema for get_data_source_schema", extra={
+            "source_id": db_source.id,
+            "project": db_source.project_id or db_source.host,
+            "dataset": db_source.dataset,
+            "location": db_source.location,
+            "inline_credentials": bool(db_source.password),
+        })
         try:
-            from google.cloud import bigquery
-            from google.oauth2 import service_account
-            from google.auth.exceptions import DefaultCredentialsError
-            from google.api_core.exceptions import Forbidden
-        except ImportError:
-            logger.exception("google-cloud-bigquery not installed during get_data_source_schema")
-            raise HTTPException(
-                status_code=500,
-                detail="google-cloud-bigquery library not installed. Install with: pip install google-cloud-bigquery"
-            )
-
-        if not db_source.dataset:
-            raise HTTPException(
-                status_code=400,
-                detail="BigQuery dataset is not configured for this data source"
-            )
-
-        project = db_source.project_id or db_source.host
-        dataset_name = db_source.dataset
-
-        try:
-            credentials = None
-
-            # Prefer inline service account JSON from the data source if present,
-            # otherwise fall back to Application Default Credentials (e.g. GOOGLE_APPLICATION_CREDENTIALS)
-            if db_source.password:
-                logger.info("BigQuery get_data_source_schema using inline service account key", extra={
-                    "source_id": db_source.id,
-                })
-                try:
-                    service_account_info = json.loads(db_source.password)
-                except json.JSONDecodeError:
-                    logger.exception("Failed to parse BigQuery service account JSON during get_data_source_schema")
-                    raise HTTPException(status_code=400, detail="Invalid service account key JSON")
-
-                credentials = service_account.Credentials.from_service_account_info(service_account_info)
-            else:
-                logger.info("BigQuery get_data_source_schema using default credentials from environment", extra={
-                    "source_id": db_source.id,
-                    "env_has_google_application_credentials": bool(os.getenv("GOOGLE_APPLICATION_CREDENTIALS")),
-                })
-
-            logger.info("Creating BigQuery client for get_data_source_schema", extra={
-                "source_id": db_source.id,
-                "project": project,
-                "dataset": dataset_name,
-                "location": db_source.location,
-            })
-
-            if credentials is not None:
-                client = bigquery.Client(
-                    credentials=credentials,
-                    project=project,
-                    location=db_source.location,
-                )
-            else:
-                client = bigquery.Client(
-                    project=project,
-                    location=db_source.location,
-                )
-
-            # Use INFORMATION_SCHEMA so we also include views, not just physical tables
-            columns_query = f"""
-                SELECT
-                  table_name,
-                  column_name,
-                  data_type,
-                  is_nullable,
-                  ordinal_position
-                FROM `{project}.{dataset_name}`.INFORMATION_SCHEMA.COLUMNS
-                ORDER BY table_name, ordinal_position
-            """
-
-            logger.info("Querying BigQuery INFORMATION_SCHEMA.COLUMNS for get_data_source_schema", extra={
-                "source_id": db_source.id,
-                "project": project,
-                "dataset": dataset_name,
-            })
-
-            columns_result = list(client.query(columns_query))
-
-            tables_map: dict[str, dict] = {}
-
-            for row in columns_result:
-                table_name = row["table_name"]
-                column_name = row["column_name"]
-                data_type = row["data_type"]
-
-                if table_name not in tables_map:
-                    tables_map[table_name] = {
-                        "name": table_name,
-                        "schema": dataset_name,
-                        "columns": [],
-                        "rowCount": 0,  # Filled from TABLES view below if available
-                        "description": None,
-                    }
-
-                tables_map[table_name]["columns"].append({
-                    "name": column_name,
-                    "type": data_type,
-                    "primaryKey": False,  # BigQuery doesn't expose PKs in INFORMATION_SCHEMA
-                    "foreignKey": None,
-                    "description": None,
-                })
-
-            tables_list = list(tables_map.values())
-            return {"tables": tables_list}
-
-        except DefaultCredentialsError as e:
-            logger.error("BigQuery get_data_source_schema missing default credentials", extra={
-                "source_id": db_source.id,
-                "error": str(e),
-            })
-            raise HTTPException(
-                status_code=400,
-                detail="Service account credentials not found. Either provide a service account key in the data source or configure GOOGLE_APPLICATION_CREDENTIALS."
-            )
-        except Forbidden as e:
+            available_tables = get_connector(db_source).introspect()
+        except WarehousePermissionError as e:
             logger.error("BigQuery get_data_source_schema forbidden - missing jobs.create or dataset permissions", extra={
                 "source_id": db_source.id,
                 "error": str(e),
@@ -248,8 +150,12 @@ def get_data_source_schema(
                     "(e.g. roles/bigquery.jobUser or roles/bigquery.user) and read the dataset."
                 ),
             )
-        except HTTPException:
-            raise
+        except WarehouseError as e:
+            logger.error("BigQuery get_data_source_schema failed", extra={
+                "source_id": db_source.id,
+                "error": str(e),
+            })
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as e:
             logger.exception("Unexpected error during BigQuery get_data_source_schema", extra={
                 "source_id": db_source.id,
@@ -261,6 +167,27 @@ def get_data_source_schema(
                 detail=f"Failed to fetch BigQuery schema: {str(e)}"
             )
 
+        tables_list = [
+            {
+                "name": table["name"],
+                "schema": table["schema"],
+                "columns": [
+                    {
+                        "name": column["name"],
+                        "type": column["type"],
+                        "primaryKey": column["primary_key"],
+                        "foreignKey": None,
+                        "description": column["description"],
+                    }
+                    for column in table["columns"]
+                ],
+                "rowCount": table["row_count"],
+                "description": table["description"],
+            }
+            for table in available_tables
+        ]
+        return {"tables": tables_list}
+
     # Default: return cached schema from local `tables` table
     tables = db.query(Table).filter(Table.data_source_id == source_id).all()
 
@@ -300,6 +227,9 @@ def update_data_source(
     
     db.commit()
     db.refresh(db_source)
+    invalidate_resource_names(ResourceType.dataSource, source_id)
+    invalidate_generation_schema(source_id)
+    invalidate_connector(source_id)
     
     # Format response to match frontend expectations
     return {
@@ -329,6 +259,9 @@ def delete_data_source(
     
     db.delete(db_source)
     db.commit()
+    invalidate_resource_names(ResourceType.dataSource, source_id)
+    invalidate_generation_schema(source_id)
+    invalidate_connector(source_id)
     
     return None
 
@@ -364,7 +297,7 @@ def preview_sql(
 ):
     """
     Execute a SQL query against the given data source and return a small preview.
-    Currently supports BigQuery data sources.
+    Supported for every source type with a warehouse connector (BigQuery, PostgreSQL, MySQL).
     """
     logger.info("Starting preview_sql for data source", extra={
         "source_id": source_id,
@@ -376,105 +309,35 @@ def preview_sql(
         logger.warning("Data source not found during preview_sql", extra={"source_id": source_id})
         raise HTTPException(status_code=404, detail="Data source not found")
 
-    if db_source.type != DataSourceType.bigquery:
-        logger.warning("preview_sql not implemented for this data source type", extra={
-            "source_id": source_id,
-            "type": db_source.type.value if hasattr(db_source.type, "value") else str(db_source.type),
-        })
-        raise HTTPException(
-            status_code=400,
-            detail="SQL preview is currently only supported for BigQuery data sources."
-        )
-
     try:
-        from google.cloud import bigquery
-        from google.oauth2 import service_account
-        from google.auth.exceptions import DefaultCredentialsError
-    except ImportError:
-        logger.exception("google-cloud-bigquery not installed during preview_sql")
-        raise HTTPException(
-            status_code=500,
-            detail="google-cloud-bigquery library not installed. Install with: pip install google-cloud-bigquery"
-        )
-
-    try:
-        credentials = None
-
-        # Prefer inline service account JSON from the data source if present,
-        # otherwise fall back to Application Default Credentials
-        if db_source.password:
-            logger.info("preview_sql using inline service account key", extra={"source_id": db_source.id})
-            try:
-                service_account_info = json.loads(db_source.password)
-            except json.JSONDecodeError:
-                logger.exception("Failed to parse BigQuery service account JSON during preview_sql")
-                raise HTTPException(status_code=400, detail="Invalid service account key JSON")
-
-            credentials = service_account.Credentials.from_service_account_info(service_account_info)
-        else:
-            logger.info("preview_sql using default credentials from environment", extra={
-                "source_id": db_source.id,
-                "env_has_google_application_credentials": bool(os.getenv("GOOGLE_APPLICATION_CREDENTIALS")),
-            })
-
-        # Create BigQuery client
-        project = db_source.project_id or db_source.host
-        logger.info("Creating BigQuery client for preview_sql", extra={
-            "source_id": db_source.id,
-            "project": project,
-            "location": db_source.location,
-        })
-
-        if credentials is not None:
-            client = bigquery.Client(
-                credentials=credentials,
-                project=project,
-                location=db_source.location,
-            )
-        else:
-            client = bigquery.Client(
-                project=project,
-                location=db_source.location,
-            )
-
-        # Apply LIMIT if not already present, to avoid huge result sets
-        sql = request.sql.strip()
-        if "limit" not in sql.lower():
-            sql = f"{sql}\nLIMIT {request.max_rows}"
-
-        logger.info("Executing preview_sql query", extra={
+        connector = get_connector(db_source)
+    except WarehouseError as e:
+        logger.warning("preview_sql unavailable for this data source", extra={
             "source_id": source_id,
-            "sql_snippet": sql[:200],
+            "type": db_source.type.value if hasattr(db_source.type, "value") else str(db_source.type),
+            "error": str(e),
         })
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-        query_job = client.query(sql)
-        rows_iter = query_job.result(max_results=request.max_rows)
-        rows = list(rows_iter)
-
-        if not rows:
-            return SqlPreviewResponse(rows=[], columns=[])
+    # Apply LIMIT if not already present, to avoid huge result sets
+    sql = request.sql.strip()
+    if "limit" not in sql.lower():
+        sql = f"{sql}\nLIMIT {request.max_rows}"
 
-        # Convert rows to plain dicts
-        sample_row = rows[0]
-        columns = list(sample_row.keys())
-        data_rows = [dict(row) for row in rows]
-
-        logger.info("preview_sql query succeeded", extra={
-            "source_id": source_id,
-            "row_count": len(data_rows),
-            "column_count": len(columns),
-        })
+    logger.info("Executing preview_sql query", extra={
+        "source_id": source_id,
+        "source_type": connector.source_type,
+        "sql_snippet": sql[:200],
+    })
 
-        return SqlPreviewResponse(rows=data_rows, columns=columns)
-    except DefaultCredentialsError as e:
-        logger.error("preview_sql missing default credentials", extra={
+    try:
+        result = connector.execute(sql, max_rows=request.max_rows, operation="sql_preview")
+    except WarehouseError as e:
+        logger.error("preview_sql failed", extra={
             "source_id": source_id,
             "error": str(e),
         })
-        raise HTTPException(
-            status_code=400,
-            detail="Service account credentials not found. Either provide a service account key in the data source or configure GOOGLE_APPLICATION_CREDENTIALS."
-        )
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.exception("Unexpected error during preview_sql", extra={
             "source_id": source_id,
@@ -485,3 +348,10 @@ def preview_sql(
             status_code=400,
             detail=f"Failed to execute SQL preview: {str(e)}"
         )
+
+    logger.info("preview_sql query succeeded", extra={
+        "source_id": source_id,
+        "row_count": len(result.rows),
+        "column_count": len(result.columns),
+    })
+    return SqlPreviewResponse(rows=result.rows, columns=result.columns)
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from ..profiling import (
+    PROFILE_MAX_SECONDS,
+    ProfilerBusyError,
+    profiling_status,
+    render_collapsed,
+    sample_stacks,
+    tracemalloc_diff,
+)
+import hmac
+import logging
+import os
+import time
+
+router = APIRouter(prefix="/debug", tags=["debug"], include_in_schema=False)
+
+logger = logging.getLogger(__name__)
+
+# Profiling endpoints answer 404 unless a token is configured
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+
+def require_debug_token(x_debug_token: Optional[str] = Header(None, alias="x-debug-token")):
+    """Allow the request only with the configured DEBUG_TOKEN"""
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not hmac.compare_digest(x_debug_token, DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+@router.get("/profile", dependencies=[Depends(require_debug_token)])
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+):
+    """
+    Sample this worker's threads for `seconds` and return collapsed stacks
+    (feed to flamegraph.pl, speedscope or inferno to get a flame graph).
+    """
+    logger.info("CPU profile requested", extra={"seconds": seconds, "interval_ms": interval_ms})
+    try:
+        result = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    filename = f"profile-{os.getpid()}-{int(time.time())}.collapsed"
+    return PlainTextResponse(
+        render_collapsed(result["stacks"]),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(result["samples"]),
+            "X-Profile-Duration-Seconds": f"{result['duration_seconds']:.3f}",
+        },
+    )
+
+@router.get("/profile/memory", response_model=dict, dependencies=[Depends(require_debug_token)])
+async def profile_memory(
+    seconds: float = Query(10.0, ge=0, le=PROFILE_MAX_SECONDS),
+    top: int = Query(25, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+):
+    """Allocation growth (tracemalloc snapshot diff) over `seconds`, largest first"""
+    logger.info("Memory profile requested", extra={"seconds": seconds, "top": top, "group_by": group_by})
+    try:
+        return await run_in_threadpool(tracemalloc_diff, seconds, top, group_by)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/profile/status", response_model=dict, dependencies=[Depends(require_debug_token)])
+def get_profile_status():
+    """Whether a profile is running and tracemalloc is tracing in this worker"""
+    return profiling_status()
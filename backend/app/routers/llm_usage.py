@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from genai.usage import GROUP_BY_FIELDS, llm_usage_summary
+
+router = APIRouter(prefix="/api/llm-usage", tags=["llm-usage"])
+
+_GROUP_BY_ALIASES = {"data_source": "data_source_id", "user": "user_id"}
+
+@router.get("", response_model=dict)
+def get_llm_usage(
+    group_by: str = Query("endpoint", description="Comma-separated: endpoint, data_source, user, model"),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    LLM tokens, cost, latency, retries and cache hits since startup (this worker),
+    rolled up by the requested dimensions, most expensive groups first.
+    """
+    fields = [_GROUP_BY_ALIASES.get(field.strip(), field.strip()) for field in group_by.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in GROUP_BY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown group_by field(s): {', '.join(unknown)}. Use endpoint, data_source, user or model."
+        )
+    return llm_usage_summary(fields, limit)
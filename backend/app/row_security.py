@@ -0,0 +1,111 @@
+"""
+Row-level security for data cube queries.
+
+A user's ``RowLevelPolicy`` rows for a cube are compiled once into a parameterized
+SQL predicate (``WHERE `region` IN UNNEST(@rls_0) AND ...``) plus its query
+parameters. The compiled form is cached per (user, cube) and keyed by the user's
+entitlement version, so grant/revoke and policy changes take effect on the next
+query without recompiling on every request. Entries are also reloaded after
+ROW_FILTER_CACHE_TTL seconds, which bounds how long a worker that missed a policy
+change (e.g. with the unshared memory cache backend) keeps the old filter.
+
+Filters are always sent to the warehouse as bound parameters and never
+interpolated into the SQL text; the connector binds them (app.warehouse,
+BigQuery dialect).
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .entitlements import acl_version
+from .models import RowLevelPolicy, RowFilterOperator
+
+RLS_CACHE_MAX_ENTRIES = 10000
+# Upper bound on how long a compiled filter is trusted without a version bump
+RLS_CACHE_TTL_SECONDS = float(os.getenv("ROW_FILTER_CACHE_TTL", "60"))
+
+_COMPARISON_SQL = {
+    RowFilterOperator.eq: "=",
+    RowFilterOperator.neq: "!=",
+    RowFilterOperator.lt: "<",
+    RowFilterOperator.lte: "<=",
+    RowFilterOperator.gt: ">",
+    RowFilterOperator.gte: ">=",
+}
+
+class CompiledRowFilter:
+    """A parameterized WHERE predicate and the parameters it binds"""
+
+    __slots__ = ("predicate", "parameters", "version")
+
+    def __init__(self, predicate: str, parameters: List[Tuple[str, Any]], version: int):
+        self.predicate = predicate
+        # (name, value) pairs passed as connector query parameters; list values bind as arrays
+        self.parameters = parameters
+        self.version = version
+
+    def apply(self, sql: str) -> str:
+        """Wrap a cube query so only rows matching the predicate are returned"""
+        inner_sql = sql.strip()
+        if inner_sql.endswith(";"):
+            inner_sql = inner_sql[:-1]
+        return f"SELECT * FROM (\n{inner_sql}\n) AS _rls\nWHERE {self.predicate}"
+
+
+_compiled_cache: Dict[Tuple[str, str], Optional[CompiledRowFilter]] = {}
+# (user_id, cube_id) -> (entitlement version, monotonic load time)
+_cache_stamps: Dict[Tuple[str, str], Tuple[int, float]] = {}
+_cache_lock = threading.Lock()
+
+
+def compile_policies(policies: List[RowLevelPolicy], version: int = 0) -> Optional[CompiledRowFilter]:
+    """Compile policies into one AND-ed predicate (None when there are no policies)"""
+    clauses = []
+    parameters: List[Tuple[str, Any]] = []
+    for policy in sorted(policies, key=lambda p: p.id):
+        operator = RowFilterOperator(policy.operator)
+        values = list(policy.values_json or [])
+        if not values:
+            continue
+        name = f"rls_{len(parameters)}"
+        column = f"`{policy.column_name}`"
+        if operator == RowFilterOperator.in_:
+            clauses.append(f"{column} IN UNNEST(@{name})")
+            parameters.append((name, values))
+        elif operator == RowFilterOperator.not_in:
+            clauses.append(f"{column} NOT IN UNNEST(@{name})")
+            parameters.append((name, values))
+        else:
+            clauses.append(f"{column} {_COMPARISON_SQL[operator]} @{name}")
+            parameters.append((name, values[0]))
+    if not clauses:
+        return None
+    return CompiledRowFilter(" AND ".join(clauses), parameters, version)
+
+
+def get_row_filter(db: Session, user_id: str, cube_id: str) -> Optional[CompiledRowFilter]:
+    """Return the compiled row filter for a user's queries against a cube (None = unrestricted)"""
+    key = (user_id, cube_id)
+    version = acl_version(user_id)
+    now = time.monotonic()
+    with _cache_lock:
+        stamp = _cache_stamps.get(key)
+        if stamp is not None and stamp[0] == version and now - stamp[1] < RLS_CACHE_TTL_SECONDS:
+            return _compiled_cache[key]
+
+    policies = db.query(RowLevelPolicy).filter(
+        RowLevelPolicy.user_id == user_id,
+        RowLevelPolicy.data_cube_id == cube_id,
+    ).all()
+    compiled = compile_policies(policies, version)
+
+    with _cache_lock:
+        if len(_compiled_cache) >= RLS_CACHE_MAX_ENTRIES:
+            _compiled_cache.clear()
+            _cache_stamps.clear()
+        _compiled_cache[key] = compiled
+        _cache_stamps[key] = (version, now)
+    return compiled
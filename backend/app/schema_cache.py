@@ -0,0 +1,162 @@
+"""
+Schema loading for data cube generation.
+
+Returns the tables of a data source in the shape the genai prompt builder expects,
+together with a schema version string. The version is what genai uses to memoize the
+rendered prompt fragments, so it must change whenever the schema does:
+
+- cached sources (``tables`` table): derived from the row count and latest
+  ``updated_at`` of the source's tables, checked with one aggregate query per call;
+  the reshaped tables are reused while it is unchanged.
+- BigQuery: the live INFORMATION_SCHEMA result is kept for GENERATION_SCHEMA_TTL
+  seconds (default 300, 0 disables) and versioned by a hash of its content. With a
+  shared cache backend it is also stored there, so one worker's query serves all.
+
+Updating or deleting a data source drops its entry in every worker
+(invalidate_generation_schema).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from genai.cache import schema_fingerprint
+
+from .cache import on_invalidation, publish_invalidation, shared_delete, shared_get, shared_set
+from .models import DataSource, DataSourceType, Table
+from .warehouse import WarehouseError, get_connector
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_CACHE_TTL_SECONDS = float(os.getenv("GENERATION_SCHEMA_TTL", "300"))
+
+# source_id -> (version, expires_at, tables)
+_schemas: Dict[str, Tuple[str, float, List[Dict[str, Any]]]] = {}
+_lock = threading.Lock()
+
+
+def load_generation_schema(db: Session, db_source: DataSource) -> Tuple[List[Dict[str, Any]], str]:
+    """Return (available_tables, schema_version) for a data source"""
+    if db_source.type == DataSourceType.bigquery:
+        return _load_bigquery_schema(db_source)
+    return _load_cached_schema(db, db_source)
+
+
+def _shared_key(source_id: str) -> str:
+    return f"generation-schema:{source_id}"
+
+
+def invalidate_generation_schema(source_id: Optional[str] = None):
+    """Forget the schema of one data source (or all of them) in every worker"""
+    if source_id is not None:
+        # Shared entries of all sources are left to expire
+        shared_delete(_shared_key(source_id))
+    publish_invalidation("generation_schema", source_id=source_id)
+
+
+@on_invalidation("generation_schema")
+def _drop_generation_schema(source_id: Optional[str]):
+    with _lock:
+        if source_id is None:
+            _schemas.clear()
+        else:
+            _schemas.pop(source_id, None)
+
+
+def _load_cached_schema(db: Session, db_source: DataSource) -> Tuple[List[Dict[str, Any]], str]:
+    table_count, last_updated = db.query(func.count(Table.id), func.max(Table.updated_at)).filter(
+        Table.data_source_id == db_source.id
+    ).one()
+    version = f"{db_source.id}:tables:{table_count}:{last_updated.isoformat() if last_updated else '-'}"
+
+    with _lock:
+        cached = _schemas.get(db_source.id)
+    if cached is not None and cached[0] == version:
+        return cached[2], version
+
+    tables = db.query(Table).filter(Table.data_source_id == db_source.id).all()
+    logger.info("Found cached tables for data source", extra={
+        "data_source_id": db_source.id,
+        "table_count": len(tables)
+    })
+
+    available_tables = []
+    for table in tables:
+        columns_data = table.columns_json or []
+        columns = []
+        for col in columns_data:
+            columns.append({
+                "name": col.get("name", ""),
+                "type": col.get("type", ""),
+                "primary_key": col.get("primary_key", False),
+                "description": col.get("description", "")
+            })
+
+        available_tables.append({
+            "name": table.name,
+            "schema": table.schema_name,
+            "columns": columns,
+            "row_count": table.row_count or 0
+        })
+
+    with _lock:
+        _schemas[db_source.id] = (version, float("inf"), available_tables)
+    return available_tables, version
+
+
+def _load_bigquery_schema(db_source: DataSource) -> Tuple[List[Dict[str, Any]], str]:
+    now = time.monotonic()
+    with _lock:
+        cached = _schemas.get(db_source.id)
+    if cached is not None and cached[1] > now:
+        return cached[2], cached[0]
+
+    shared = shared_get(_shared_key(db_source.id)) if SCHEMA_CACHE_TTL_SECONDS > 0 else None
+    if shared is not None:
+        entry = json.loads(shared)
+        with _lock:
+            _schemas[db_source.id] = (entry["version"], now + entry["expires_at"] - time.time(), entry["tables"])
+        return entry["tables"], entry["version"]
+
+    available_tables = _fetch_bigquery_schema(db_source)
+    version = f"{db_source.id}:bq:{schema_fingerprint({}, available_tables)[:16]}"
+    if SCHEMA_CACHE_TTL_SECONDS > 0:
+        with _lock:
+            _schemas[db_source.id] = (version, now + SCHEMA_CACHE_TTL_SECONDS, available_tables)
+        entry = {"version": version, "expires_at": time.time() + SCHEMA_CACHE_TTL_SECONDS, "tables": available_tables}
+        shared_set(_shared_key(db_source.id), json.dumps(entry, default=str), ttl=SCHEMA_CACHE_TTL_SECONDS)
+    return available_tables, version
+
+
+def _fetch_bigquery_schema(db_source: DataSource) -> List[Dict[str, Any]]:
+    """Fetch tables and views live from BigQuery INFORMATION_SCHEMA"""
+    logger.info("Querying BigQuery INFORMATION_SCHEMA for tables and views", extra={
+        "data_source_id": db_source.id,
+        "project": db_source.project_id or db_source.host,
+        "dataset": db_source.dataset,
+    })
+    try:
+        available_tables = get_connector(db_source).introspect()
+    except WarehouseError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.exception("Error fetching BigQuery schema", extra={
+            "data_source_id": db_source.id,
+            "error": str(e)
+        })
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch BigQuery schema: {str(e)}"
+        )
+
+    logger.info("Fetched BigQuery schema", extra={
+        "data_source_id": db_source.id,
+        "table_count": len(available_tables)
+    })
+    return available_tables
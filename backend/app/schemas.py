@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
-from .models import DataSourceType, DataSourceStatus, ResourceType, Permission
+from .models import DataSourceType, DataSourceStatus, ResourceType, Permission, RowFilterOperator
 
 # DataSource Schemas
 class DataSourceBase(BaseModel):
@@ -95,6 +95,15 @@ class DataCubeResponse(DataCubeBase):
         }
     }
 
+class DataCubeImportItem(DataCubeBase):
+    # Keep the id from the source environment; a new id is generated when omitted
+    id: Optional[str] = None
+
+class DataCubeImportRequest(BaseModel):
+    cubes: List[DataCubeImportItem] = Field(..., min_length=1)
+    # Update cubes whose id already exists (upsert); when false they are skipped
+    overwrite: bool = True
+
 class DataCubeQuery(BaseModel):
     query: str
 
@@ -105,6 +114,10 @@ class DataCubeQueryResponse(BaseModel):
 class DataCubeGenerateRequest(BaseModel):
     user_request: str
     data_source_id: str
+    # Generate this many candidates concurrently and return the best valid one
+    candidates: Optional[int] = Field(None, ge=1, le=10)
+    # Rank valid candidates by a BigQuery dry run (bytes scanned)
+    dry_run: bool = False
 
 class DataCubeGenerateResponse(BaseModel):
     name: str
@@ -113,6 +126,20 @@ class DataCubeGenerateResponse(BaseModel):
     dimensions: List[str]
     measures: List[str]
     metadata: Optional[Dict[str, Any]] = None
+    # How much of the data source schema was sent to the model
+    tables_included: Optional[int] = None
+    tables_total: Optional[int] = None
+    # Set when candidates/dry_run were requested
+    candidates_generated: Optional[int] = None
+    candidates_valid: Optional[int] = None
+    validation_errors: Optional[List[str]] = None
+    estimated_bytes_processed: Optional[int] = None
+
+class DataCubeBatchGenerateRequest(BaseModel):
+    data_source_id: str
+    user_requests: List[str] = Field(..., min_length=1)
+    # Save every successfully generated cube (one transaction)
+    persist: bool = False
 
 class SqlPreviewRequest(BaseModel):
     sql: str
@@ -140,8 +167,10 @@ class WidgetSchema(BaseModel):
 class DashboardBase(BaseModel):
     name: str
     description: str
-    data_cube_id: str
+    data_cube_id: str = Field(..., alias="dataCubeId")  # camelCase like DataCubeBase.data_source_id
     widgets: List[WidgetSchema]
+    
+    model_config = {"populate_by_name": True}
 
 class DashboardCreate(DashboardBase):
     pass
@@ -151,7 +180,7 @@ class DashboardResponse(DashboardBase):
     createdAt: str
     updatedAt: str
     
-    model_config = {"from_attributes": True}
+    model_config = {"populate_by_name": True, "from_attributes": True}
 
 # Data Entitlement Schemas
 class DataEntitlementBase(BaseModel):
@@ -164,6 +193,23 @@ class DataEntitlementBase(BaseModel):
 class DataEntitlementCreate(DataEntitlementBase):
     pass
 
+class EntitlementResourceRef(BaseModel):
+    resource_type: ResourceType
+    resource_id: str
+
+class DataEntitlementBulkGrant(BaseModel):
+    """Grant `permissions` on every resource to every user (users x resources)"""
+    user_ids: List[str] = Field(..., min_length=1)
+    resources: List[EntitlementResourceRef] = Field(..., min_length=1)
+    permissions: List[Permission] = Field(..., min_length=1)
+    granted_by: str
+
+class DataEntitlementBulkRevoke(BaseModel):
+    """Revoke `permissions` (all of them when omitted) from every user on every resource"""
+    user_ids: List[str] = Field(..., min_length=1)
+    resources: List[EntitlementResourceRef] = Field(..., min_length=1)
+    permissions: Optional[List[Permission]] = Field(None, min_length=1)
+
 class EntitledResource(BaseModel):
     resourceType: ResourceType
     resourceId: str
@@ -171,6 +217,22 @@ class EntitledResource(BaseModel):
     permissions: List[Permission]
     grantedAt: str
 
+# Row-Level Security Schemas
+class RowLevelPolicyBase(BaseModel):
+    user_id: str
+    data_cube_id: str
+    column: str = Field(..., pattern=r"^[A-Za-z_][A-Za-z0-9_]*$")
+    operator: RowFilterOperator
+    values: List[Union[bool, int, float, str]] = Field(..., min_length=1)
+    granted_by: str
+
+class RowLevelPolicyCreate(RowLevelPolicyBase):
+    pass
+
+class RowLevelPolicyResponse(RowLevelPolicyBase):
+    id: str
+    createdAt: str
+
 # App Config Schemas
 class AppConfigBase(BaseModel):
     key: str
@@ -196,7 +258,10 @@ class DataMarketplaceResponse(BaseModel):
 # AI Chat Schemas
 class AIChatMessage(BaseModel):
     message: str
+    refresh: bool = False  # recompute the cube summary instead of using the cached one
 
 class AIChatResponse(BaseModel):
     response: str
     timestamp: str
+    grounding: Optional[str] = None  # cached_summary | live_query | none
+    summaryComputedAt: Optional[str] = None
@@ -0,0 +1,89 @@
+"""
+Response building for the list endpoints, off the event loop.
+
+Those handlers are async (they await the metadata database), and FastAPI validates and
+encodes an async handler's return value on the event loop, where a 10k-item list
+blocks every other request on the worker. model_response() does that work in a worker
+thread and returns the finished Response.
+
+By default it takes FastAPI's steps: validate against the response_model, dump the
+validated models back to Python objects and encode those with the stdlib json module.
+With FAST_RESPONSES=true it instead validates the content once with a cached
+TypeAdapter of the same model and has pydantic-core encode it straight to JSON bytes,
+then gzips bodies of at least RESPONSE_GZIP_MIN_BYTES (default 64 KiB) for clients
+that accept it, at RESPONSE_GZIP_LEVEL (default 1: catalog JSON is repetitive, so
+higher levels cost far more CPU for a few percent smaller bodies).
+
+The JSON is the same either way (aliases applied, keys outside the model dropped);
+content that does not match the model fails with the same ResponseValidationError.
+"""
+import functools
+import gzip
+import os
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+from genai.tracing import span
+
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() in ("true", "1", "yes")
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "65536"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "1"))
+
+
+def configure_fast_responses(enabled: bool):
+    """Turn the fast path on or off at runtime (e.g. to compare both in a benchmark)"""
+    global FAST_RESPONSES
+    FAST_RESPONSES = enabled
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter(model_type) -> TypeAdapter:
+    return TypeAdapter(model_type)
+
+
+def _validate(adapter: TypeAdapter, content: Any):
+    try:
+        return adapter.validate_python(content)
+    except ValidationError as e:
+        raise ResponseValidationError(errors=e.errors(include_url=False), body=content)
+
+
+def _standard_response(model_type, content: Any, status_code: int) -> Response:
+    """FastAPI's response_model steps: validate, dump to JSON-compatible data, JSONResponse"""
+    adapter = _adapter(model_type)
+    with span("response.serialize"):
+        value = adapter.dump_python(_validate(adapter, content), mode="json", by_alias=True)
+        return JSONResponse(value, status_code=status_code)
+
+
+def _fast_response(model_type, content: Any, status_code: int, accepts_gzip: bool) -> Response:
+    """Validate once, encode with pydantic-core and gzip large bodies"""
+    adapter = _adapter(model_type)
+    with span("response.serialize") as serialize_span:
+        body = adapter.dump_json(_validate(adapter, content), by_alias=True)
+        serialize_span.set_attribute("bytes", len(body))
+
+    headers = {}
+    if len(body) >= RESPONSE_GZIP_MIN_BYTES:
+        headers["Vary"] = "Accept-Encoding"
+        if accepts_gzip:
+            with span("response.gzip", bytes=len(body)):
+                body = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+async def model_response(request: Request, model_type, content: Any, status_code: int = 200) -> Response:
+    """
+    Return `content` as a ready JSON response of `model_type` (the endpoint's
+    response_model), validated, encoded and (fast path) compressed in one worker-thread call.
+    """
+    if not FAST_RESPONSES:
+        return await run_in_threadpool(_standard_response, model_type, content, status_code)
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    return await run_in_threadpool(_fast_response, model_type, content, status_code, accepts_gzip)
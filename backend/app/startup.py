@@ -0,0 +1,118 @@
+"""
+Startup modes for container deployments, where every cold start is paid by the first
+requests of a new instance.
+
+- STARTUP_MODE=standard (default): tables are created at import (create_all), as before.
+- STARTUP_MODE=fast: schema creation is skipped; run ``python -m app.migrate`` as a
+  separate deploy step instead. Together with the lazily built Cloud SQL connector,
+  importing the app then opens no database connection at all.
+
+With STARTUP_PREWARM=true (either mode) the startup hook warms, in the background while
+the worker already serves requests: STARTUP_PREWARM_CONNECTIONS connections (default
+DB_POOL_SIZE) in every metadata pool, the Gen AI and resilient LLM clients, and the
+warehouse connector of every data source. Failures are logged and otherwise ignored;
+whatever was not warmed is built on first use as usual.
+"""
+import logging
+import os
+import time
+from typing import Dict
+
+from sqlalchemy.pool import QueuePool
+
+from .database import DB_POOL_SIZE, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MODE = os.getenv("STARTUP_MODE", "standard").lower()
+if STARTUP_MODE not in ("standard", "fast"):
+    raise ValueError(f"STARTUP_MODE must be 'standard' or 'fast', got '{STARTUP_MODE}'")
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "false").lower() in ("true", "1", "yes")
+STARTUP_PREWARM_CONNECTIONS = int(os.getenv("STARTUP_PREWARM_CONNECTIONS", str(DB_POOL_SIZE)))
+
+
+def _warm_count(db_engine) -> int:
+    """Connections worth opening: pools other than queue pools keep a single one"""
+    if isinstance(db_engine.pool, QueuePool):
+        return min(STARTUP_PREWARM_CONNECTIONS, db_engine.pool.size())
+    return 1
+
+
+def prewarm_engine(db_engine) -> int:
+    """Open (then return to the pool) up to STARTUP_PREWARM_CONNECTIONS connections"""
+    opened = []
+    try:
+        for _ in range(_warm_count(db_engine)):
+            opened.append(db_engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+async def prewarm_async_engine(db_engine) -> int:
+    opened = []
+    try:
+        for _ in range(_warm_count(db_engine.sync_engine)):
+            opened.append(await db_engine.connect())
+    finally:
+        for conn in opened:
+            await conn.close()
+    return len(opened)
+
+
+def prewarm_clients() -> Dict[str, int]:
+    """Gen AI and LLM clients, then the warehouse connector of every data source"""
+    from genai.client import get_llm_client
+    from genai.llm import get_vertex_client
+
+    from .models import DataSource
+    from .warehouse import get_connector
+
+    get_llm_client()
+    try:
+        get_vertex_client()
+    except ValueError as e:
+        # Not configured (no project or SDK); the LLM endpoints report it when called
+        logger.warning("Could not prewarm Gen AI client", extra={"error": str(e)})
+
+    warmed = failed = 0
+    with SessionLocal() as db:
+        sources = db.query(DataSource).all()
+    for source in sources:
+        try:
+            get_connector(source)
+            warmed += 1
+        except Exception as e:
+            failed += 1
+            logger.warning("Could not prewarm warehouse connector", extra={"source_id": source.id, "error": str(e)})
+    return {"connectors": warmed, "connector_failures": failed}
+
+
+async def prewarm(engines: Dict[str, object]):
+    """Run every prewarm step (blocking ones in the threadpool), logging what each took"""
+    from starlette.concurrency import run_in_threadpool
+
+    started = time.perf_counter()
+    for name, db_engine in engines.items():
+        step_started = time.perf_counter()
+        try:
+            if hasattr(db_engine, "sync_engine"):
+                connections = await prewarm_async_engine(db_engine)
+            else:
+                connections = await run_in_threadpool(prewarm_engine, db_engine)
+        except Exception as e:
+            logger.warning("Could not prewarm database pool", extra={"pool": name, "error": str(e)})
+            continue
+        logger.info("Prewarmed database pool", extra={
+            "pool": name, "connections": connections, "seconds": round(time.perf_counter() - step_started, 3),
+        })
+
+    step_started = time.perf_counter()
+    try:
+        clients = await run_in_threadpool(prewarm_clients)
+    except Exception as e:
+        logger.warning("Could not prewarm clients", extra={"error": str(e)})
+    else:
+        logger.info("Prewarmed clients", extra={**clients, "seconds": round(time.perf_counter() - step_started, 3)})
+    logger.info("Prewarm finished", extra={"seconds": round(time.perf_counter() - started, 3)})
@@ -0,0 +1,82 @@
+"""
+Request and metadata-DB tracing (span model and exporters live in genai.tracing).
+
+- TracingMiddleware opens one root span per HTTP request, named after the route
+  template, continuing the caller's trace when a W3C ``traceparent`` header is sent and
+  returning the trace id in ``x-trace-id``
+- instrument_engine_tracing adds a ``db.query`` span for every statement run on a
+  SQLAlchemy engine
+
+Routers and genai add spans for their own phases (warehouse client creation and query,
+row conversion, schema selection, prompt building, LLM attempts, output parsing).
+"""
+from genai.tracing import format_traceparent, parse_traceparent, span, start_span
+
+from .metrics import route_template
+
+TRACE_ID_HEADER = b"x-trace-id"
+
+
+class TracingMiddleware:
+    """ASGI middleware wrapping each HTTP request in a root span"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        trace_id, parent_id = parent if parent is not None else (None, None)
+        method = scope["method"]
+        route = route_template(scope)
+
+        with span(f"HTTP {method} {route}", trace_id=trace_id, parent_id=parent_id,
+                  **{"http.method": method, "http.route": route}) as request_span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute("http.status_code", message["status"])
+                    message["headers"] = list(message.get("headers") or ()) + [
+                        (TRACE_ID_HEADER, request_span.trace_id.encode("latin-1")),
+                        (b"traceparent", format_traceparent(request_span).encode("latin-1")),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def instrument_engine_tracing(engine, name: str = "primary"):
+    """Trace every statement executed on a SQLAlchemy engine (sync or async) as a ``db.query`` span"""
+    from sqlalchemy import event
+
+    engine = getattr(engine, "sync_engine", engine)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("trace_spans", []).append(start_span(
+            "db.query",
+            **{"db.pool": name, "db.statement": " ".join(statement.split()), "db.executemany": executemany},
+        ))
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            query_span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                query_span.set_attribute("db.rowcount", cursor.rowcount)
+            query_span.end()
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            query_span = spans.pop()
+            query_span.record_error(exception_context.original_exception)
+            query_span.end()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
@@ -0,0 +1,130 @@
+"""
+Warehouse connector layer.
+
+Every query the backend runs against a customer warehouse goes through a
+WarehouseConnector (execute, stream, dry_run, cancel, introspect) whose Capabilities
+say which of those the source type supports. get_connector() keeps one connector per
+data source, so clients, credentials and connection pools are built once and shared
+by all requests; updating or deleting a data source drops it in every worker
+(invalidate_connector).
+
+Connectors: bigquery, postgresql, mysql and the embedded "local" engine (sqlite3).
+Others can be added with register_connector().
+"""
+import threading
+from typing import Dict, Optional, Tuple, Type
+
+from ..cache import on_invalidation, publish_invalidation
+from .base import (
+    Capabilities,
+    QueryParameters,
+    QueryResult,
+    UnsupportedWarehouseOperation,
+    WarehouseAuthError,
+    WarehouseConfigError,
+    WarehouseConnector,
+    WarehouseError,
+    WarehousePermissionError,
+)
+from .bigquery import BigQueryConnector
+from .local import LocalConnector
+from .sql import MySQLConnector, PostgresConnector
+
+_registry: Dict[str, Type[WarehouseConnector]] = {
+    "bigquery": BigQueryConnector,
+    "postgresql": PostgresConnector,
+    "mysql": MySQLConnector,
+    "local": LocalConnector,
+}
+
+# source_id -> (connection fingerprint, connector)
+_connectors: Dict[str, Tuple[tuple, WarehouseConnector]] = {}
+_lock = threading.Lock()
+
+
+def register_connector(source_type: str, connector_class: Type[WarehouseConnector]):
+    """Use `connector_class` (which must implement from_source) for data sources of `source_type`"""
+    _registry[source_type] = connector_class
+
+
+def _source_type(db_source) -> str:
+    return getattr(db_source.type, "value", db_source.type)
+
+
+def _fingerprint(db_source) -> tuple:
+    return (
+        _source_type(db_source), db_source.host, db_source.port, db_source.database, db_source.username,
+        db_source.password, db_source.project_id, db_source.dataset, db_source.location,
+    )
+
+
+def connector_class_for(source_type: str) -> Type[WarehouseConnector]:
+    connector_class = _registry.get(source_type)
+    if connector_class is None:
+        raise UnsupportedWarehouseOperation(f"Queries are not supported for {source_type} data sources")
+    return connector_class
+
+
+def get_connector(db_source) -> WarehouseConnector:
+    """
+    The shared connector of a data source, created on first use. A source whose
+    connection settings changed gets a fresh connector even without invalidation.
+    """
+    fingerprint = _fingerprint(db_source)
+    with _lock:
+        cached = _connectors.get(db_source.id)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    connector = connector_class_for(fingerprint[0]).from_source(db_source)
+    with _lock:
+        current = _connectors.get(db_source.id)
+        if current is not None and current[0] == fingerprint:
+            # Another request built it concurrently; keep theirs
+            stale = connector
+            connector = current[1]
+        else:
+            stale = current[1] if current is not None else None
+            _connectors[db_source.id] = (fingerprint, connector)
+    if stale is not None:
+        stale.close()
+    return connector
+
+
+def invalidate_connector(source_id: Optional[str] = None):
+    """Close and forget the connector of one data source (or all of them) in every worker"""
+    publish_invalidation("warehouse_connector", source_id=source_id)
+
+
+@on_invalidation("warehouse_connector")
+def _drop_connector(source_id: Optional[str]):
+    with _lock:
+        if source_id is None:
+            dropped = [connector for _, connector in _connectors.values()]
+            _connectors.clear()
+        else:
+            entry = _connectors.pop(source_id, None)
+            dropped = [entry[1]] if entry is not None else []
+    for connector in dropped:
+        connector.close()
+
+
+__all__ = [
+    "BigQueryConnector",
+    "Capabilities",
+    "LocalConnector",
+    "MySQLConnector",
+    "PostgresConnector",
+    "QueryParameters",
+    "QueryResult",
+    "UnsupportedWarehouseOperation",
+    "WarehouseAuthError",
+    "WarehouseConfigError",
+    "WarehouseConnector",
+    "WarehouseError",
+    "WarehousePermissionError",
+    "connector_class_for",
+    "get_connector",
+    "invalidate_connector",
+    "register_connector",
+]
@@ -0,0 +1,144 @@
+"""
+Connector interface shared by every warehouse implementation.
+"""
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (name, value) pairs bound as named parameters; list values bind as arrays
+QueryParameters = List[Tuple[str, Any]]
+
+
+class WarehouseError(Exception):
+    """A warehouse operation failed; `status_code` is the HTTP status to answer with"""
+
+    status_code = 500
+
+
+class WarehouseConfigError(WarehouseError):
+    """The data source is misconfigured (bad key JSON, missing dataset, ...)"""
+
+    status_code = 400
+
+
+class WarehouseAuthError(WarehouseError):
+    """No usable credentials for the warehouse"""
+
+    status_code = 400
+
+
+class WarehousePermissionError(WarehouseError):
+    """The credentials are valid but lack a permission the operation needs"""
+
+    status_code = 403
+
+
+class UnsupportedWarehouseOperation(WarehouseError):
+    """The source type has no connector, or its connector lacks the capability"""
+
+    status_code = 400
+
+
+class Capabilities:
+    """What a connector can do beyond `execute`"""
+
+    __slots__ = ("dry_run", "streaming", "cancel", "introspect", "bytes_processed", "row_filters")
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        streaming: bool = False,
+        cancel: bool = False,
+        introspect: bool = False,
+        bytes_processed: bool = False,
+        row_filters: bool = False,
+    ):
+        # Estimate bytes scanned without running the query
+        self.dry_run = dry_run
+        # Yield rows page by page instead of materializing the result
+        self.streaming = streaming
+        # Cancel a running query by job id
+        self.cancel = cancel
+        # List tables and columns live
+        self.introspect = introspect
+        # Report bytes scanned for executed queries
+        self.bytes_processed = bytes_processed
+        # Bind app.row_security filters (BigQuery dialect: UNNEST(@name) array parameters)
+        self.row_filters = row_filters
+
+    def as_dict(self) -> Dict[str, bool]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class QueryResult:
+    """Rows of an executed query as plain dicts, in column order"""
+
+    __slots__ = ("columns", "rows", "bytes_processed", "job_id")
+
+    def __init__(self, columns: List[str], rows: List[Dict[str, Any]], bytes_processed: Optional[int] = None,
+                 job_id: Optional[str] = None):
+        self.columns = columns
+        self.rows = rows
+        self.bytes_processed = bytes_processed
+        self.job_id = job_id
+
+
+class WarehouseConnector:
+    """
+    One data source's warehouse. Connectors are long-lived and thread-safe: clients,
+    credentials and connection pools are created once and reused (see get_connector).
+
+    `operation` labels metrics and traces (e.g. "cube_preview"). `job_id` lets another
+    thread cancel the query with cancel(job_id) where the connector supports it.
+    """
+
+    source_type = "unknown"
+    capabilities = Capabilities()
+
+    def execute(self, sql: str, params: Optional[QueryParameters] = None, max_rows: Optional[int] = None,
+                operation: str = "query", job_id: Optional[str] = None) -> QueryResult:
+        raise NotImplementedError
+
+    def stream(self, sql: str, params: Optional[QueryParameters] = None, batch_size: int = 1000,
+               operation: str = "stream", job_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Rows one by one; the default materializes the whole result first"""
+        yield from self.execute(sql, params, operation=operation, job_id=job_id).rows
+
+    def dry_run(self, sql: str) -> Optional[int]:
+        """Bytes the query would scan"""
+        raise UnsupportedWarehouseOperation(f"Dry runs are not supported for {self.source_type} data sources")
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a running query; False when no such query is running"""
+        raise UnsupportedWarehouseOperation(f"Query cancellation is not supported for {self.source_type} data sources")
+
+    def introspect(self) -> List[Dict[str, Any]]:
+        """
+        Tables and views as ``{"name", "schema", "columns": [{"name", "type",
+        "primary_key", "description"}], "row_count", "description"}``
+        """
+        raise UnsupportedWarehouseOperation(f"Schema introspection is not supported for {self.source_type} data sources")
+
+    def close(self):
+        """Release clients and pooled connections"""
+
+
+class RunningJobs:
+    """Handles of in-flight queries by job id, for cancel()"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add(self, job_id: Optional[str], handle: Any):
+        if job_id is not None:
+            with self._lock:
+                self._jobs[job_id] = handle
+
+    def remove(self, job_id: Optional[str]):
+        if job_id is not None:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Any]:
+        with self._lock:
+            return self._jobs.get(job_id)
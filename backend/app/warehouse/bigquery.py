@@ -0,0 +1,209 @@
+"""
+BigQuery connector.
+
+Uses the service account key stored in the data source's password field when present,
+otherwise Application Default Credentials. The client is built once per connector.
+"""
+import contextlib
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+from genai.tracing import span
+
+from ..metrics import track_warehouse_query
+from .base import (
+    Capabilities,
+    QueryParameters,
+    QueryResult,
+    RunningJobs,
+    WarehouseAuthError,
+    WarehouseConfigError,
+    WarehouseConnector,
+    WarehouseError,
+    WarehousePermissionError,
+)
+
+_BIGQUERY_TYPES = (
+    (bool, "BOOL"),  # bool before int: bool is a subclass of int
+    (int, "INT64"),
+    (float, "FLOAT64"),
+    (str, "STRING"),
+)
+
+CREDENTIALS_NOT_FOUND = (
+    "Service account credentials not found. Either provide a service account key in the "
+    "data source or configure GOOGLE_APPLICATION_CREDENTIALS."
+)
+
+
+def _bigquery_type(value: Any) -> str:
+    for python_type, bq_type in _BIGQUERY_TYPES:
+        if isinstance(value, python_type):
+            return bq_type
+    raise ValueError(f"Unsupported query parameter type: {type(value).__name__}")
+
+
+@contextlib.contextmanager
+def _translate_errors():
+    """Raise credential and permission failures as WarehouseErrors"""
+    from google.api_core.exceptions import Forbidden
+    from google.auth.exceptions import DefaultCredentialsError
+
+    try:
+        yield
+    except DefaultCredentialsError:
+        raise WarehouseAuthError(CREDENTIALS_NOT_FOUND)
+    except Forbidden as e:
+        raise WarehousePermissionError(f"BigQuery permission denied: {e}")
+
+
+def _bigquery():
+    try:
+        from google.cloud import bigquery
+    except ImportError:
+        raise WarehouseError("google-cloud-bigquery library not installed.")
+    return bigquery
+
+
+class BigQueryConnector(WarehouseConnector):
+    source_type = "bigquery"
+    capabilities = Capabilities(dry_run=True, streaming=True, cancel=True, introspect=True,
+                                bytes_processed=True, row_filters=True)
+
+    def __init__(self, project: Optional[str], dataset: Optional[str] = None, location: Optional[str] = None,
+                 service_account_json: Optional[str] = None):
+        self.project = project
+        self.dataset = dataset
+        self.location = location
+        self._jobs = RunningJobs()
+        self.client = self._create_client(service_account_json)
+
+    @classmethod
+    def from_source(cls, db_source) -> "BigQueryConnector":
+        return cls(
+            project=db_source.project_id or db_source.host,
+            dataset=db_source.dataset,
+            location=db_source.location,
+            service_account_json=db_source.password,
+        )
+
+    def _create_client(self, service_account_json: Optional[str]):
+        bigquery = _bigquery()
+        credentials = None
+        if service_account_json:
+            from google.oauth2 import service_account
+
+            try:
+                service_account_info = json.loads(service_account_json)
+            except json.JSONDecodeError:
+                raise WarehouseConfigError("Invalid service account key JSON")
+            credentials = service_account.Credentials.from_service_account_info(service_account_info)
+
+        with span("warehouse.connect", source_type=self.source_type, inline_credentials=credentials is not None), \
+                _translate_errors():
+            if credentials is not None:
+                return bigquery.Client(credentials=credentials, project=self.project, location=self.location)
+            return bigquery.Client(project=self.project, location=self.location)
+
+    def _job_config(self, params: Optional[QueryParameters], **options):
+        bigquery = _bigquery()
+        if not params and not options:
+            return None
+        query_parameters = []
+        for name, value in params or ():
+            if isinstance(value, list):
+                query_parameters.append(bigquery.ArrayQueryParameter(name, _bigquery_type(value[0]), value))
+            else:
+                query_parameters.append(bigquery.ScalarQueryParameter(name, _bigquery_type(value), value))
+        return bigquery.QueryJobConfig(query_parameters=query_parameters, **options)
+
+    def _submit(self, sql: str, job_config, job_id: Optional[str]):
+        if job_id is not None:
+            return self.client.query(sql, job_config=job_config, job_id=job_id)
+        return self.client.query(sql, job_config=job_config)
+
+    def execute(self, sql: str, params: Optional[QueryParameters] = None, max_rows: Optional[int] = None,
+                operation: str = "query", job_id: Optional[str] = None) -> QueryResult:
+        job_config = self._job_config(params)
+        with track_warehouse_query(self.source_type, operation) as tracked, _translate_errors():
+            query_job = self._submit(sql, job_config, job_id)
+            self._jobs.add(job_id, query_job)
+            try:
+                rows = list(query_job.result(max_results=max_rows))
+            finally:
+                self._jobs.remove(job_id)
+            tracked.bytes_processed = query_job.total_bytes_processed
+
+        with span("warehouse.convert_rows", rows=len(rows)):
+            columns = list(rows[0].keys()) if rows else []
+            data_rows = [dict(row) for row in rows]
+        return QueryResult(columns, data_rows, query_job.total_bytes_processed, job_id)
+
+    def stream(self, sql: str, params: Optional[QueryParameters] = None, batch_size: int = 1000,
+               operation: str = "stream", job_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        job_config = self._job_config(params)
+        with track_warehouse_query(self.source_type, operation) as tracked, _translate_errors():
+            query_job = self._submit(sql, job_config, job_id)
+            self._jobs.add(job_id, query_job)
+            # Waits for the job; later pages are fetched as the caller iterates
+            rows = query_job.result(page_size=batch_size)
+            tracked.bytes_processed = query_job.total_bytes_processed
+        try:
+            for row in rows:
+                yield dict(row)
+        finally:
+            self._jobs.remove(job_id)
+
+    def dry_run(self, sql: str) -> Optional[int]:
+        job_config = self._job_config(None, dry_run=True, use_query_cache=False)
+        with track_warehouse_query(self.source_type, "dry_run"), _translate_errors():
+            return self._submit(sql, job_config, None).total_bytes_processed
+
+    def cancel(self, job_id: str) -> bool:
+        query_job = self._jobs.get(job_id)
+        if query_job is None:
+            return False
+        query_job.cancel()
+        return True
+
+    def introspect(self) -> List[Dict[str, Any]]:
+        if not self.dataset:
+            raise WarehouseConfigError("BigQuery dataset is not configured for this data source")
+
+        # INFORMATION_SCHEMA so views are included, not just physical tables
+        columns_query = f"""
+            SELECT
+              table_name,
+              column_name,
+              data_type,
+              is_nullable,
+              ordinal_position
+            FROM `{self.project}.{self.dataset}`.INFORMATION_SCHEMA.COLUMNS
+            ORDER BY table_name, ordinal_position
+        """
+        with track_warehouse_query(self.source_type, "schema_introspection"), _translate_errors():
+            columns_result = list(self._submit(columns_query, None, None).result())
+
+        tables_map: Dict[str, Dict[str, Any]] = {}
+        for row in columns_result:
+            table_name = row["table_name"]
+            if table_name not in tables_map:
+                tables_map[table_name] = {
+                    "name": table_name,
+                    "schema": self.dataset,
+                    "columns": [],
+                    "row_count": 0,
+                    "description": None,
+                }
+            tables_map[table_name]["columns"].append({
+                "name": row["column_name"],
+                "type": row["data_type"],
+                "primary_key": False,  # BigQuery doesn't expose PKs in INFORMATION_SCHEMA
+                "description": None,
+            })
+        return list(tables_map.values())
+
+    def close(self):
+        close = getattr(self.client, "close", None)
+        if callable(close):
+            close()
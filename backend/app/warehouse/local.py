@@ -0,0 +1,168 @@
+"""
+Embedded local engine on the standard library's sqlite3.
+
+Needs no server or credentials, so it is what tests and benchmarks run against to
+measure the connector layer itself (pooling, streaming, cancellation). Parameters
+bind by name (``:name`` in the SQL); array parameters are not supported, so row
+filters are not either. sqlite3 errors propagate unchanged, as driver errors do
+from the other connectors.
+
+``database`` is a file path or ":memory:". An in-memory database is shared by all
+pooled connections of the connector and lives until close().
+"""
+import itertools
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from genai.tracing import span
+
+from ..metrics import track_warehouse_query
+from .base import (
+    Capabilities,
+    QueryParameters,
+    QueryResult,
+    RunningJobs,
+    UnsupportedWarehouseOperation,
+    WarehouseConnector,
+    WarehouseError,
+)
+from .sql import WAREHOUSE_POOL_SIZE, WAREHOUSE_POOL_TIMEOUT
+
+_memory_ids = itertools.count()
+
+
+def _bind(params: Optional[QueryParameters]) -> Dict[str, Any]:
+    bound = dict(params or ())
+    for name, value in bound.items():
+        if isinstance(value, list):
+            raise UnsupportedWarehouseOperation(f"Array parameter '{name}' is not supported for local data sources")
+    return bound
+
+
+class LocalConnector(WarehouseConnector):
+    source_type = "local"
+    capabilities = Capabilities(streaming=True, cancel=True, introspect=True)
+
+    def __init__(self, database: str = ":memory:", pool_size: int = WAREHOUSE_POOL_SIZE):
+        self.database = database
+        self._uri = False
+        self._keeper: Optional[sqlite3.Connection] = None
+        if database == ":memory:":
+            # A named shared-cache database so every pooled connection sees the same tables
+            self.database = f"file:warehouse-{next(_memory_ids)}?mode=memory&cache=shared"
+            self._uri = True
+            self._keeper = self._connect()
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._jobs = RunningJobs()
+
+    @classmethod
+    def from_source(cls, db_source) -> "LocalConnector":
+        return cls(db_source.database or ":memory:")
+
+    def _connect(self) -> sqlite3.Connection:
+        with span("warehouse.connect", source_type=self.source_type):
+            return sqlite3.connect(self.database, uri=self._uri, check_same_thread=False)
+
+    def _acquire(self) -> sqlite3.Connection:
+        if not self._slots.acquire(timeout=WAREHOUSE_POOL_TIMEOUT):
+            raise WarehouseError(f"Timed out after {WAREHOUSE_POOL_TIMEOUT}s waiting for a local connection")
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except BaseException:
+                self._slots.release()
+                raise
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._pool.put(conn)
+        self._slots.release()
+
+    def execute(self, sql: str, params: Optional[QueryParameters] = None, max_rows: Optional[int] = None,
+                operation: str = "query", job_id: Optional[str] = None) -> QueryResult:
+        conn = self._acquire()
+        self._jobs.add(job_id, conn)
+        try:
+            with track_warehouse_query(self.source_type, operation):
+                cursor = conn.execute(sql, _bind(params))
+                columns = [d[0] for d in cursor.description or ()]
+                rows = cursor.fetchmany(max_rows) if max_rows is not None else cursor.fetchall()
+                cursor.close()
+            if cursor.description is None:
+                conn.commit()
+        finally:
+            self._jobs.remove(job_id)
+            self._release(conn)
+
+        with span("warehouse.convert_rows", rows=len(rows)):
+            data_rows = [dict(zip(columns, row)) for row in rows]
+        return QueryResult(columns, data_rows, None, job_id)
+
+    def stream(self, sql: str, params: Optional[QueryParameters] = None, batch_size: int = 1000,
+               operation: str = "stream", job_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        conn = self._acquire()
+        self._jobs.add(job_id, conn)
+        try:
+            with track_warehouse_query(self.source_type, operation):
+                cursor = conn.execute(sql, _bind(params))
+            columns = [d[0] for d in cursor.description or ()]
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(zip(columns, row))
+            cursor.close()
+        finally:
+            self._jobs.remove(job_id)
+            self._release(conn)
+
+    def cancel(self, job_id: str) -> bool:
+        conn = self._jobs.get(job_id)
+        if conn is None:
+            return False
+        conn.interrupt()
+        return True
+
+    def introspect(self) -> List[Dict[str, Any]]:
+        conn = self._acquire()
+        try:
+            with track_warehouse_query(self.source_type, "schema_introspection"):
+                names = [row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+                    "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+                )]
+                tables = []
+                for name in names:
+                    # PRAGMA rows: (cid, name, type, notnull, dflt_value, pk)
+                    info = conn.execute("SELECT * FROM pragma_table_info(?)", (name,)).fetchall()
+                    tables.append({
+                        "name": name,
+                        "schema": "main",
+                        "columns": [
+                            {"name": col[1], "type": (col[2] or "").upper(), "primary_key": bool(col[5]),
+                             "description": None}
+                            for col in info
+                        ],
+                        "row_count": 0,
+                        "description": None,
+                    })
+        finally:
+            self._release(conn)
+        return tables
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
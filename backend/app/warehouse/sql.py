@@ -0,0 +1,136 @@
+"""
+PostgreSQL and MySQL connectors over a pooled SQLAlchemy engine per data source.
+
+Parameters bind by name (``:name`` in the SQL). Streaming uses server-side cursors;
+pool sizing is shared by all relational sources (WAREHOUSE_POOL_SIZE,
+WAREHOUSE_MAX_OVERFLOW, WAREHOUSE_POOL_TIMEOUT, WAREHOUSE_POOL_RECYCLE).
+"""
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from genai.tracing import span
+
+from ..metrics import track_warehouse_query
+from .base import Capabilities, QueryParameters, QueryResult, WarehouseConnector, WarehouseError
+
+WAREHOUSE_POOL_SIZE = int(os.getenv("WAREHOUSE_POOL_SIZE", "5"))
+WAREHOUSE_MAX_OVERFLOW = int(os.getenv("WAREHOUSE_MAX_OVERFLOW", "5"))
+WAREHOUSE_POOL_TIMEOUT = float(os.getenv("WAREHOUSE_POOL_TIMEOUT", "30"))
+WAREHOUSE_POOL_RECYCLE = int(os.getenv("WAREHOUSE_POOL_RECYCLE", "300"))
+
+
+class SqlAlchemyConnector(WarehouseConnector):
+    """Shared implementation for warehouses reachable through a SQLAlchemy dialect"""
+
+    capabilities = Capabilities(streaming=True, introspect=True)
+    driver = ""
+    # Tables and columns of the connection's default schema, in column order
+    columns_query = ""
+
+    def __init__(self, host: str, port: Optional[int], database: str, username: str, password: Optional[str] = None):
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine import URL
+
+        self.database = database
+        url = URL.create(self.driver, username=username, password=password or None, host=host,
+                         port=port or None, database=database)
+        with span("warehouse.connect", source_type=self.source_type):
+            try:
+                self.engine = create_engine(
+                    url,
+                    pool_size=WAREHOUSE_POOL_SIZE,
+                    max_overflow=WAREHOUSE_MAX_OVERFLOW,
+                    pool_timeout=WAREHOUSE_POOL_TIMEOUT,
+                    pool_recycle=WAREHOUSE_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+            except ImportError as e:
+                raise WarehouseError(f"{e.name or 'Database driver'} library not installed.")
+
+    @classmethod
+    def from_source(cls, db_source) -> "SqlAlchemyConnector":
+        return cls(db_source.host, db_source.port, db_source.database, db_source.username, db_source.password)
+
+    def execute(self, sql: str, params: Optional[QueryParameters] = None, max_rows: Optional[int] = None,
+                operation: str = "query", job_id: Optional[str] = None) -> QueryResult:
+        from sqlalchemy import text
+
+        with track_warehouse_query(self.source_type, operation):
+            with self.engine.connect() as conn:
+                result = conn.execute(text(sql), dict(params or ()))
+                columns = list(result.keys())
+                rows = result.fetchmany(max_rows) if max_rows is not None else result.fetchall()
+        with span("warehouse.convert_rows", rows=len(rows)):
+            data_rows = [dict(row._mapping) for row in rows]
+        return QueryResult(columns, data_rows, None, job_id)
+
+    def stream(self, sql: str, params: Optional[QueryParameters] = None, batch_size: int = 1000,
+               operation: str = "stream", job_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            with track_warehouse_query(self.source_type, operation):
+                result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                    text(sql), dict(params or ())
+                )
+            for row in result:
+                yield dict(row._mapping)
+
+    def introspect(self) -> List[Dict[str, Any]]:
+        from sqlalchemy import text
+
+        with track_warehouse_query(self.source_type, "schema_introspection"):
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(self.columns_query)).fetchall()
+
+        tables_map: Dict[str, Dict[str, Any]] = {}
+        for table_schema, table_name, column_name, data_type, is_primary_key in rows:
+            if table_name not in tables_map:
+                tables_map[table_name] = {
+                    "name": table_name,
+                    "schema": table_schema,
+                    "columns": [],
+                    "row_count": 0,
+                    "description": None,
+                }
+            tables_map[table_name]["columns"].append({
+                "name": column_name,
+                "type": str(data_type).upper(),
+                "primary_key": bool(is_primary_key),
+                "description": None,
+            })
+        return list(tables_map.values())
+
+    def close(self):
+        self.engine.dispose()
+
+
+class PostgresConnector(SqlAlchemyConnector):
+    source_type = "postgresql"
+    driver = "postgresql+psycopg2"
+    columns_query = """
+        SELECT c.table_schema, c.table_name, c.column_name, c.data_type,
+               EXISTS (
+                 SELECT 1
+                 FROM information_schema.table_constraints tc
+                 JOIN information_schema.key_column_usage k
+                   ON k.constraint_name = tc.constraint_name AND k.table_schema = tc.table_schema
+                 WHERE tc.constraint_type = 'PRIMARY KEY'
+                   AND tc.table_schema = c.table_schema AND tc.table_name = c.table_name
+                   AND k.column_name = c.column_name
+               ) AS is_primary_key
+        FROM information_schema.columns c
+        WHERE c.table_schema = current_schema()
+        ORDER BY c.table_name, c.ordinal_position
+    """
+
+
+class MySQLConnector(SqlAlchemyConnector):
+    source_type = "mysql"
+    driver = "mysql+pymysql"
+    columns_query = """
+        SELECT table_schema, table_name, column_name, data_type, column_key = 'PRI' AS is_primary_key
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+        ORDER BY table_name, ordinal_position
+    """
@@ -0,0 +1,195 @@
+"""
+Cross-worker cache invalidation: delivery latency and loss for each shared backend.
+
+Two checks:
+
+- backend: --subscribers backend instances (each with its own connection and listener
+  thread, as separate workers would have) receive --events events published through
+  another instance; reports p50/p99 delivery latency and lost events.
+- workers (file and redis only): --workers separate processes with the app's cache
+  configured from CACHE_BACKEND each cache an entitlement resource name; another
+  process updates it with invalidate_resource_names(), and every worker must drop its
+  entry within --timeout seconds.
+
+--backend fakeredis runs the backend check against an in-process Redis stand-in
+(pip install fakeredis); use --backend redis --redis-url ... for a real server.
+
+    python -m benchmarks.bench_cache_invalidation --backend file --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from app.cache import FileCacheBackend, RedisCacheBackend
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, sys, time
+from app.cache import start_invalidation_listener
+from app.entitlements import _name_cache, _name_cache_lock
+from app.models import ResourceType
+
+timeout = float(sys.argv[1])
+key = (ResourceType.dataCube, "bench-cube")
+start_invalidation_listener()
+with _name_cache_lock:
+    _name_cache[key] = (float("inf"), "Bench cube")
+print("ready", flush=True)
+
+deadline = time.monotonic() + timeout
+while time.monotonic() < deadline:
+    with _name_cache_lock:
+        if key not in _name_cache:
+            print(json.dumps({"dropped_at": time.time()}), flush=True)
+            break
+    time.sleep(0.001)
+else:
+    print(json.dumps({"dropped_at": None}), flush=True)
+"""
+
+WRITER = """
+import json, time
+from app.entitlements import invalidate_resource_names
+from app.models import ResourceType
+
+published_at = time.time()
+invalidate_resource_names(ResourceType.dataCube, "bench-cube")
+print(json.dumps({"published_at": published_at}), flush=True)
+"""
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_backend(args, path):
+    if args.backend == "file":
+        return FileCacheBackend(path, poll_interval=args.poll_interval)
+    if args.backend == "fakeredis":
+        import fakeredis
+
+        if not hasattr(args, "_fake_server"):
+            args._fake_server = fakeredis.FakeServer()
+        return RedisCacheBackend(client=fakeredis.FakeRedis(server=args._fake_server))
+    return RedisCacheBackend(args.redis_url)
+
+
+def bench_backend(args, path):
+    """(delivery latencies in seconds, events lost)"""
+    received = {}
+    lock = threading.Lock()
+    subscribers = []
+    for index in range(args.subscribers):
+        backend = make_backend(args, path)
+
+        def on_event(payload, index=index):
+            event = json.loads(payload)
+            with lock:
+                received[(index, event["seq"])] = time.time() - event["sent"]
+
+        backend.subscribe(on_event)
+        subscribers.append(backend)
+    publisher = make_backend(args, path)
+    try:
+        for seq in range(args.events):
+            publisher.publish(json.dumps({"seq": seq, "sent": time.time()}))
+            time.sleep(args.interval)
+        expected = args.subscribers * args.events
+        deadline = time.monotonic() + args.timeout
+        while time.monotonic() < deadline:
+            with lock:
+                if len(received) >= expected:
+                    break
+            time.sleep(0.01)
+    finally:
+        for backend in subscribers + [publisher]:
+            backend.close()
+    with lock:
+        return list(received.values()), expected - len(received)
+
+
+def bench_workers(args, path):
+    """Seconds each worker process took to drop the invalidated name (None: never)"""
+    env = dict(os.environ)
+    env.update({
+        "CACHE_BACKEND": args.backend,
+        "CACHE_PATH": path,
+        "CACHE_POLL_INTERVAL": str(args.poll_interval),
+        "DATABASE_URL": "sqlite://",
+        "PYTHONPATH": BACKEND_DIR,
+    })
+    if args.redis_url:
+        env["CACHE_REDIS_URL"] = args.redis_url
+    workers = [
+        subprocess.Popen([sys.executable, "-c", WORKER, str(args.timeout)], cwd=BACKEND_DIR, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(args.workers)
+    ]
+    try:
+        for worker in workers:
+            if worker.stdout.readline().strip() != "ready":
+                raise RuntimeError("worker failed to start")
+        writer = subprocess.run([sys.executable, "-c", WRITER], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        published_at = json.loads(writer.stdout.strip().splitlines()[-1])["published_at"]
+        delays = []
+        for worker in workers:
+            dropped_at = json.loads(worker.stdout.readline())["dropped_at"]
+            delays.append(dropped_at - published_at if dropped_at is not None else None)
+        return delays
+    finally:
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("file", "fakeredis", "redis"), default="file")
+    parser.add_argument("--redis-url", default=None, help="server for --backend redis")
+    parser.add_argument("--subscribers", type=int, default=4, help="backend instances receiving events")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.002, help="seconds between published events")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes in the end-to-end check")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="file backend polling interval")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for deliveries")
+    parser.add_argument("--max-p99-ms", type=float, default=500.0)
+    args = parser.parse_args(argv)
+    if args.backend == "redis" and not args.redis_url:
+        parser.error("--backend redis needs --redis-url")
+    failures = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "cache.db")
+        latencies, lost = bench_backend(args, path)
+        if latencies:
+            print(f"backend ({args.backend}): {len(latencies)} deliveries to {args.subscribers} subscribers, "
+                  f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+                  f"{lost} lost")
+            if percentile(latencies, 0.99) * 1000 > args.max_p99_ms:
+                failures.append(f"p99 delivery latency above {args.max_p99_ms:.0f} ms")
+        if lost:
+            failures.append(f"{lost} events were not delivered")
+
+        if args.backend != "fakeredis":
+            delays = bench_workers(args, path)
+            applied = [delay for delay in delays if delay is not None]
+            print(f"workers: {len(applied)}/{len(delays)} processes dropped the invalidated name"
+                  + (f", slowest after {max(applied) * 1000:.1f} ms" if applied else ""))
+            if len(applied) < len(delays):
+                failures.append(f"{len(delays) - len(applied)} workers kept the stale name")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Regression benchmark for data cube writes.
+
+Checks that creating a single cube costs the same number of SQL statements no matter
+how many cubes already exist, and that POST /api/data-cubes/import runs a constant
+number of statements for any batch size.
+
+    python -m benchmarks.bench_cube_writes --catalog 10000 --batch 500
+"""
+import argparse
+import sys
+
+from app.models import DataSource, DataCube
+from app.routers import data_cubes
+
+from .common import create_sqlite_session_factory, create_test_client, StatementCounter, timed
+
+# source lookup + cube INSERT + creator grant INSERT + refresh SELECT
+MAX_CREATE_STATEMENTS = 4
+# source lookup + existing-id lookup + cube INSERT + creator grants INSERT for new cubes,
+# or the two lookups + UPDATE for existing ones
+MAX_IMPORT_STATEMENTS = 4
+
+
+def cube_payload(name: str, cube_id: str = None) -> dict:
+    payload = {
+        "name": name,
+        "description": f"{name} description",
+        "query": "SELECT region, SUM(sales) AS total_sales FROM sales GROUP BY region",
+        "dataSourceId": "source-0",
+        "dimensions": ["region"],
+        "measures": ["total_sales"],
+        "metadata": {},
+    }
+    if cube_id:
+        payload["id"] = cube_id
+    return payload
+
+
+def measure_create(client, counter) -> tuple:
+    counter.reset()
+    with timed() as elapsed:
+        client.post("/api/data-cubes", json=cube_payload("Probe")).raise_for_status()
+    return counter.count, elapsed["seconds"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", type=int, default=10000, help="cubes seeded before the second create")
+    parser.add_argument("--batch", type=int, default=500, help="cubes per import request")
+    args = parser.parse_args(argv)
+
+    engine, session_factory = create_sqlite_session_factory()
+    db = session_factory()
+    db.add(DataSource(id="source-0", name="Source 0", type="bigquery", host="p", port=0, database="d", username="u"))
+    db.commit()
+    db.close()
+    client = create_test_client(session_factory, data_cubes.router)
+    counter = StatementCounter(engine)
+
+    small_statements, small_seconds = measure_create(client, counter)
+
+    db = session_factory()
+    db.add_all([
+        DataCube(id=f"seed-{i}", name=f"Seed {i}", query="SELECT 1", data_source_id="source-0")
+        for i in range(args.catalog)
+    ])
+    db.commit()
+    db.close()
+    large_statements, large_seconds = measure_create(client, counter)
+
+    counter.reset()
+    batch = [cube_payload(f"Imported {i}", f"import-{i}") for i in range(args.batch)]
+    with timed() as created:
+        result = client.post("/api/data-cubes/import", json={"cubes": batch}).json()
+    create_import_statements = counter.count
+
+    counter.reset()
+    with timed() as upserted:
+        upsert_result = client.post("/api/data-cubes/import", json={"cubes": batch}).json()
+    upsert_statements = counter.count
+
+    print(f"create (empty catalog): {small_statements} statements, {small_seconds * 1000:.1f} ms")
+    print(f"create ({args.catalog} cubes): {large_statements} statements, {large_seconds * 1000:.1f} ms")
+    print(f"import {args.batch} new: {create_import_statements} statements, "
+          f"{created['seconds'] * 1000:.1f} ms, created={result['created']} updated={result['updated']}")
+    print(f"import {args.batch} existing: {upsert_statements} statements, "
+          f"{upserted['seconds'] * 1000:.1f} ms, created={upsert_result['created']} updated={upsert_result['updated']}")
+
+    failed = False
+    if large_statements != small_statements:
+        print(f"FAIL: single create grew with catalog size ({small_statements} -> {large_statements} statements)")
+        failed = True
+    if large_statements > MAX_CREATE_STATEMENTS:
+        print(f"FAIL: single create issued {large_statements} statements (budget {MAX_CREATE_STATEMENTS})")
+        failed = True
+    for label, count in (("new", create_import_statements), ("existing", upsert_statements)):
+        if count > MAX_IMPORT_STATEMENTS:
+            print(f"FAIL: import of {label} cubes issued {count} statements (budget {MAX_IMPORT_STATEMENTS})")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
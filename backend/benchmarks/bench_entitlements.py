@@ -0,0 +1,109 @@
+"""
+Regression benchmark for GET /api/data-entitlement.
+
+Seeds one user with thousands of grants across all resource types and checks that
+resolving resource names costs a bounded number of SQL statements per request
+(one entitlement query plus at most one IN query per resource type), then reports
+latency for cold and warm (name cache hit) requests.
+
+    python -m benchmarks.bench_entitlements --grants 2000
+"""
+import argparse
+import sys
+
+from app.models import DataSource, DataCube, Dashboard, DataEntitlement, ResourceType
+from app.routers import data_entitlement
+from app.entitlements import invalidate_resource_names
+
+from .common import create_sqlite_session_factory, create_test_client, StatementCounter, timed
+
+# entitlement query + one IN query per resource type
+MAX_STATEMENTS_COLD = 1 + len(ResourceType)
+MAX_STATEMENTS_WARM = 1
+
+
+def seed(session_factory, grants: int, user_id: str):
+    db = session_factory()
+    per_type = max(1, grants // 3)
+    db.add(DataSource(id="source-0", name="Source 0", type="bigquery", host="p", port=0,
+                      database="d", username="u"))
+    db.flush()
+    db.add_all([
+        DataSource(id=f"source-{i}", name=f"Source {i}", type="bigquery", host="p", port=0,
+                   database="d", username="u")
+        for i in range(1, per_type)
+    ])
+    db.add_all([
+        DataCube(id=f"cube-{i}", name=f"Cube {i}", query="SELECT 1", data_source_id="source-0")
+        for i in range(per_type)
+    ])
+    db.flush()
+    db.add_all([
+        Dashboard(id=f"dashboard-{i}", name=f"Dashboard {i}", data_cube_id="cube-0", widgets_json=[])
+        for i in range(per_type)
+    ])
+    prefixes = {
+        ResourceType.dataSource: "source",
+        ResourceType.dataCube: "cube",
+        ResourceType.dashboard: "dashboard",
+    }
+    rows = []
+    for n in range(grants):
+        resource_type = list(prefixes)[n % 3]
+        rows.append(DataEntitlement(
+            id=f"ent-{n}",
+            user_id=user_id,
+            resource_type=resource_type,
+            resource_id=f"{prefixes[resource_type]}-{(n // 3) % per_type}",
+            permissions_json=["read"],
+            granted_by="bench",
+        ))
+    db.add_all(rows)
+    db.commit()
+    db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grants", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    engine, session_factory = create_sqlite_session_factory()
+    seed(session_factory, args.grants, "bench-user")
+    client = create_test_client(session_factory, data_entitlement.router)
+    counter = StatementCounter(engine)
+    headers = {"x-user-id": "bench-user"}
+
+    invalidate_resource_names()
+    counter.reset()
+    with timed() as cold:
+        response = client.get("/api/data-entitlement", headers=headers)
+    response.raise_for_status()
+    cold_statements = counter.count
+
+    warm_seconds = []
+    warm_statements = 0
+    for _ in range(args.iterations):
+        counter.reset()
+        with timed() as warm:
+            client.get("/api/data-entitlement", headers=headers).raise_for_status()
+        warm_seconds.append(warm["seconds"])
+        warm_statements = max(warm_statements, counter.count)
+
+    print(f"grants={len(response.json())}")
+    print(f"cold: {cold_statements} statements, {cold['seconds'] * 1000:.1f} ms")
+    print(f"warm: {warm_statements} statements, {min(warm_seconds) * 1000:.1f} ms (best of {args.iterations})")
+
+    failed = False
+    if cold_statements > MAX_STATEMENTS_COLD:
+        print(f"FAIL: cold request issued {cold_statements} statements (budget {MAX_STATEMENTS_COLD})")
+        failed = True
+    if warm_statements > MAX_STATEMENTS_WARM:
+        print(f"FAIL: warm request issued {warm_statements} statements (budget {MAX_STATEMENTS_WARM})")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Benchmark of list response serialization: FastAPI's response_model path vs the opt-in
+fast path (app.serialization, FAST_RESPONSES=true) on a large catalog listing.
+
+Seeds --cubes data cubes (entitlements not enforced, so every cube is listed), then:
+
+- serialization: the GET /api/data-cubes handler's content turned into a response body,
+  the way FastAPI does it (validate against the route's response_model, dump, encode
+  with JSONResponse) and with model_response(), with and without gzip
+- end to end: GET /api/data-cubes through the full app with each path (query, ORM
+  loading and row building included, so the gain is diluted)
+- concurrent: rounds of --concurrency simultaneous GET /api/data-cubes on one event
+  loop (in-process ASGI client), reporting throughput and the longest the loop went
+  without running a 1 ms ticker (responses are built in worker threads, but pydantic-core
+  and json hold the GIL while encoding a body, so stalls remain under load)
+
+Reports medians over --requests runs and body sizes; fails when the two paths' JSON
+differs, a large body is not gzipped, serialization is not at least --min-speedup
+times faster on the fast path, or the fast path's concurrent throughput is lower.
+
+    python -m benchmarks.bench_list_serialization --cubes 10000 --requests 20
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def median_seconds(fn, runs: int):
+    """(median seconds, last result)"""
+    latencies = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies), result
+
+
+async def concurrent_round_trips(app, path: str, concurrency: int, rounds: int, accept_encoding: str):
+    """(requests per second, max event loop stall in seconds) for `rounds` bursts of `concurrency` GETs"""
+    import httpx
+
+    stall = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal stall
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - started - 0.001)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        # Warm up the pools and caches outside the measurement
+        (await client.get(path, headers={"Accept-Encoding": accept_encoding})).raise_for_status()
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        for _ in range(rounds):
+            responses = await asyncio.gather(*(
+                client.get(path, headers={"Accept-Encoding": accept_encoding}) for _ in range(concurrency)
+            ))
+            for response in responses:
+                response.raise_for_status()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await ticking
+    return concurrency * rounds / elapsed, stall
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cubes", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20, help="runs per path")
+    parser.add_argument("--min-speedup", type=float, default=1.3, help="required serialization speedup")
+    parser.add_argument("--concurrency", type=int, default=8, help="simultaneous requests per concurrent round")
+    parser.add_argument("--rounds", type=int, default=3, help="concurrent rounds per path")
+    args = parser.parse_args(argv)
+    failures = []
+
+    handle, database = tempfile.mkstemp(prefix="securebi-bench-", suffix=".db")
+    os.close(handle)
+    # Configure the app before importing it: it binds its engine at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["ENFORCE_ENTITLEMENTS"] = "false"
+    os.environ["DB_ASYNC"] = "false"
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.testclient import TestClient
+    from starlette.requests import Request
+
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.routers.data_cubes import _list_data_cubes
+    from app.schemas import DataCubeResponse
+    from app.serialization import configure_fast_responses, model_response
+
+    from .load_test import seed_catalog
+
+    logging.getLogger().setLevel(logging.WARNING)
+    path = "/api/data-cubes"
+    try:
+        seed_catalog(engine, sources=100, cubes=args.cubes, dashboards=0, entitlements=0)
+        with SessionLocal() as db:
+            content = _list_data_cubes(db, "user-1")
+        route = next(r for r in app.routes if getattr(r, "path", None) == path and "GET" in r.methods)
+
+        def standard():
+            value = asyncio.run(serialize_response(field=route.response_field, response_content=content))
+            return JSONResponse(value).body
+
+        def fast(accept_encoding: str):
+            request = Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+            return lambda: asyncio.run(model_response(request, list[DataCubeResponse], content)).body
+
+        # With FAST_RESPONSES off, model_response must produce exactly FastAPI's body
+        configure_fast_responses(False)
+        if fast("identity")() != standard():
+            failures.append("model_response without FAST_RESPONSES differs from FastAPI's response_model body")
+
+        configure_fast_responses(True)
+        standard_seconds, standard_body = median_seconds(standard, args.requests)
+        fast_seconds, fast_body = median_seconds(fast("identity"), args.requests)
+        gzip_seconds, gzip_body = median_seconds(fast("gzip"), args.requests)
+        print(f"{args.cubes} cubes, {len(standard_body) / 1e6:.2f} MB of JSON, {len(gzip_body) / 1e3:.0f} kB gzipped")
+        print(f"serialization: response_model {standard_seconds * 1000:.1f} ms, fast {fast_seconds * 1000:.1f} ms "
+              f"({standard_seconds / fast_seconds:.1f}x), fast + gzip {gzip_seconds * 1000:.1f} ms")
+        if json.loads(fast_body) != json.loads(standard_body):
+            failures.append("fast path JSON differs from the response_model path")
+        if standard_seconds / fast_seconds < args.min_speedup:
+            failures.append(f"serialization speedup {standard_seconds / fast_seconds:.1f}x < {args.min_speedup}x")
+
+        client = TestClient(app)
+        results = {}
+        for label, enabled, accept_encoding in (
+            ("response_model", False, "identity"),
+            ("fast", True, "identity"),
+            ("fast + gzip", True, "gzip"),
+        ):
+            configure_fast_responses(enabled)
+            results[label] = median_seconds(
+                lambda: client.get(path, headers={"Accept-Encoding": accept_encoding}), args.requests
+            )
+        configure_fast_responses(False)
+        baseline = results["response_model"][0]
+        print("end to end: " + ", ".join(
+            f"{label} {seconds * 1000:.1f} ms ({baseline / seconds:.2f}x)" for label, (seconds, _) in results.items()
+        ))
+        gzip_response = results["fast + gzip"][1]
+        if gzip_response.headers.get("content-encoding") != "gzip":
+            failures.append("large fast-path response was not gzipped")
+        if gzip_response.json() != results["response_model"][1].json():
+            failures.append("gzipped fast-path JSON differs from the response_model path")
+
+        throughput = {}
+        for label, enabled, accept_encoding in (
+            ("response_model", False, "identity"),
+            ("fast", True, "identity"),
+            ("fast + gzip", True, "gzip"),
+        ):
+            configure_fast_responses(enabled)
+            gc.collect()
+            throughput[label], stall = asyncio.run(
+                concurrent_round_trips(app, path, args.concurrency, args.rounds, accept_encoding)
+            )
+            print(f"concurrent ({args.concurrency} at a time): {label} {throughput[label]:.1f} req/s "
+                  f"({throughput[label] / throughput['response_model']:.2f}x), "
+                  f"longest event loop stall {stall * 1000:.1f} ms")
+        configure_fast_responses(False)
+        if throughput["fast"] < throughput["response_model"]:
+            failures.append("fast path concurrent throughput is below the response_model path")
+    finally:
+        engine.dispose()
+        os.remove(database)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Load test of the resilient LLM client against the local fake Gen AI client.
+
+Fires a burst of concurrent generations (from threads, like threadpool endpoints, and
+from coroutines) at a fake backend with simulated latency and a retryable error rate,
+then checks that the concurrency limit held, errors were retried, that a dead
+backend trips the circuit breaker so later calls fail fast, and that a half-open probe
+which is cancelled or abandoned mid-stream does not keep the circuit open.
+
+    python -m benchmarks.bench_llm_client --requests 200 --concurrency 8 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from genai.client import CircuitBreaker, CircuitOpenError, GenAITransport, LLMUnavailableError, ResilientLLMClient
+from genai.fakes import FakeGenAIClient
+
+PROMPT = "Table: shop.orders\n    - id: INT64\n    - region: STRING\nUser Request: orders by region"
+MODEL = "fake-model"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_client(fake, concurrency, timeout=5.0, breaker=None):
+    return ResilientLLMClient(
+        transport=GenAITransport(lambda: fake),
+        max_concurrency=concurrency,
+        timeout=timeout,
+        max_retries=3,
+        backoff_base=0.01,
+        backoff_max=0.1,
+        breaker=breaker or CircuitBreaker(failure_threshold=1000, reset_timeout=1.0),
+    )
+
+
+def run_threads(client, n_requests, threads):
+    latencies, errors = [], 0
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            client.generate_sync(PROMPT, MODEL)
+            return time.perf_counter() - started, None
+        except LLMUnavailableError as e:
+            return time.perf_counter() - started, e
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for elapsed, error in pool.map(one, range(n_requests)):
+            latencies.append(elapsed)
+            errors += error is not None
+    return latencies, errors
+
+
+async def run_coroutines(client, n_requests):
+    async def one():
+        started = time.perf_counter()
+        try:
+            await client.generate(PROMPT, MODEL)
+            return time.perf_counter() - started, None
+        except LLMUnavailableError as e:
+            return time.perf_counter() - started, e
+
+    results = await asyncio.gather(*(one() for _ in range(n_requests)))
+    return [r[0] for r in results], sum(1 for r in results if r[1] is not None)
+
+
+def cancel_probe(client, fake):
+    """Start the half-open probe against a slow backend and cancel it (e.g. a request timeout)"""
+    fake.latency = 1.0
+
+    async def probe():
+        try:
+            await asyncio.wait_for(client.generate(PROMPT, MODEL), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(probe())
+
+
+def abandon_stream_probe(client, fake):
+    """Read one chunk of a streamed half-open probe, then stop (e.g. the client disconnected)"""
+    stream = client.stream_sync(PROMPT, MODEL)
+    next(stream)
+    stream.close()
+
+
+def report(label, latencies, errors, wall, client, fake):
+    stats = client.stats()
+    print(f"{label}: {len(latencies)} requests in {wall:.2f}s ({len(latencies) / wall:.0f} req/s), "
+          f"p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms, "
+          f"errors {errors}, retries {stats['retries']}, backend max in flight {fake.max_in_flight}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    logging.getLogger("genai.client").setLevel(logging.ERROR)
+    failures = []
+
+    # Bursts from threads and from coroutines, against a flaky backend
+    for label, runner in (
+        ("threads", lambda c: run_threads(c, args.requests, threads=args.requests)),
+        ("asyncio", lambda c: asyncio.run(run_coroutines(c, args.requests))),
+    ):
+        fake = FakeGenAIClient(latency=args.latency, error_rate=args.error_rate)
+        client = make_client(fake, args.concurrency)
+        started = time.perf_counter()
+        latencies, errors = runner(client)
+        report(label, latencies, errors, time.perf_counter() - started, client, fake)
+        if fake.max_in_flight > args.concurrency:
+            failures.append(f"{label}: {fake.max_in_flight} concurrent backend calls > limit {args.concurrency}")
+        if args.error_rate and client.stats()["retries"] == 0:
+            failures.append(f"{label}: no retries despite error rate {args.error_rate}")
+
+    # Dead backend: the breaker opens and the remaining calls fail fast
+    fake = FakeGenAIClient(latency=args.latency, error_rate=1.0)
+    client = make_client(fake, args.concurrency, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+    started = time.perf_counter()
+    latencies, errors = run_threads(client, 50, threads=4)
+    wall = time.perf_counter() - started
+    stats = client.stats()
+    print(f"dead backend: {errors}/50 failed in {wall:.2f}s, backend calls {len(fake.calls)}, "
+          f"rejected by open circuit {stats['rejected_open_circuit']}, circuit {stats['circuit']}")
+    if stats["circuit"] != CircuitBreaker.OPEN or stats["rejected_open_circuit"] == 0:
+        failures.append("dead backend did not open the circuit")
+    try:
+        client.generate_sync(PROMPT, MODEL)
+        failures.append("call succeeded against a dead backend")
+    except CircuitOpenError:
+        pass
+
+    # A cancelled or abandoned half-open probe must let the next call probe again
+    for label, abandon_probe in (("cancelled probe", cancel_probe), ("abandoned stream probe", abandon_stream_probe)):
+        fake = FakeGenAIClient(error_rate=1.0)
+        client = make_client(fake, args.concurrency, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        try:
+            client.generate_sync(PROMPT, MODEL)
+        except LLMUnavailableError:
+            pass
+        time.sleep(0.1)
+        fake.error_rate = 0.0
+        abandon_probe(client, fake)
+        time.sleep(0.05)  # the cancellation lands on the client loop
+        fake.latency = 0.0
+        try:
+            client.generate_sync(PROMPT, MODEL)
+            print(f"{label}: next call succeeded, circuit {client.stats()['circuit']}")
+        except CircuitOpenError:
+            failures.append(f"{label}: circuit stuck open after the probe was abandoned")
+
+    # Timeouts count as retryable failures
+    fake = FakeGenAIClient(latency=0.5)
+    client = make_client(fake, args.concurrency, timeout=0.05)
+    try:
+        client.generate_sync(PROMPT, MODEL)
+        failures.append("slow call did not time out")
+    except LLMUnavailableError as e:
+        print(f"slow backend: {type(e).__name__} after {client.stats()['timeouts']} timed-out attempts")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
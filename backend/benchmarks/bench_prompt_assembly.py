@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of data cube prompt assembly for a large schema.
+
+Compares the original string-concatenation renderer with the memoized PreparedSchema
+path (cold: first request for a schema version, warm: every later request), for both
+the full schema and a pruned selection.
+
+    python -m benchmarks.bench_prompt_assembly --tables 2000 --columns 25
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from genai.data_cube_prompt import (
+    build_data_cube_prompt,
+    invalidate_prepared_schema,
+    prepare_schema,
+)
+
+DATA_SOURCE_INFO = {"name": "Bench", "type": "bigquery", "database": "bench"}
+USER_REQUEST = "Total order revenue by customer country and month"
+
+
+def legacy_tables_text(available_tables):
+    """The renderer as it was before memoization (repeated += concatenation)"""
+    tables_info = ""
+    for table in available_tables:
+        table_name = table.get("name", "unknown")
+        schema_name = table.get("schema", "")
+        columns = table.get("columns", [])
+        row_count = table.get("row_count", 0)
+        tables_info += f"\nTable: {schema_name + '.' if schema_name else ''}{table_name}\n"
+        tables_info += f"  Row Count: {row_count}\n"
+        tables_info += "  Columns:\n"
+        for col in columns:
+            col_name = col.get("name", "")
+            col_type = col.get("type", "")
+            col_desc = col.get("description", "")
+            pk = " (PRIMARY KEY)" if col.get("primary_key", False) else ""
+            tables_info += f"    - {col_name}: {col_type}{pk}"
+            if col_desc:
+                tables_info += f" - {col_desc}"
+            tables_info += "\n"
+    return tables_info
+
+
+def synthetic_schema(n_tables: int, n_columns: int):
+    subjects = ["order", "customer", "product", "invoice", "payment", "shipment", "session", "campaign"]
+    tables = []
+    for t in range(n_tables):
+        subject = subjects[t % len(subjects)]
+        columns = [{"name": "id", "type": "INT64", "primary_key": True, "description": None}]
+        columns += [
+            {"name": f"{subjects[(t + c) % len(subjects)]}_attr_{c}", "type": "STRING",
+             "primary_key": False, "description": f"Attribute {c} of {subject}" if c % 3 == 0 else None}
+            for c in range(1, n_columns)
+        ]
+        tables.append({"name": f"{subject}_table_{t}", "schema": "bench", "columns": columns, "row_count": t})
+    return tables
+
+
+def time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    tables = synthetic_schema(args.tables, args.columns)
+
+    def legacy_full():
+        tables_text = legacy_tables_text(tables)
+        build_data_cube_prompt(USER_REQUEST, DATA_SOURCE_INFO, tables, tables_text=tables_text)
+
+    def prepared_full():
+        prepared = prepare_schema(tables, "bench:v1")
+        build_data_cube_prompt(USER_REQUEST, DATA_SOURCE_INFO, tables, tables_text=prepared.render())
+
+    def prepared_pruned():
+        prepared = prepare_schema(tables, "bench:v1")
+        selection = prepared.select(USER_REQUEST)
+        build_data_cube_prompt(USER_REQUEST, DATA_SOURCE_INFO, selection.tables,
+                               tables_text=prepared.render(selection.indexes))
+
+    def cold(fn):
+        def run():
+            invalidate_prepared_schema()
+            fn()
+        return run
+
+    # The two renderers must produce identical prompt text
+    assert legacy_tables_text(tables) == prepare_schema(tables, "bench:check").render()
+    invalidate_prepared_schema()
+
+    results = {
+        "legacy full schema (+= concatenation)": time_ms(legacy_full, args.repeat),
+        "prepared full schema, cold": time_ms(cold(prepared_full), args.repeat),
+        "prepared full schema, warm": time_ms(prepared_full, args.repeat),
+        "prepared pruned schema, cold": time_ms(cold(prepared_pruned), args.repeat),
+        "prepared pruned schema, warm": time_ms(prepared_pruned, args.repeat),
+    }
+
+    print(f"schema: {args.tables} tables x {args.columns} columns "
+          f"({len(legacy_tables_text(tables)) // 1024} KiB of prompt text)")
+    for label, ms in results.items():
+        print(f"{label:<40} {ms:9.2f} ms (median of {args.repeat})")
+
+    if results["prepared full schema, warm"] >= results["legacy full schema (+= concatenation)"]:
+        print("FAIL: warm prompt assembly is not faster than the legacy renderer")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
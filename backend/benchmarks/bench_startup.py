@@ -0,0 +1,145 @@
+"""
+Cold-start benchmark: how long a fresh worker takes to become ready and to serve its
+first database-backed request, per startup mode.
+
+Every run is a new Python process (as a new container instance would be) against a
+SQLite file migrated once up front with ``python -m app.migrate``. To stand in for a
+remote metadata database (Cloud SQL), which is what cold starts pay for, the child delays
+every new connection by --connect-latency seconds (network and TLS handshake) and every
+statement by --round-trip seconds. Modes:
+
+- standard: create_all at import
+- fast: STARTUP_MODE=fast (no schema work at import)
+- fast+prewarm: STARTUP_MODE=fast STARTUP_PREWARM=true
+
+For each, the best of --runs (process start-up is noisy; the minimum is the most stable)
+of: import time, time until the app is ready (import plus startup hooks), and the latency
+of GET /api/data-sources issued --idle seconds after startup. Fails when fast mode is not ready sooner than standard, or when prewarming does
+not make the first database request faster.
+
+    python -m benchmarks.bench_startup --runs 7 --connect-latency 0.1 --round-trip 0.002
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+from sqlite3 import dbapi2
+
+latency, round_trip, idle = (float(arg) for arg in sys.argv[1:4])
+_connect = dbapi2.connect
+
+def slow_connect(*args, **kwargs):
+    time.sleep(latency)
+    return _connect(*args, **kwargs)
+
+# What SQLAlchemy's pysqlite dialect calls
+dbapi2.connect = slow_connect
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+@event.listens_for(Engine, "before_cursor_execute")
+def slow_execute(*args):
+    time.sleep(round_trip)
+
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    time.sleep(idle)
+    request_started = time.perf_counter()
+    response = client.get("/api/data-sources")
+    first_request = time.perf_counter() - request_started
+    response.raise_for_status()
+
+print(json.dumps({
+    "import": imported - started,
+    "ready": ready - started,
+    "first_request": first_request,
+}))
+"""
+
+MODES = {
+    "standard": {"STARTUP_MODE": "standard", "STARTUP_PREWARM": "false"},
+    "fast": {"STARTUP_MODE": "fast", "STARTUP_PREWARM": "false"},
+    "fast+prewarm": {"STARTUP_MODE": "fast", "STARTUP_PREWARM": "true"},
+}
+
+
+def child_env(database_url: str, overrides: dict) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "GENAI_FAKE_CLIENT": "true",
+        "DB_ASYNC": "false",
+        "PYTHONPATH": BACKEND_DIR,
+    })
+    env.pop("REPLICA_DATABASE_URL", None)
+    env.update(overrides)
+    return env
+
+
+def migrate(database_url: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "app.migrate"], cwd=BACKEND_DIR, check=True,
+                   env=child_env(database_url, {}), capture_output=True)
+    return time.perf_counter() - started
+
+
+def run_once(database_url: str, overrides: dict, args) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, str(args.connect_latency), str(args.round_trip), str(args.idle)],
+        cwd=BACKEND_DIR, env=child_env(database_url, overrides), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="worker starts per mode")
+    parser.add_argument("--connect-latency", type=float, default=0.1,
+                        help="seconds added to every new database connection")
+    parser.add_argument("--round-trip", type=float, default=0.002,
+                        help="seconds added to every SQL statement")
+    parser.add_argument("--idle", type=float, default=1.0,
+                        help="seconds between startup and the first request")
+    args = parser.parse_args(argv)
+    failures = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database_url = f"sqlite:///{os.path.join(temp_dir, 'startup.db')}"
+        print(f"migrate: {migrate(database_url) * 1000:.0f} ms (once per deploy)")
+
+        best = {}
+        for mode, overrides in MODES.items():
+            runs = [run_once(database_url, overrides, args) for _ in range(args.runs)]
+            best[mode] = {key: min(run[key] for run in runs) for key in runs[0]}
+            print(f"{mode:>13}: import {best[mode]['import'] * 1000:.0f} ms, "
+                  f"ready {best[mode]['ready'] * 1000:.0f} ms, "
+                  f"first request {best[mode]['first_request'] * 1000:.1f} ms")
+
+    if best["fast"]["ready"] >= best["standard"]["ready"]:
+        failures.append("fast mode was not ready sooner than standard mode")
+    if best["fast+prewarm"]["first_request"] >= best["fast"]["first_request"]:
+        failures.append("prewarming did not make the first database request faster")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Benchmark of the warehouse connector layer against the embedded local engine.
+
+Seeds a table in a LocalConnector on a temporary SQLite file, then measures:
+
+- execute vs stream: rows/s and peak traced memory (execute materializes the
+  result, stream yields batch by batch)
+- connector reuse vs creation: per-query latency with the shared connector from
+  get_connector() against a connector built for every query
+- cancellation: time from cancel(job_id) to the running query raising
+
+and fails when streaming peaks at more than half the memory of execute, reuse is
+not faster than per-query creation, or cancellation takes longer than --max-cancel-ms.
+
+    python -m benchmarks.bench_warehouse --rows 200000 --queries 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from app.warehouse import LocalConnector, get_connector, invalidate_connector
+
+SEED_SQL = """
+    INSERT INTO sales (region, amount)
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+    SELECT CASE i % 4 WHEN 0 THEN 'EU' WHEN 1 THEN 'US' WHEN 2 THEN 'APAC' ELSE 'LATAM' END, i * 1.5
+    FROM n
+"""
+# Runs until interrupted
+ENDLESS_SQL = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+
+
+def seed(connector, rows: int):
+    connector.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, region TEXT, amount REAL)")
+    connector.execute(SEED_SQL, params=[("rows", rows)])
+
+
+def traced(fn) -> tuple:
+    """(result, seconds, peak bytes allocated while running fn)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+        return result, time.perf_counter() - started, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_execute(connector) -> tuple:
+    return traced(lambda: len(connector.execute("SELECT * FROM sales").rows))
+
+
+def measure_stream(connector, batch_size: int) -> tuple:
+    return traced(lambda: sum(1 for _ in connector.stream("SELECT * FROM sales", batch_size=batch_size)))
+
+
+def measure_reuse(database: str, queries: int) -> tuple:
+    source = SimpleNamespace(
+        id="bench-local", type="local", host="", port=0, database=database, username="",
+        password=None, project_id=None, dataset=None, location=None,
+    )
+    sql = "SELECT region, SUM(amount) AS total FROM sales WHERE id <= 1000 GROUP BY region"
+    started = time.perf_counter()
+    try:
+        for _ in range(queries):
+            get_connector(source).execute(sql)
+    finally:
+        invalidate_connector(source.id)
+    shared = (time.perf_counter() - started) / queries
+
+    started = time.perf_counter()
+    for _ in range(queries):
+        connector = LocalConnector(database)
+        connector.execute(sql)
+        connector.close()
+    return shared, (time.perf_counter() - started) / queries
+
+
+def measure_cancel(connector, delay: float) -> float:
+    outcome = {}
+
+    def run():
+        try:
+            connector.execute(ENDLESS_SQL, job_id="bench-cancel")
+        except Exception as e:
+            outcome["error"] = e
+        outcome["finished"] = time.perf_counter()
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    time.sleep(delay)
+    requested = time.perf_counter()
+    if not connector.cancel("bench-cancel"):
+        raise RuntimeError("query was not running when cancelled")
+    worker.join()
+    if "error" not in outcome:
+        raise RuntimeError("cancelled query completed")
+    return outcome["finished"] - requested
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="rows seeded in the benchmark table")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500, help="queries per reuse/creation run")
+    parser.add_argument("--database", default=None, help="SQLite file (default: temporary file)")
+    parser.add_argument("--max-cancel-ms", type=float, default=250)
+    args = parser.parse_args(argv)
+    failures = []
+
+    database = args.database
+    temp_dir = None
+    if database is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        database = os.path.join(temp_dir.name, "warehouse.db")
+    connector = LocalConnector(database)
+    try:
+        seed(connector, args.rows)
+
+        count, seconds, execute_peak = measure_execute(connector)
+        print(f"execute: {count} rows in {seconds:.2f}s ({count / seconds:.0f} rows/s), "
+              f"peak {execute_peak / 1e6:.1f} MB")
+        count, seconds, stream_peak = measure_stream(connector, args.batch_size)
+        print(f"stream:  {count} rows in {seconds:.2f}s ({count / seconds:.0f} rows/s), "
+              f"peak {stream_peak / 1e6:.1f} MB")
+        if stream_peak > execute_peak / 2:
+            failures.append(f"stream peaked at {stream_peak / 1e6:.1f} MB vs {execute_peak / 1e6:.1f} MB for execute")
+
+        shared, created = measure_reuse(database, args.queries)
+        print(f"connector reuse: {shared * 1000:.2f} ms/query shared, {created * 1000:.2f} ms/query "
+              f"creating a connector per query")
+        if shared >= created:
+            failures.append("shared connector was not faster than creating one per query")
+
+        cancel_seconds = measure_cancel(connector, delay=0.1)
+        print(f"cancel: running query stopped {cancel_seconds * 1000:.1f} ms after cancel()")
+        if cancel_seconds * 1000 > args.max_cancel_ms:
+            failures.append(f"cancellation took {cancel_seconds * 1000:.0f} ms > {args.max_cancel_ms:.0f} ms")
+    finally:
+        connector.close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Shared helpers for the backend benchmarks.
+
+Benchmarks run the real routers against a throwaway SQLite metadata database so
+they need no MySQL server or cloud credentials. Run them from the backend directory,
+e.g. ``python -m benchmarks.bench_entitlements``.
+"""
+import time
+from contextlib import contextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+# Base from models, not database: importing it there registers every table on Base.metadata
+from app.models import Base
+
+
+def create_sqlite_session_factory(url: str = "sqlite://"):
+    """Create a SQLite engine with all metadata tables and return (engine, sessionmaker)"""
+    if url == "sqlite://":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def create_test_client(session_factory, *routers) -> TestClient:
+    """Mount the given routers on a bare FastAPI app that uses session_factory for get_db"""
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+class StatementCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+    def close(self):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timed():
+    """Yield a dict whose 'seconds' key is filled in when the block exits"""
+    result = {}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - started
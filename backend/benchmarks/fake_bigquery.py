@@ -0,0 +1,124 @@
+"""
+Local stand-in for ``google.cloud.bigquery.Client`` used by the load tests.
+
+FakeBigQueryClient answers the queries the backend issues with synthetic rows after a
+configurable latency:
+
+- INFORMATION_SCHEMA.COLUMNS: `tables` tables of `columns` columns each
+- dry runs (``QueryJobConfig(dry_run=True)``): only ``total_bytes_processed``
+- cube summary queries (``WITH _cube``): a totals row with zero measures
+- anything else: up to `rows` rows of (id, region, amount)
+
+install_fake_bigquery() makes every ``bigquery.Client(...)`` the backend constructs
+return the given fake (the BigQuery connector looks the class up on the module when it
+is created, so install it before the first request).
+"""
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+_REGIONS = ("EU", "US", "APAC", "LATAM")
+_COLUMN_TYPES = ("STRING", "INT64", "FLOAT64", "DATE", "TIMESTAMP", "BOOL")
+# Measure aliases in the totals SELECT of a cube summary query
+_SUMMARY_MEASURE = re.compile(r"AS FLOAT64\)\) AS `(\w+)`")
+
+
+class FakeRow(dict):
+    """Mimics google.cloud.bigquery.Row (mapping access, ``keys()``, ``dict(row)``)"""
+
+    def __missing__(self, key):
+        return 0
+
+
+class FakeQueryJob:
+    def __init__(self, rows: List[FakeRow], total_bytes_processed: int, job_id: Optional[str] = None):
+        self._rows = rows
+        self.total_bytes_processed = total_bytes_processed
+        self.job_id = job_id
+        self.cancelled = False
+
+    def result(self, max_results: Optional[int] = None, page_size: Optional[int] = None, **_):
+        return list(self._rows if max_results is None else self._rows[:max_results])
+
+    def cancel(self) -> bool:
+        self.cancelled = True
+        return True
+
+    def __iter__(self):
+        return iter(self.result())
+
+
+class FakeBigQueryClient:
+    """Thread-safe fake with per-query latency (seconds, +/- `jitter` fraction)"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.2,
+        rows: int = 100,
+        tables: int = 20,
+        columns: int = 8,
+        bytes_per_query: int = 10 * 1024 * 1024,
+        dry_run_latency: Optional[float] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rows = rows
+        self.tables = tables
+        self.columns = columns
+        self.bytes_per_query = bytes_per_query
+        self.dry_run_latency = latency / 5 if dry_run_latency is None else dry_run_latency
+        self.queries = 0
+        self._lock = threading.Lock()
+        self._schema_rows = [
+            FakeRow(
+                table_name=f"table_{t}",
+                column_name="id" if c == 0 else f"col_{t}_{c}",
+                data_type="INT64" if c == 0 else _COLUMN_TYPES[c % len(_COLUMN_TYPES)],
+                is_nullable="NO" if c == 0 else "YES",
+                ordinal_position=c + 1,
+            )
+            for t in range(tables)
+            for c in range(columns)
+        ]
+        self._data_rows = [
+            FakeRow(id=i, region=_REGIONS[i % len(_REGIONS)], amount=round(i * 1.5, 2))
+            for i in range(rows)
+        ]
+
+    def __call__(self, *args, **kwargs) -> "FakeBigQueryClient":
+        """Stands in for the ``bigquery.Client`` constructor"""
+        return self
+
+    def _sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def query(self, sql: str, job_config=None, job_id: Optional[str] = None, **_) -> FakeQueryJob:
+        with self._lock:
+            self.queries += 1
+        if getattr(job_config, "dry_run", False):
+            self._sleep(self.dry_run_latency)
+            return FakeQueryJob([], self.bytes_per_query, job_id)
+        self._sleep(self.latency)
+        if "INFORMATION_SCHEMA.COLUMNS" in sql:
+            return FakeQueryJob(self._schema_rows, 0, job_id)
+        if sql.lstrip().startswith("WITH _cube"):
+            measures = {name: 0 for name in _SUMMARY_MEASURE.findall(sql.split("UNION ALL")[0])}
+            totals = FakeRow(_dimension=None, _value=None, _rows=self.rows, **measures)
+            return FakeQueryJob([totals], self.bytes_per_query, job_id)
+        return FakeQueryJob(self._data_rows, self.bytes_per_query, job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queries": self.queries}
+
+
+def install_fake_bigquery(fake: FakeBigQueryClient) -> FakeBigQueryClient:
+    """Make ``google.cloud.bigquery.Client(...)`` return `fake` in this process"""
+    from google.cloud import bigquery
+
+    bigquery.Client = fake
+    return fake
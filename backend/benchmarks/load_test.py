@@ -0,0 +1,327 @@
+"""
+Load test of the full FastAPI app against a seeded local database and fake backends.
+
+Seeds a synthetic catalog (default 1k BigQuery data sources, 10k cubes, 2k dashboards
+and 50k entitlements spread over 100 users), replaces BigQuery and Vertex AI with local
+fakes with configurable latency, then drives every router at each level of a
+concurrency sweep and records throughput and latency percentiles per scenario.
+
+The app is imported from app.main with DATABASE_URL pointing at the benchmark database
+(a fresh SQLite file by default; pass a local MySQL URL to test against MySQL, which
+must be an empty, disposable database) and served in-process over ASGI, so the numbers
+include middleware, validation and serialization but no network.
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 200 --output report.json
+    python -m benchmarks.load_test --baseline report.json --tolerance 0.25
+
+The JSON report holds the configuration and one entry per (scenario, concurrency). With
+--baseline, p99 latency and throughput are compared to an earlier report and the run
+exits non-zero when any scenario regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Request factory: (rng, request number) -> (method, path, json body or None)
+RequestFactory = Callable[[random.Random, int], Tuple[str, str, Optional[dict]]]
+
+USER_COUNT = 100
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def chunked(rows: List[dict], size: int = 5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def seed_catalog(engine, sources: int, cubes: int, dashboards: int, entitlements: int, seed: int = 0) -> Dict[str, int]:
+    """Bulk insert a synthetic catalog (Core inserts, a few statements per 5k rows)"""
+    from app.models import AppConfig, Dashboard, DataCube, DataEntitlement, DataSource, ResourceType
+
+    rng = random.Random(seed)
+    source_rows = [
+        {"id": f"source-{i}", "name": f"Source {i}", "type": "bigquery", "host": f"project-{i % 10}",
+         "port": 0, "database": f"dataset_{i}", "username": "bench", "status": "connected",
+         "project_id": f"project-{i % 10}", "dataset": f"dataset_{i}", "location": "US"}
+        for i in range(sources)
+    ]
+    cube_rows = [
+        {"id": f"cube-{i}", "name": f"Cube {i}", "description": f"Synthetic cube {i}",
+         "query": f"SELECT region, SUM(amount) AS amount FROM table_{i % 20} GROUP BY region",
+         "data_source_id": f"source-{i % sources}", "dimensions_json": ["region"],
+         "measures_json": ["amount"], "metadata_json": {"seeded": True}}
+        for i in range(cubes)
+    ]
+    dashboard_rows = [
+        {"id": f"dashboard-{i}", "name": f"Dashboard {i}", "description": f"Synthetic dashboard {i}",
+         "data_cube_id": f"cube-{i % cubes}",
+         "widgets_json": [{"id": "w1", "type": "bar", "title": "Amount by region",
+                           "config": {"dimension": "region", "measure": "amount"},
+                           "x": 0, "y": 0, "width": 6, "height": 4}]}
+        for i in range(dashboards)
+    ]
+    counts = {
+        ResourceType.dataSource.name: sources,
+        ResourceType.dataCube.name: cubes,
+        ResourceType.dashboard.name: dashboards,
+    }
+    prefixes = {ResourceType.dataSource.name: "source", ResourceType.dataCube.name: "cube",
+                ResourceType.dashboard.name: "dashboard"}
+    entitlement_rows = []
+    seen = set()
+    while len(entitlement_rows) < entitlements and len(seen) < USER_COUNT * (sources + cubes + dashboards):
+        resource_type = rng.choice(list(counts))
+        key = (f"user-{rng.randrange(USER_COUNT)}", resource_type, f"{prefixes[resource_type]}-{rng.randrange(counts[resource_type])}")
+        if key in seen:
+            continue
+        seen.add(key)
+        entitlement_rows.append({
+            "id": f"ent-{len(entitlement_rows)}", "user_id": key[0], "resource_type": key[1],
+            "resource_id": key[2], "permissions_json": ["read"], "granted_by": "bench",
+        })
+    config_rows = [{"id": f"config-{i}", "key": f"bench.key.{i}", "value": str(i)} for i in range(20)]
+
+    with engine.begin() as conn:
+        for model, rows in (
+            (DataSource, source_rows),
+            (DataCube, cube_rows),
+            (Dashboard, dashboard_rows),
+            (DataEntitlement, entitlement_rows),
+            (AppConfig, config_rows),
+        ):
+            for chunk in chunked(rows):
+                conn.execute(model.__table__.insert(), chunk)
+    return {"sources": sources, "cubes": cubes, "dashboards": dashboards,
+            "entitlements": len(entitlement_rows), "users": USER_COUNT}
+
+
+def build_scenarios(catalog: Dict[str, int]) -> Dict[str, RequestFactory]:
+    """One or more scenarios per router, keyed by name"""
+    sources, cubes, dashboards = catalog["sources"], catalog["cubes"], catalog["dashboards"]
+
+    def source(rng):
+        return f"source-{rng.randrange(sources)}"
+
+    def cube(rng):
+        return f"cube-{rng.randrange(cubes)}"
+
+    return {
+        "data_sources.list": lambda rng, n: ("GET", "/api/data-sources", None),
+        "data_sources.schema": lambda rng, n: ("GET", f"/api/data-sources/{source(rng)}/schema", None),
+        "data_sources.preview_sql": lambda rng, n: (
+            "POST", f"/api/data-sources/{source(rng)}/preview-sql",
+            {"sql": "SELECT id, region, amount FROM table_0", "max_rows": 20},
+        ),
+        "data_cubes.list": lambda rng, n: ("GET", "/api/data-cubes", None),
+        "data_cubes.preview": lambda rng, n: ("POST", f"/api/data-cubes/{cube(rng)}/preview", {"limit": 50, "offset": 0}),
+        "data_cubes.query": lambda rng, n: ("POST", "/api/data-cubes/query", {"query": f"cube {rng.randrange(100)}"}),
+        "data_cubes.generate": lambda rng, n: (
+            "POST", "/api/data-cubes/generate",
+            # Half the requests repeat (response cache hits), half are new (LLM calls)
+            {"data_source_id": source(rng), "user_request": f"revenue by region #{n if n % 2 else 0}"},
+        ),
+        "dashboards.list": lambda rng, n: ("GET", "/api/dashboards", None),
+        "dashboards.ai_chat": lambda rng, n: (
+            "POST", f"/api/dashboards/dashboard-{rng.randrange(dashboards)}/ai-chat",
+            {"message": "Which region has the most revenue?"},
+        ),
+        "data_marketplace.list": lambda rng, n: ("GET", "/api/data-marketplace", None),
+        "data_entitlement.list": lambda rng, n: ("GET", "/api/data-entitlement", None),
+        "app_config.list": lambda rng, n: ("GET", "/api/app-config", None),
+        "llm_usage.summary": lambda rng, n: ("GET", "/api/llm-usage?group_by=endpoint,model", None),
+    }
+
+
+async def run_level(client, factory: RequestFactory, concurrency: int, requests: int, seed: int) -> Dict[str, Any]:
+    """Send `requests` requests from `concurrency` workers; latency is measured per request"""
+    rng = random.Random(seed)
+    planned = [factory(rng, n) for n in range(requests)]
+    users = [f"user-{rng.randrange(USER_COUNT)}" for _ in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            method, path, body = planned[index]
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers={"x-user-id": users[index]})
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(requests / wall, 2) if wall else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenarios whose p99 grew or throughput fell by more than `tolerance` (a fraction)"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['scenario']} @ {result['concurrency']}"
+        if before["p99_ms"] and result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p99 {before['p99_ms']:.1f} -> {result['p99_ms']:.1f} ms")
+        if before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} req/s")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{label}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy URL of an empty database (default: temporary SQLite file)")
+    parser.add_argument("--sources", type=int, default=1000)
+    parser.add_argument("--cubes", type=int, default=10000)
+    parser.add_argument("--dashboards", type=int, default=2000)
+    parser.add_argument("--entitlements", type=int, default=50000)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+    parser.add_argument("--scenarios", help="Comma-separated scenario names or prefixes (default: all)")
+    parser.add_argument("--bq-latency", type=float, default=0.05, help="Fake BigQuery seconds per query")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake Vertex AI seconds per call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    temporary_db = None
+    if args.database_url is None:
+        handle, temporary_db = tempfile.mkstemp(prefix="securebi-bench-", suffix=".db")
+        os.close(handle)
+        args.database_url = f"sqlite:///{temporary_db}"
+    # Configure the app before importing it: it binds its engine and logging at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("METRICS_ENABLED", "true")
+
+    import httpx
+
+    from app.database import async_engine, engine
+    from app.main import app
+    from genai.fakes import FakeGenAIClient
+    from genai.llm import set_vertex_client
+
+    from .fake_bigquery import FakeBigQueryClient, install_fake_bigquery
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fake_bigquery = install_fake_bigquery(FakeBigQueryClient(latency=args.bq_latency))
+    fake_llm = FakeGenAIClient(latency=args.llm_latency)
+    set_vertex_client(fake_llm)
+
+    started = time.perf_counter()
+    catalog = seed_catalog(engine, args.sources, args.cubes, args.dashboards, args.entitlements, args.seed)
+    print(f"seeded {catalog} in {time.perf_counter() - started:.1f}s ({args.database_url})")
+
+    scenarios = build_scenarios(catalog)
+    if args.scenarios:
+        wanted = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+        scenarios = {name: factory for name, factory in scenarios.items() if any(name.startswith(w) for w in wanted)}
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    async def sweep() -> List[Dict[str, Any]]:
+        results = []
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                for name, factory in scenarios.items():
+                    for concurrency in levels:
+                        result = await run_level(client, factory, concurrency, args.requests, args.seed)
+                        results.append({"scenario": name, "concurrency": concurrency, **result})
+                        print(f"{name:<24} c={concurrency:<4} {result['throughput_rps']:>8.1f} req/s  "
+                              f"p50 {result['p50_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  "
+                              f"errors {result['errors']}")
+        finally:
+            # ASGITransport runs no lifespan events, so close the async pool (DB_ASYNC=true) here
+            if async_engine is not None:
+                await async_engine.dispose()
+        return results
+
+    try:
+        results = asyncio.run(sweep())
+    finally:
+        if temporary_db is not None:
+            engine.dispose()
+            os.remove(temporary_db)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split("://", 1)[0],
+            "catalog": catalog,
+            "requests_per_level": args.requests,
+            "concurrency": levels,
+            "bq_latency_seconds": args.bq_latency,
+            "llm_latency_seconds": args.llm_latency,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    report["meta"]["fake_bigquery_queries"] = fake_bigquery.stats()["queries"]
+    report["meta"]["fake_llm_calls"] = len(fake_llm.calls)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"FAIL: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,21 +3,120 @@ GenAI module for SecureBI backend.
 Uses Google Vertex AI SDK (google-genai) for data cube generation—no LangChain.
 """
 
-from .llm import get_vertex_client, generate_content
+from .llm import (
+    get_vertex_client,
+    set_vertex_client,
+    generate_content,
+    agenerate_content,
+    generate_content_stream,
+)
+from .client import (
+    ResilientLLMClient,
+    LLMTransport,
+    GenAITransport,
+    CircuitBreaker,
+    LLMUnavailableError,
+    LLMTimeoutError,
+    CircuitOpenError,
+    get_llm_client,
+    configure_llm_client,
+)
+from .cache import ResponseCache, get_response_cache, configure_response_cache
 from .data_cube_prompt import (
     DataCubeStructure,
     create_data_cube_prompt,
     build_data_cube_prompt,
     generate_data_cube,
+    agenerate_data_cube,
+    agenerate_data_cube_candidates,
+    CubeCandidate,
+    CandidateSelection,
+    stream_data_cube,
+    parse_data_cube_output,
     create_data_cube_prompt_simple,
+    select_prompt_tables,
+    prepare_schema,
+    invalidate_prepared_schema,
+    PreparedSchema,
+)
+from .schema_retrieval import SchemaSelection
+from .sql_validation import SqlCatalog, validate_sql
+from .dashboard_chat import (
+    render_cube_summary,
+    build_dashboard_chat_prompt,
+    aanswer_dashboard_question,
+)
+from .structured_output import response_schema_for, structured_output_stats
+from .tracing import (
+    Span,
+    span,
+    start_span,
+    current_trace_id,
+    configure_tracing,
+    ConsoleSpanExporter,
+    JsonFileSpanExporter,
+    InMemorySpanExporter,
+    TraceContextFilter,
+)
+from .usage import (
+    LLMCallContext,
+    set_llm_call_context,
+    get_llm_usage_stats,
+    llm_usage_summary,
 )
 
 __all__ = [
     "get_vertex_client",
+    "set_vertex_client",
     "generate_content",
+    "agenerate_content",
+    "generate_content_stream",
     "DataCubeStructure",
     "create_data_cube_prompt",
     "build_data_cube_prompt",
     "generate_data_cube",
+    "agenerate_data_cube",
+    "agenerate_data_cube_candidates",
+    "CubeCandidate",
+    "CandidateSelection",
+    "stream_data_cube",
+    "parse_data_cube_output",
     "create_data_cube_prompt_simple",
+    "select_prompt_tables",
+    "prepare_schema",
+    "invalidate_prepared_schema",
+    "PreparedSchema",
+    "SchemaSelection",
+    "SqlCatalog",
+    "validate_sql",
+    "render_cube_summary",
+    "build_dashboard_chat_prompt",
+    "aanswer_dashboard_question",
+    "response_schema_for",
+    "structured_output_stats",
+    "Span",
+    "span",
+    "start_span",
+    "current_trace_id",
+    "configure_tracing",
+    "ConsoleSpanExporter",
+    "JsonFileSpanExporter",
+    "InMemorySpanExporter",
+    "TraceContextFilter",
+    "LLMCallContext",
+    "set_llm_call_context",
+    "get_llm_usage_stats",
+    "llm_usage_summary",
+    "ResponseCache",
+    "get_response_cache",
+    "configure_response_cache",
+    "ResilientLLMClient",
+    "LLMTransport",
+    "GenAITransport",
+    "CircuitBreaker",
+    "LLMUnavailableError",
+    "LLMTimeoutError",
+    "CircuitOpenError",
+    "get_llm_client",
+    "configure_llm_client",
 ]
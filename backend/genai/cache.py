@@ -0,0 +1,148 @@
+"""
+Response cache for deterministic (temperature 0) LLM generations.
+
+Entries are keyed by model name, prompt template version, the normalized user
+request and a fingerprint of the schema the prompt was built from, so a repeated
+request against an unchanged schema never reaches Vertex AI. Two tiers:
+
+- an in-process LRU (fast, per worker)
+- an optional persistent store (e.g. the metadata database) shared by all workers
+  and surviving restarts; hits there are promoted into the LRU.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_request(user_request: str) -> str:
+    """Canonical form of a user request: case, whitespace and trailing punctuation do not matter"""
+    return _WHITESPACE.sub(" ", user_request).strip().rstrip(".!?;").strip().lower()
+
+
+def schema_fingerprint(data_source_info: Dict[str, Any], available_tables: List[Dict[str, Any]]) -> str:
+    """Stable hash of everything about the data source that ends up in the prompt"""
+    payload = json.dumps(
+        {"source": data_source_info, "tables": available_tables},
+        sort_keys=True,
+        default=str,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(model: str, template_version: str, user_request: str, schema_hash: str) -> str:
+    """Cache key for one generation"""
+    raw = "\x1f".join([model, template_version, normalize_request(user_request), schema_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PersistentStore:
+    """Interface for the persistent cache tier; values are JSON strings"""
+
+    def load(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def save(self, key: str, value: str, model: str, template_version: str) -> None:
+        raise NotImplementedError
+
+
+class ResponseCache:
+    """Two-tier (LRU + optional persistent store) cache of parsed generation results"""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, persistent_store: Optional[PersistentStore] = None):
+        self.max_entries = max_entries
+        self.persistent_store = persistent_store
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._persistent_hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return value
+
+        if self.persistent_store is not None:
+            try:
+                raw = self.persistent_store.load(key)
+            except Exception as e:
+                logger.warning("LLM cache persistent load failed: %s", e)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                with self._lock:
+                    self._persistent_hits += 1
+                    self._remember(key, value)
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any], model: str = "", template_version: str = ""):
+        with self._lock:
+            self._remember(key, value)
+        if self.persistent_store is not None:
+            try:
+                self.persistent_store.save(key, json.dumps(value, default=str), model, template_version)
+            except Exception as e:
+                logger.warning("LLM cache persistent save failed: %s", e)
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        """Insert into the LRU; caller must hold the lock"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the in-memory tier (the persistent tier is left alone)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._memory_hits + self._persistent_hits + self._misses
+            hits = self._memory_hits + self._persistent_hits
+            return {
+                "enabled": LLM_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self._memory_hits,
+                "persistent_hits": self._persistent_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_response_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache used by data cube generation"""
+    return _response_cache
+
+
+def configure_response_cache(persistent_store: Optional[PersistentStore] = None, max_entries: Optional[int] = None):
+    """Attach a persistent tier and/or resize the in-memory tier"""
+    if persistent_store is not None:
+        _response_cache.persistent_store = persistent_store
+    if max_entries is not None:
+        with _response_cache._lock:
+            _response_cache.max_entries = max_entries
@@ -0,0 +1,505 @@
+"""
+Resilient client for LLM calls.
+
+All generations go through one ResilientLLMClient, which runs on its own background
+event loop so sync callers (threadpool endpoints) and async callers share the same
+limits:
+
+- a bounded semaphore caps concurrent calls (LLM_MAX_CONCURRENCY)
+- every attempt has a timeout (LLM_TIMEOUT_SECONDS)
+- 429/5xx errors and timeouts are retried with full-jitter exponential backoff
+  (LLM_MAX_RETRIES, LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS)
+- a circuit breaker opens after LLM_BREAKER_FAILURES consecutive failures and fails
+  fast for LLM_BREAKER_RESET_SECONDS before letting a single probe call through.
+
+The transport doing the actual call is pluggable (LLMTransport); the default wraps the
+Google Gen AI SDK async surface (``client.aio.models``), which genai.fakes also provides.
+Every call's tokens, latency and retries are recorded in genai.usage, and each call is
+traced as an ``llm.generate``/``llm.stream`` span with one ``llm.attempt`` child per try.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from .tracing import Span, span, start_span
+from .usage import LLMUsage, current_llm_call_context, record_llm_call
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMUnavailableError(Exception):
+    """The LLM backend could not serve the request (timeouts, exhausted retries, open circuit)"""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    pass
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK error, if it carries one"""
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _annotate_call_span(call_span: Span, usage: LLMUsage, attempt: int, output_chars: int):
+    call_span.set_attributes(
+        attempts=attempt + 1,
+        output_chars=output_chars,
+        prompt_tokens=usage.prompt_tokens,
+        output_tokens=usage.output_tokens,
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, LLMTimeoutError, ConnectionError)):
+        return True
+    return error_status(error) in RETRYABLE_STATUS_CODES
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open -> closed)"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_BREAKER_FAILURES,
+        reset_timeout: float = LLM_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through now. True when the call is
+        the half-open probe: it must end in record_success, record_failure or release_probe.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            raise CircuitOpenError("LLM backend circuit is open; failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("LLM circuit breaker opened", extra={"consecutive_failures": self._failures})
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+    def release_probe(self):
+        """The probe ended without telling anything about the backend (cancelled); let the next call probe"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def reset(self):
+        self.record_success()
+
+
+class LLMTransport:
+    """
+    Performs a single model call; ResilientLLMClient adds limits, retries and the breaker.
+
+    Transports report token counts by passing responses to ``usage.update`` when given.
+    """
+
+    async def generate(self, model: str, prompt: str, config: Any = None, usage: Optional[LLMUsage] = None) -> str:
+        raise NotImplementedError
+
+    async def stream(
+        self, model: str, prompt: str, config: Any = None, usage: Optional[LLMUsage] = None
+    ) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+
+class GenAITransport(LLMTransport):
+    """Transport over the Google Gen AI SDK async API (or anything with the same ``aio.models``)"""
+
+    def __init__(self, client_factory: Optional[Callable[[], Any]] = None):
+        if client_factory is None:
+            from .llm import get_vertex_client
+            client_factory = get_vertex_client
+        self._client_factory = client_factory
+
+    async def generate(self, model: str, prompt: str, config: Any = None, usage: Optional[LLMUsage] = None) -> str:
+        from .llm import _response_text
+
+        response = await self._client_factory().aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=config,
+        )
+        if usage is not None:
+            usage.update(response)
+        text = _response_text(response)
+        if not text:
+            raise ValueError("Vertex AI returned no text in response.")
+        return text
+
+    async def stream(
+        self, model: str, prompt: str, config: Any = None, usage: Optional[LLMUsage] = None
+    ) -> AsyncIterator[str]:
+        from .llm import _response_text
+
+        chunks = await self._client_factory().aio.models.generate_content_stream(
+            model=model,
+            contents=prompt,
+            config=config,
+        )
+        async for chunk in chunks:
+            if usage is not None:
+                usage.update(chunk)
+            text = _response_text(chunk)
+            if text:
+                yield text
+
+
+class ResilientLLMClient:
+    """Concurrency-limited, retrying, circuit-broken LLM client (see module docstring)"""
+
+    def __init__(
+        self,
+        transport: Optional[LLMTransport] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.transport = transport or GenAITransport()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "rejected_open_circuit": 0,
+            "in_flight": 0,
+            "waiting": 0,
+            "max_in_flight": 0,
+        }
+
+    # -- event loop plumbing ------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True)
+                thread.start()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the client loop, in a copy of the caller's context"""
+        loop = self._ensure_loop()
+        context = contextvars.copy_context()
+        result: concurrent.futures.Future = concurrent.futures.Future()
+
+        def start():
+            task = asyncio.ensure_future(coro)  # created inside `context`
+
+            def done(t: asyncio.Task):
+                if t.cancelled():
+                    result.cancel()
+                elif t.exception() is not None:
+                    result.set_exception(t.exception())
+                else:
+                    result.set_result(t.result())
+
+            task.add_done_callback(done)
+            result.add_done_callback(lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel))
+
+        loop.call_soon_threadsafe(start, context=context)
+        return result
+
+    def run_sync(self, coro):
+        """Run a coroutine on the client loop and wait for it from a regular thread"""
+        return self._submit(coro).result()
+
+    async def _await_on_loop(self, coro):
+        if self._ensure_loop() is asyncio.get_running_loop():
+            return await coro
+        return await asyncio.wrap_future(self._submit(coro))
+
+    # -- public API -------------------------------------------------------------
+
+    async def generate(self, prompt: str, model: str, config: Any = None) -> str:
+        """Generate text (from any event loop)"""
+        return await self._await_on_loop(self._generate(prompt, model, config))
+
+    def generate_sync(self, prompt: str, model: str, config: Any = None) -> str:
+        """Generate text from a regular (non-async) thread"""
+        return self.run_sync(self._generate(prompt, model, config))
+
+    def stream_sync(self, prompt: str, model: str, config: Any = None) -> Iterator[str]:
+        """Stream text chunks from a regular thread; retries only happen before the first chunk"""
+        chunks = self._stream(prompt, model, config)
+        try:
+            while True:
+                try:
+                    yield self.run_sync(chunks.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run_sync(chunks.aclose())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            "max_concurrency": self.max_concurrency,
+            "circuit": self.breaker.state,
+        })
+        return stats
+
+    # -- internals ----------------------------------------------------------------
+
+    def _count(self, **deltas: int):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold one of the max_concurrency call slots"""
+        self._count(waiting=1)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._count(waiting=-1)
+        self._count(in_flight=1)
+        try:
+            yield
+        finally:
+            self._count(in_flight=-1)
+            self._semaphore.release()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _generate(self, prompt: str, model: str, config: Any) -> str:
+        self._count(calls=1)
+        context = current_llm_call_context()
+        usage = LLMUsage()
+        started = time.perf_counter()
+        text = None
+        attempt = 0
+        with span("llm.generate", model=model, prompt_chars=len(prompt)) as call_span:
+            try:
+                while True:
+                    try:
+                        probe = self.breaker.before_call()
+                    except CircuitOpenError:
+                        self._count(rejected_open_circuit=1, failed=1)
+                        raise
+                    try:
+                        with span("llm.attempt", attempt=attempt):
+                            async with self._slot():
+                                text = await asyncio.wait_for(
+                                    self.transport.generate(model, prompt, config, usage=usage),
+                                    timeout=self.timeout,
+                                )
+                    except BaseException as e:
+                        if self._handle_failure(e, attempt, probe):
+                            await asyncio.sleep(self._backoff(attempt))
+                            attempt += 1
+                            continue
+                        raise self._final_error(e) from e
+                    self.breaker.record_success()
+                    self._count(succeeded=1)
+                    return text
+            finally:
+                _annotate_call_span(call_span, usage, attempt, len(text or ""))
+                record_llm_call(model, len(prompt), len(text or ""), usage, started, attempt + 1,
+                                failed=text is None, context=context)
+
+    async def _stream(self, prompt: str, model: str, config: Any) -> AsyncIterator[str]:
+        self._count(calls=1)
+        context = current_llm_call_context()
+        usage = LLMUsage()
+        started = time.perf_counter()
+        output_chars = 0
+        completed = False
+        attempt = 0
+        # Each chunk may be pulled from a different task, so spans are parented, not made current
+        call_span = start_span("llm.stream", model=model, prompt_chars=len(prompt))
+        try:
+            while True:
+                try:
+                    probe = self.breaker.before_call()
+                except CircuitOpenError:
+                    self._count(rejected_open_circuit=1, failed=1)
+                    raise
+                produced = False
+                attempt_span = start_span("llm.attempt", parent=call_span, attempt=attempt)
+                try:
+                    async with self._slot():
+                        chunks = self.transport.stream(model, prompt, config, usage=usage).__aiter__()
+                        while True:
+                            try:
+                                text = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                            except StopAsyncIteration:
+                                break
+                            if not produced:
+                                attempt_span.set_attribute("first_chunk_ms", round((time.perf_counter() - started) * 1000, 1))
+                            produced = True
+                            output_chars += len(text)
+                            yield text
+                except GeneratorExit:
+                    # The consumer stopped reading (e.g. the client disconnected)
+                    if probe:
+                        self.breaker.release_probe()
+                    raise
+                except asyncio.CancelledError as e:
+                    attempt_span.record_error(e)
+                    call_span.record_error(e)
+                    self._handle_failure(e, attempt, probe)
+                    raise
+                except BaseException as e:
+                    attempt_span.record_error(e)
+                    if not produced and self._handle_failure(e, attempt, probe):
+                        await asyncio.sleep(self._backoff(attempt))
+                        attempt += 1
+                        continue
+                    if produced:
+                        self.breaker.record_failure()
+                        self._count(failed=1)
+                    call_span.record_error(e)
+                    raise self._final_error(e) from e
+                finally:
+                    attempt_span.end()
+                self.breaker.record_success()
+                self._count(succeeded=1)
+                completed = True
+                return
+        finally:
+            _annotate_call_span(call_span, usage, attempt, output_chars)
+            call_span.end()
+            record_llm_call(model, len(prompt), output_chars, usage, started, attempt + 1,
+                            failed=not completed, context=context)
+
+    def _handle_failure(self, error: BaseException, attempt: int, probe: bool = False) -> bool:
+        """Record a failed attempt; True when it should be retried"""
+        if isinstance(error, asyncio.CancelledError):
+            # Says nothing about the backend, but must not leave the half-open probe taken
+            if probe:
+                self.breaker.release_probe()
+            self._count(failed=1)
+            return False
+        if isinstance(error, asyncio.TimeoutError):
+            self._count(timeouts=1)
+        if not is_retryable(error):
+            # The backend answered (e.g. 400); it is healthy even if the request was bad
+            self.breaker.record_success()
+            self._count(failed=1)
+            return False
+        self.breaker.record_failure()
+        if attempt >= self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+            self._count(failed=1)
+            return False
+        self._count(retries=1)
+        logger.warning("Retrying LLM call", extra={
+            "attempt": attempt + 1,
+            "error_status": error_status(error),
+            "error_type": type(error).__name__,
+        })
+        return True
+
+    def _final_error(self, error: BaseException) -> BaseException:
+        if isinstance(error, asyncio.TimeoutError):
+            return LLMTimeoutError(f"LLM call timed out after {self.timeout:g}s")
+        if is_retryable(error):
+            return LLMUnavailableError(f"LLM backend unavailable: {error}")
+        return error
+
+
+_llm_client: Optional[ResilientLLMClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> ResilientLLMClient:
+    """Process-wide resilient LLM client"""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = ResilientLLMClient()
+        return _llm_client
+
+
+def configure_llm_client(transport: Optional[LLMTransport] = None, **options) -> ResilientLLMClient:
+    """Replace the process-wide client (e.g. with a fake transport or different limits)"""
+    global _llm_client
+    client = ResilientLLMClient(transport=transport, **options)
+    with _llm_client_lock:
+        _llm_client = client
+    return client
@@ -0,0 +1,86 @@
+"""
+Dashboard AI chat grounded in a cube summary.
+
+The caller passes a precomputed summary of the dashboard's data cube (row count,
+measure totals, top values per dimension; see app.cube_summaries) which is rendered
+compactly into the prompt, so answers come from real aggregates without the model
+ever seeing row-level data.
+"""
+from typing import Any, Dict, List, Optional
+
+from .llm import agenerate_content
+
+DASHBOARD_CHAT_TEMPERATURE = 0.2
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:,.2f}".rstrip("0").rstrip(".")
+    if isinstance(value, int):
+        return f"{value:,}"
+    return "NULL" if value is None else str(value)
+
+
+def render_cube_summary(summary: Dict[str, Any]) -> str:
+    """Compact text rendering of a cube summary for the prompt"""
+    lines = [f"Rows: {_format_value(summary.get('row_count'))}"]
+    totals = summary.get("totals") or {}
+    if totals:
+        lines.append("Measure totals: " + ", ".join(f"{m}={_format_value(v)}" for m, v in totals.items()))
+    for dimension, entries in (summary.get("top_values") or {}).items():
+        lines.append(f"Top {len(entries)} {dimension} values:")
+        for entry in entries:
+            measures = ", ".join(
+                f"{k}={_format_value(v)}" for k, v in entry.items() if k not in ("value", "rows")
+            )
+            suffix = f", {measures}" if measures else ""
+            lines.append(f"  - {_format_value(entry.get('value'))}: rows={_format_value(entry.get('rows'))}{suffix}")
+    return "\n".join(lines)
+
+
+def build_dashboard_chat_prompt(
+    question: str,
+    dashboard_name: str,
+    cube_name: str,
+    dimensions: List[str],
+    measures: List[str],
+    summary: Optional[Dict[str, Any]],
+) -> str:
+    """Prompt for answering a dashboard question from the cube summary"""
+    if summary is not None:
+        data = (
+            "Aggregated data from the cube (computed from the full dataset):\n"
+            f"{render_cube_summary(summary)}\n\n"
+            "Answer only from these figures. If the question needs data that is not in them, "
+            "say what is missing instead of guessing."
+        )
+    else:
+        data = (
+            "No aggregated data is available for this cube right now. Answer from the cube "
+            "definition only and do not invent figures."
+        )
+    return (
+        "You are a business intelligence assistant for a dashboard.\n"
+        f"Dashboard: {dashboard_name}\n"
+        f"Data cube: {cube_name}\n"
+        f"Dimensions: {', '.join(dimensions) or 'none'}\n"
+        f"Measures: {', '.join(measures) or 'none'}\n\n"
+        f"{data}\n\n"
+        f"Question: {question}\n"
+        "Answer concisely in plain text."
+    )
+
+
+async def aanswer_dashboard_question(
+    question: str,
+    dashboard_name: str,
+    cube_name: str,
+    dimensions: List[str],
+    measures: List[str],
+    summary: Optional[Dict[str, Any]],
+    model: Optional[str] = None,
+) -> str:
+    """Answer a dashboard question with the LLM (raises LLMUnavailableError when it is down)"""
+    prompt = build_dashboard_chat_prompt(question, dashboard_name, cube_name, dimensions, measures, summary)
+    answer = await agenerate_content(prompt, model=model, temperature=DASHBOARD_CHAT_TEMPERATURE)
+    return answer.strip()
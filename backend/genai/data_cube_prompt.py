@@ -2,13 +2,50 @@
 Data Cube Prompt module for SecureBI backend.
 Creates prompts for generating data cubes; uses Google Vertex AI SDK (no LangChain).
 """
+import asyncio
+import hashlib
 import json
 import os
-import re
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError
 
 from .llm import generate_content as vertex_generate_content
+from .llm import generate_content_stream as vertex_generate_content_stream
+from .llm import agenerate_content as vertex_agenerate_content
+from .client import LLMUnavailableError
+from .structured_output import (
+    OUTCOME_FAILED,
+    OUTCOME_FIRST_TRY,
+    OUTCOME_REPAIRED,
+    record_structured_output,
+    repair_prompt,
+    response_schema_for,
+)
+from .sql_validation import SqlCatalog, validate_sql
+from .tracing import span
+from .usage import record_llm_cache_hit
+from .schema_retrieval import (
+    SCHEMA_TOKEN_BUDGET,
+    SchemaSelection,
+    estimate_tokens,
+    join_index,
+    select_relevant_tables,
+    table_terms,
+)
+from .cache import (
+    LLM_CACHE_ENABLED,
+    ResponseCache,
+    get_response_cache,
+    make_cache_key,
+    schema_fingerprint,
+)
+
+# Bump whenever the prompt text changes so cached generations from the old prompt are not reused
+PROMPT_TEMPLATE_VERSION = "data-cube-v1"
+# Number of schema versions whose rendered prompt fragments are kept in memory
+PROMPT_SCHEMA_CACHE_SIZE = int(os.getenv("PROMPT_SCHEMA_CACHE_SIZE", "32"))
 
 
 class DataCubeStructure(BaseModel):
@@ -24,27 +61,150 @@ class DataCubeStructure(BaseModel):
     )
 
 
+# Gemini response schema for JSON output mode (metadata is free-form, so it is not constrained)
+DATA_CUBE_RESPONSE_SCHEMA = response_schema_for(DataCubeStructure)
+# Task name under which parse outcomes are counted (genai.structured_output)
+STRUCTURED_OUTPUT_TASK = "data_cube"
+# Upper bound on concurrent candidates per request, and the sampling temperature of all but the first
+GENERATE_CANDIDATES_MAX = int(os.getenv("GENERATE_CANDIDATES_MAX", "5"))
+GENERATE_CANDIDATE_TEMPERATURE = float(os.getenv("GENERATE_CANDIDATE_TEMPERATURE", "0.7"))
+
+
+def _render_table(table: Dict[str, Any]) -> str:
+    """Format one table and its columns for the prompt."""
+    schema_name = table.get("schema", "")
+    parts = [
+        f"\nTable: {schema_name + '.' if schema_name else ''}{table.get('name', 'unknown')}\n",
+        f"  Row Count: {table.get('row_count', 0)}\n",
+        "  Columns:\n",
+    ]
+    for col in table.get("columns", []):
+        pk = " (PRIMARY KEY)" if col.get("primary_key", False) else ""
+        col_desc = col.get("description", "")
+        desc = f" - {col_desc}" if col_desc else ""
+        parts.append(f"    - {col.get('name', '')}: {col.get('type', '')}{pk}{desc}\n")
+    return "".join(parts)
+
+
 def _build_tables_text(available_tables: List[Dict[str, Any]]) -> str:
     """Format available tables and columns into a string for the prompt."""
-    tables_info = ""
-    for table in available_tables:
-        table_name = table.get("name", "unknown")
-        schema_name = table.get("schema", "")
-        columns = table.get("columns", [])
-        row_count = table.get("row_count", 0)
-        tables_info += f"\nTable: {schema_name + '.' if schema_name else ''}{table_name}\n"
-        tables_info += f"  Row Count: {row_count}\n"
-        tables_info += "  Columns:\n"
-        for col in columns:
-            col_name = col.get("name", "")
-            col_type = col.get("type", "")
-            col_desc = col.get("description", "")
-            pk = " (PRIMARY KEY)" if col.get("primary_key", False) else ""
-            tables_info += f"    - {col_name}: {col_type}{pk}"
-            if col_desc:
-                tables_info += f" - {col_desc}"
-            tables_info += "\n"
-    return tables_info
+    return "".join(_render_table(table) for table in available_tables)
+
+
+class PreparedSchema:
+    """Rendered prompt fragments and retrieval data for one version of a data source schema."""
+
+    __slots__ = ("version", "tables", "fragments", "costs", "_docs", "_joins", "_full_text", "_catalog")
+
+    def __init__(self, version: str, tables: List[Dict[str, Any]]):
+        self.version = version
+        self.tables = tables
+        self.fragments = [_render_table(table) for table in tables]
+        self.costs = [estimate_tokens(fragment) for fragment in self.fragments]
+        self._docs = None
+        self._joins = None
+        self._full_text = None
+        self._catalog = None
+
+    @property
+    def catalog(self) -> SqlCatalog:
+        """Table/column names for validating generated SQL (built on first use)."""
+        if self._catalog is None:
+            self._catalog = SqlCatalog(self.tables)
+        return self._catalog
+
+    def select(
+        self,
+        user_request: str,
+        top_k: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> SchemaSelection:
+        """Tables relevant to the request within the token budget (see genai.schema_retrieval)."""
+        if self._docs is None and sum(self.costs) > (SCHEMA_TOKEN_BUDGET if token_budget is None else token_budget):
+            self._docs = [table_terms(table) for table in self.tables]
+            self._joins = join_index(self.tables)
+        return select_relevant_tables(
+            user_request,
+            self.tables,
+            top_k=top_k,
+            token_budget=token_budget,
+            costs=self.costs,
+            docs=self._docs,
+            joins=self._joins,
+        )
+
+    def select_all(self) -> SchemaSelection:
+        indexes = list(range(len(self.tables)))
+        return SchemaSelection(list(self.tables), indexes, len(self.tables), sum(self.costs), pruned=False)
+
+    def render(self, indexes: Optional[List[int]] = None) -> str:
+        """Prompt text for the given tables (all tables when indexes is None)."""
+        if indexes is None or len(indexes) == len(self.fragments):
+            if self._full_text is None:
+                self._full_text = "".join(self.fragments)
+            return self._full_text
+        return "".join([self.fragments[i] for i in indexes])
+
+    def fingerprint(self, selection: SchemaSelection, data_source_info: Dict[str, Any]) -> str:
+        """Hash identifying the schema text a prompt was built from (for the response cache)."""
+        raw = "|".join([
+            self.version,
+            ",".join(map(str, selection.indexes)),
+            json.dumps(data_source_info, sort_keys=True, default=str),
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+_prepared_schemas: "OrderedDict[str, PreparedSchema]" = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def prepare_schema(available_tables: List[Dict[str, Any]], schema_version: Optional[str] = None) -> PreparedSchema:
+    """
+    Return the PreparedSchema for a schema, rendering it only on first use.
+
+    Entries are keyed by `schema_version`, which the caller must change whenever the schema
+    changes (e.g. data source id + last sync time). Without a version the schema content is
+    hashed, which still skips rendering but costs a pass over the tables.
+    """
+    if schema_version is None:
+        schema_version = "sha256:" + schema_fingerprint({}, available_tables)
+    with _prepared_lock:
+        prepared = _prepared_schemas.get(schema_version)
+        if prepared is not None:
+            _prepared_schemas.move_to_end(schema_version)
+            return prepared
+
+    prepared = PreparedSchema(schema_version, available_tables)
+    with _prepared_lock:
+        _prepared_schemas[schema_version] = prepared
+        while len(_prepared_schemas) > PROMPT_SCHEMA_CACHE_SIZE:
+            _prepared_schemas.popitem(last=False)
+    return prepared
+
+
+def invalidate_prepared_schema(schema_version: Optional[str] = None):
+    """Forget one prepared schema version, or all of them."""
+    with _prepared_lock:
+        if schema_version is None:
+            _prepared_schemas.clear()
+        else:
+            _prepared_schemas.pop(schema_version, None)
+
+
+def select_prompt_tables(
+    user_request: str,
+    available_tables: List[Dict[str, Any]],
+    top_k: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    schema_version: Optional[str] = None,
+) -> SchemaSelection:
+    """Pick the tables relevant to the request that fit the prompt token budget (see genai.schema_retrieval)."""
+    return prepare_schema(available_tables, schema_version).select(
+        user_request,
+        top_k=top_k,
+        token_budget=token_budget,
+    )
 
 
 def build_data_cube_prompt(
@@ -52,11 +212,15 @@ def build_data_cube_prompt(
     data_source_info: Dict[str, Any],
     available_tables: List[Dict[str, Any]],
     schema_info: Optional[Dict[str, Any]] = None,
+    tables_text: Optional[str] = None,
 ) -> str:
     """
     Build the full prompt string for generating a data cube from a natural language request.
+
+    `tables_text` is the pre-rendered schema section (see PreparedSchema.render); it is
+    rendered from `available_tables` when omitted.
     """
-    tables_info = _build_tables_text(available_tables)
+    tables_info = tables_text if tables_text is not None else _build_tables_text(available_tables)
     data_source_name = data_source_info.get("name", "Unknown")
     data_source_type = data_source_info.get("type", "unknown")
     database_name = data_source_info.get("database", "unknown")
@@ -130,62 +294,417 @@ def create_data_cube_prompt(
     )
 
 
+class _GenerationPlan:
+    """Everything needed to run (or answer from cache) one data cube generation."""
+
+    __slots__ = ("prepared", "model_name", "selection", "cache", "cache_key", "cached", "prompt")
+
+    def __init__(self, prepared, model_name, selection, cache, cache_key, cached, prompt):
+        self.prepared = prepared
+        self.model_name = model_name
+        self.selection = selection
+        self.cache = cache
+        self.cache_key = cache_key
+        self.cached = cached
+        self.prompt = prompt
+
+    def remember(self, cube: DataCubeStructure):
+        """Cache a generated cube, unless its SQL fails validation against the catalog"""
+        if self.cache is not None and not validate_sql(cube.query, self.prepared.catalog):
+            self.cache.put(
+                self.cache_key,
+                cube.model_dump(),
+                model=self.model_name,
+                template_version=PROMPT_TEMPLATE_VERSION,
+            )
+
+
+def _plan_generation(
+    user_request: str,
+    data_source_info: Dict[str, Any],
+    available_tables: List[Dict[str, Any]],
+    schema_info: Optional[Dict[str, Any]],
+    model_name: Optional[str],
+    cache: Optional[ResponseCache],
+    prune_schema: bool,
+    schema_version: Optional[str],
+    selection: Optional[SchemaSelection],
+) -> _GenerationPlan:
+    if model_name is None:
+        model_name = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash-lite")
+
+    with span("genai.prepare_schema", tables_total=len(available_tables)) as schema_span:
+        prepared = prepare_schema(available_tables, schema_version)
+        if selection is None:
+            selection = prepared.select(user_request) if prune_schema else prepared.select_all()
+        schema_span.set_attributes(tables_included=len(selection.tables), pruned=selection.pruned)
+
+    if cache is None and LLM_CACHE_ENABLED:
+        cache = get_response_cache()
+    cache_key = None
+    if cache is not None:
+        with span("genai.cache_lookup") as lookup_span:
+            cache_key = make_cache_key(
+                model_name,
+                PROMPT_TEMPLATE_VERSION,
+                user_request,
+                prepared.fingerprint(selection, data_source_info),
+            )
+            cached = cache.get(cache_key)
+            if cached is not None and validate_sql(cached.get("query", ""), prepared.catalog):
+                # Cached before its SQL was validated (or by an older validator): regenerate
+                lookup_span.set_attribute("invalid", True)
+                cached = None
+            lookup_span.set_attribute("hit", cached is not None)
+        if cached is not None:
+            record_llm_cache_hit(model_name)
+            return _GenerationPlan(prepared, model_name, selection, cache, cache_key, DataCubeStructure(**cached), None)
+
+    with span("genai.build_prompt") as prompt_span:
+        prompt = build_data_cube_prompt(
+            user_request=user_request,
+            data_source_info=data_source_info,
+            available_tables=selection.tables,
+            schema_info=schema_info,
+            tables_text=prepared.render(selection.indexes),
+        )
+        prompt_span.set_attribute("prompt_chars", len(prompt))
+    return _GenerationPlan(prepared, model_name, selection, cache, cache_key, None, prompt)
+
+
+def _generation_error(e: Exception) -> Exception:
+    if isinstance(e, LLMUnavailableError):
+        # Backend down/overloaded rather than a bad request; let callers tell them apart
+        return e
+    return ValueError(
+        f"Failed to generate data cube structure: {str(e)}. "
+        "Please ensure your request is clear and the available tables/schemas are correct."
+    )
+
+
+def parse_data_cube_output(content: str) -> DataCubeStructure:
+    """Validate JSON-mode model output as a DataCubeStructure (raises ValueError listing what is wrong)."""
+    try:
+        return DataCubeStructure.model_validate_json(content)
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(map(str, err['loc'])) or 'output'}: {err['msg']}" for err in e.errors()
+        )
+        raise ValueError(problems) from None
+
+
+def _try_parse(content: str) -> Tuple[Optional[DataCubeStructure], Optional[ValueError]]:
+    with span("genai.parse_output", output_chars=len(content or "")) as parse_span:
+        try:
+            return parse_data_cube_output(content), None
+        except ValueError as e:
+            parse_span.set_attribute("valid", False)
+            return None, e
+
+
+def _parse_failure(content: str, error: ValueError) -> ValueError:
+    record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_FAILED)
+    return ValueError(
+        f"Failed to parse data cube from model output after one repair attempt: {error}. "
+        f"Model output: {content[:500] if content else 'N/A'}"
+    )
+
+
+def _call_llm(prompt: str, model_name: str) -> str:
+    try:
+        return vertex_generate_content(
+            prompt=prompt,
+            model=model_name,
+            temperature=0.0,
+            response_schema=DATA_CUBE_RESPONSE_SCHEMA,
+        )
+    except Exception as e:
+        raise _generation_error(e) from e
+
+
+async def _acall_llm(prompt: str, model_name: str, temperature: float = 0.0) -> str:
+    try:
+        return await vertex_agenerate_content(
+            prompt=prompt,
+            model=model_name,
+            temperature=temperature,
+            response_schema=DATA_CUBE_RESPONSE_SCHEMA,
+        )
+    except Exception as e:
+        raise _generation_error(e) from e
+
+
+async def _acomplete(plan: _GenerationPlan, temperature: float = 0.0) -> DataCubeStructure:
+    """One LLM generation for a plan, with the single repair attempt."""
+    content = await _acall_llm(plan.prompt, plan.model_name, temperature)
+    cube, error = _try_parse(content)
+    if cube is None:
+        content = await _acall_llm(repair_prompt(plan.prompt, content, error), plan.model_name, temperature)
+        cube, error = _try_parse(content)
+        if cube is None:
+            raise _parse_failure(content, error)
+        record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_REPAIRED)
+    else:
+        record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_FIRST_TRY)
+    return cube
+
+
 def generate_data_cube(
     user_request: str,
     data_source_info: Dict[str, Any],
     available_tables: List[Dict[str, Any]],
     schema_info: Optional[Dict[str, Any]] = None,
     model_name: str = None,
+    cache: Optional[ResponseCache] = None,
+    prune_schema: bool = True,
+    schema_version: Optional[str] = None,
+    selection: Optional[SchemaSelection] = None,
 ) -> DataCubeStructure:
     """
     Generate a data cube definition from a natural language request using Vertex AI (Google Gen AI SDK).
+
+    The schema section of the prompt is rendered once per `schema_version` (see prepare_schema).
+    Unless `prune_schema` is False, schemas larger than the prompt token budget are reduced
+    to the tables relevant to the request; pass `selection` to reuse a selection already made
+    with select_prompt_tables. Results are cached (see genai.cache) by model, prompt template
+    version, normalized request and schema fingerprint; pass `cache` to use a cache other than
+    the process-wide one. Only cubes whose SQL passes validate_sql are cached, and cache hits
+    are re-checked, so a cached answer never bypasses SQL validation.
+
+    The model runs in JSON mode constrained to DataCubeStructure; output that still fails
+    validation gets exactly one repair call (outcomes are counted, see structured_output_stats).
+
+    Raises ValueError when the model output cannot be used and genai.client.LLMUnavailableError
+    when the LLM backend is unavailable (timeouts, exhausted retries, open circuit).
     """
-    if model_name is None:
-        model_name = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash-lite")
+    with span("genai.generate_data_cube") as generation_span:
+        plan = _plan_generation(
+            user_request, data_source_info, available_tables, schema_info,
+            model_name, cache, prune_schema, schema_version, selection,
+        )
+        generation_span.set_attribute("cached", plan.cached is not None)
+        if plan.cached is not None:
+            return plan.cached
 
-    prompt = build_data_cube_prompt(
-        user_request=user_request,
-        data_source_info=data_source_info,
-        available_tables=available_tables,
-        schema_info=schema_info,
+        content = _call_llm(plan.prompt, plan.model_name)
+        cube, error = _try_parse(content)
+        if cube is None:
+            content = _call_llm(repair_prompt(plan.prompt, content, error), plan.model_name)
+            cube, error = _try_parse(content)
+            if cube is None:
+                raise _parse_failure(content, error)
+            record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_REPAIRED)
+        else:
+            record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_FIRST_TRY)
+
+        plan.remember(cube)
+        return cube
+
+
+async def agenerate_data_cube(
+    user_request: str,
+    data_source_info: Dict[str, Any],
+    available_tables: List[Dict[str, Any]],
+    schema_info: Optional[Dict[str, Any]] = None,
+    model_name: str = None,
+    cache: Optional[ResponseCache] = None,
+    prune_schema: bool = True,
+    schema_version: Optional[str] = None,
+    selection: Optional[SchemaSelection] = None,
+) -> DataCubeStructure:
+    """Async variant of generate_data_cube; cache lookups run in a worker thread, the LLM call on the event loop."""
+    with span("genai.generate_data_cube") as generation_span:
+        plan = await asyncio.to_thread(
+            _plan_generation,
+            user_request, data_source_info, available_tables, schema_info,
+            model_name, cache, prune_schema, schema_version, selection,
+        )
+        generation_span.set_attribute("cached", plan.cached is not None)
+        if plan.cached is not None:
+            return plan.cached
+
+        cube = await _acomplete(plan)
+        await asyncio.to_thread(plan.remember, cube)
+        return cube
+
+
+class CubeCandidate:
+    """One candidate generation and how it fared in validation."""
+
+    __slots__ = ("index", "cube", "problems", "cost")
+
+    def __init__(
+        self,
+        index: int,
+        cube: Optional[DataCubeStructure],
+        problems: List[str],
+        cost: Optional[float] = None,
+    ):
+        self.index = index
+        # None when the model output could not be parsed (problems holds the error)
+        self.cube = cube
+        self.problems = problems
+        # Result of estimate_cost (e.g. bytes scanned by a dry run), when requested
+        self.cost = cost
+
+    @property
+    def valid(self) -> bool:
+        return self.cube is not None and not self.problems
+
+
+class CandidateSelection:
+    """Outcome of agenerate_data_cube_candidates: the chosen candidate and all of them."""
+
+    __slots__ = ("chosen", "candidates", "cached")
+
+    def __init__(self, chosen: CubeCandidate, candidates: List[CubeCandidate], cached: bool = False):
+        self.chosen = chosen
+        self.candidates = candidates
+        self.cached = cached
+
+    @property
+    def cube(self) -> DataCubeStructure:
+        return self.chosen.cube
+
+    @property
+    def valid_count(self) -> int:
+        return sum(1 for candidate in self.candidates if candidate.valid)
+
+
+async def agenerate_data_cube_candidates(
+    user_request: str,
+    data_source_info: Dict[str, Any],
+    available_tables: List[Dict[str, Any]],
+    candidates: int = 3,
+    estimate_cost: Optional[Callable[[str], Optional[float]]] = None,
+    schema_info: Optional[Dict[str, Any]] = None,
+    model_name: str = None,
+    cache: Optional[ResponseCache] = None,
+    prune_schema: bool = True,
+    schema_version: Optional[str] = None,
+    selection: Optional[SchemaSelection] = None,
+) -> CandidateSelection:
+    """
+    Generate up to GENERATE_CANDIDATES_MAX candidate cubes concurrently and pick the best.
+
+    The first candidate is generated at temperature 0 (the answer generate_data_cube would
+    give), the others at GENERATE_CANDIDATE_TEMPERATURE for variety. As each candidate
+    arrives its SQL is validated against the catalog (genai.sql_validation) and, when
+    `estimate_cost` is given (e.g. a BigQuery dry run returning bytes scanned; it runs in
+    a worker thread), costed; a failing estimate counts as a validation problem.
+
+    The cheapest valid candidate wins (ties and missing costs go to the lowest index).
+    When none is valid, the parseable candidate with the fewest problems is returned.
+    Only valid winners are cached. Raises like generate_data_cube when every candidate fails.
+    """
+    with span("genai.generate_candidates", candidates=candidates):
+        plan = await asyncio.to_thread(
+            _plan_generation,
+            user_request, data_source_info, available_tables, schema_info,
+            model_name, cache, prune_schema, schema_version, selection,
+        )
+        catalog = plan.prepared.catalog
+        if plan.cached is not None:
+            # Cache hits have already passed validate_sql (see _plan_generation)
+            candidate = CubeCandidate(0, plan.cached, [])
+            return CandidateSelection(candidate, [candidate], cached=True)
+
+        async def run(index: int) -> CubeCandidate:
+            temperature = 0.0 if index == 0 else GENERATE_CANDIDATE_TEMPERATURE
+            with span("genai.candidate", index=index, temperature=temperature) as candidate_span:
+                try:
+                    cube = await _acomplete(plan, temperature)
+                except LLMUnavailableError:
+                    raise
+                except ValueError as e:
+                    candidate_span.set_attribute("valid", False)
+                    return CubeCandidate(index, None, [str(e)])
+                with span("genai.validate_sql"):
+                    problems = validate_sql(cube.query, catalog)
+                cost = None
+                if not problems and estimate_cost is not None:
+                    try:
+                        cost = await asyncio.to_thread(estimate_cost, cube.query)
+                    except Exception as e:
+                        problems = [f"dry run failed: {e}"]
+                candidate_span.set_attributes(valid=not problems, cost=cost)
+                return CubeCandidate(index, cube, problems, cost)
+
+        count = max(1, min(candidates, GENERATE_CANDIDATES_MAX))
+        results = await asyncio.gather(*(run(index) for index in range(count)), return_exceptions=True)
+        generated = [result for result in results if isinstance(result, CubeCandidate)]
+        if not generated:
+            raise results[0]
+
+        valid = [c for c in generated if c.valid]
+        parsed = [c for c in generated if c.cube is not None]
+        if valid:
+            chosen = min(valid, key=lambda c: (c.cost is None, c.cost or 0, c.index))
+        elif parsed:
+            chosen = min(parsed, key=lambda c: (len(c.problems), c.index))
+        else:
+            raise ValueError(generated[0].problems[0])
+
+        if chosen.valid:
+            await asyncio.to_thread(plan.remember, chosen.cube)
+        return CandidateSelection(chosen, generated)
+
+
+def stream_data_cube(
+    user_request: str,
+    data_source_info: Dict[str, Any],
+    available_tables: List[Dict[str, Any]],
+    schema_info: Optional[Dict[str, Any]] = None,
+    model_name: str = None,
+    cache: Optional[ResponseCache] = None,
+    prune_schema: bool = True,
+    schema_version: Optional[str] = None,
+    selection: Optional[SchemaSelection] = None,
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of generate_data_cube (same arguments and caching).
+
+    Yields ("delta", text) for each chunk of model output as it arrives, then exactly one
+    ("result", DataCubeStructure) once the full output has been parsed and validated. A
+    cache hit yields only the result. If the streamed output fails validation, ("repair",
+    error message) is yielded before the (non-streamed) repair call; the streamed text
+    should then be discarded. Errors are raised like generate_data_cube.
+    """
+    plan = _plan_generation(
+        user_request, data_source_info, available_tables, schema_info,
+        model_name, cache, prune_schema, schema_version, selection,
     )
+    if plan.cached is not None:
+        yield "result", plan.cached
+        return
 
+    parts = []
     try:
-        content = vertex_generate_content(
-            prompt=prompt,
-            model=model_name,
+        for text in vertex_generate_content_stream(
+            prompt=plan.prompt,
+            model=plan.model_name,
             temperature=0.0,
-        )
+            response_schema=DATA_CUBE_RESPONSE_SCHEMA,
+        ):
+            parts.append(text)
+            yield "delta", text
     except Exception as e:
-        raise ValueError(
-            f"Failed to generate data cube structure: {str(e)}. "
-            "Please ensure your request is clear and the available tables/schemas are correct."
-        ) from e
+        raise _generation_error(e) from e
 
-    try:
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        json_str = json_match.group(0) if json_match else content
-        result = json.loads(json_str)
-    except json.JSONDecodeError:
-        try:
-            json_str = content.replace("'", '"')
-            result = json.loads(json_str)
-        except json.JSONDecodeError as e:
-            raise ValueError(
-                f"Failed to parse JSON from model output: {str(e)}. "
-                f"Model output: {content[:500] if content else 'N/A'}"
-            ) from e
-
-    if "cube_name" in result and "name" not in result:
-        result["name"] = result.pop("cube_name")
-    if "sql_query" in result and "query" not in result:
-        result["query"] = result.pop("sql_query")
-    if result.get("dimensions") and isinstance(result["dimensions"][0], dict):
-        result["dimensions"] = [d.get("name", str(d)) for d in result["dimensions"]]
-    if result.get("measures") and isinstance(result["measures"][0], dict):
-        result["measures"] = [m.get("name", str(m)) for m in result["measures"]]
-
-    return DataCubeStructure(**result)
+    content = "".join(parts)
+    cube, error = _try_parse(content)
+    if cube is None:
+        yield "repair", str(error)
+        content = _call_llm(repair_prompt(plan.prompt, content, error), plan.model_name)
+        cube, error = _try_parse(content)
+        if cube is None:
+            raise _parse_failure(content, error)
+        record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_REPAIRED)
+    else:
+        record_structured_output(STRUCTURED_OUTPUT_TASK, OUTCOME_FIRST_TRY)
+
+    plan.remember(cube)
+    yield "result", cube
 
 
 def create_data_cube_prompt_simple(
@@ -0,0 +1,185 @@
+"""
+Local fake of the Google Gen AI client, for tests, benchmarks and offline development.
+
+FakeGenAIClient exposes the subset of ``google.genai.Client`` the backend uses
+(``client.models`` and ``client.aio.models``: ``generate_content`` /
+``generate_content_stream``) and answers with a data cube built from the first table
+in the prompt, or with whatever a custom ``responder(prompt) -> str`` returns.
+Latency can be simulated per call and per streamed chunk, and ``error_rate`` makes a
+fraction of calls fail with a retryable FakeAPIError (HTTP 503 by default).
+Responses carry ``usage_metadata`` with ~4 characters per token counts (on the last
+chunk when streaming). Install it with ``genai.llm.set_vertex_client(FakeGenAIClient())``
+or by setting ``GENAI_FAKE_CLIENT=true``.
+"""
+import asyncio
+import contextlib
+import json
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+
+_TABLE_LINE = re.compile(r"^Table: (\S+)\s*$", re.MULTILINE)
+_COLUMN_LINE = re.compile(r"^    - ([^:\s]+): (\S+)", re.MULTILINE)
+_USER_REQUEST = re.compile(r"^User Request: (.*)$", re.MULTILINE)
+
+
+def default_responder(prompt: str) -> str:
+    """A plausible data cube over the first table of a data cube prompt"""
+    table_match = _TABLE_LINE.search(prompt)
+    table = table_match.group(1) if table_match else "fake_table"
+    next_table = _TABLE_LINE.search(prompt, table_match.end()) if table_match else None
+    section = prompt[table_match.end():next_table.start() if next_table else len(prompt)] if table_match else ""
+    columns = [name for name, _ in _COLUMN_LINE.findall(section)]
+    dimension = columns[1] if len(columns) > 1 else (columns[0] if columns else "id")
+
+    request_match = _USER_REQUEST.search(prompt)
+    request = request_match.group(1).strip() if request_match else "fake request"
+    return json.dumps({
+        "name": f"{table.split('.')[-1].title().replace('_', '')}By{dimension.title().replace('_', '')}",
+        "description": f"Generated for: {request}",
+        "query": f"SELECT {dimension}, COUNT(*) AS row_count FROM {table} GROUP BY {dimension}",
+        "dimensions": [dimension],
+        "measures": ["row_count"],
+        "metadata": {"generated_by": "fake"},
+    }, indent=2)
+
+
+class FakeAPIError(Exception):
+    """Stands in for google.genai.errors.APIError (carries the HTTP status as ``code``)"""
+
+    def __init__(self, code: int, message: str = "fake backend error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeUsageMetadata:
+    """Mimics GenerateContentResponseUsageMetadata"""
+
+    __slots__ = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+    def __init__(self, prompt: str, output: str):
+        self.prompt_token_count = (len(prompt) + 3) // 4
+        self.candidates_token_count = (len(output) + 3) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class FakeResponse:
+    """Mimics a GenerateContentResponse (``.text`` and ``.usage_metadata``)"""
+
+    __slots__ = ("text", "usage_metadata")
+
+    def __init__(self, text: str, usage_metadata: Optional[FakeUsageMetadata] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeModels:
+    """The ``client.models`` surface"""
+
+    def __init__(self, client: "FakeGenAIClient"):
+        self._client = client
+
+    def generate_content(self, model: str, contents, config=None) -> FakeResponse:
+        text = self._client._respond(model, contents)
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        return FakeResponse(text, FakeUsageMetadata(str(contents), text))
+
+    def generate_content_stream(self, model: str, contents, config=None) -> Iterator[FakeResponse]:
+        text = self._client._respond(model, contents)
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        chunks = self._client.chunks(text)
+        for i, chunk in enumerate(chunks):
+            if self._client.chunk_delay:
+                time.sleep(self._client.chunk_delay)
+            yield FakeResponse(chunk, FakeUsageMetadata(str(contents), text) if i == len(chunks) - 1 else None)
+
+
+class FakeAsyncModels:
+    """The ``client.aio.models`` surface"""
+
+    def __init__(self, client: "FakeGenAIClient"):
+        self._client = client
+
+    async def generate_content(self, model: str, contents, config=None) -> FakeResponse:
+        with self._client._tracking():
+            text = self._client._respond(model, contents)
+            if self._client.latency:
+                await asyncio.sleep(self._client.latency)
+            return FakeResponse(text, FakeUsageMetadata(str(contents), text))
+
+    async def generate_content_stream(self, model: str, contents, config=None) -> AsyncIterator[FakeResponse]:
+        text = self._client._respond(model, contents)
+
+        async def chunks():
+            with self._client._tracking():
+                if self._client.latency:
+                    await asyncio.sleep(self._client.latency)
+                chunks = self._client.chunks(text)
+                for i, chunk in enumerate(chunks):
+                    if self._client.chunk_delay:
+                        await asyncio.sleep(self._client.chunk_delay)
+                    yield FakeResponse(chunk, FakeUsageMetadata(str(contents), text) if i == len(chunks) - 1 else None)
+
+        return chunks()
+
+
+class FakeAio:
+    def __init__(self, client: "FakeGenAIClient"):
+        self.models = FakeAsyncModels(client)
+
+
+class FakeGenAIClient:
+    """Drop-in stand-in for ``google.genai.Client`` with configurable output and latency"""
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[str], str]] = None,
+        latency: float = 0.0,
+        chunk_size: int = 32,
+        chunk_delay: float = 0.0,
+        error_rate: float = 0.0,
+        error_code: int = 503,
+    ):
+        self.responder = responder or default_responder
+        # Seconds before the first byte (whole response for non-streaming calls)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        # Seconds between streamed chunks
+        self.chunk_delay = chunk_delay
+        # Fraction of calls that fail with FakeAPIError(error_code)
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.models = FakeModels(self)
+        self.aio = FakeAio(self)
+        self.calls: List[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def chunks(self, text: str) -> List[str]:
+        size = max(1, self.chunk_size)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _respond(self, model: str, contents) -> str:
+        prompt = contents if isinstance(contents, str) else str(contents)
+        with self._lock:
+            self.calls.append({"model": model, "prompt_chars": len(prompt)})
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeAPIError(self.error_code)
+        return self.responder(prompt)
+
+    @contextlib.contextmanager
+    def _tracking(self):
+        """Count concurrent calls (max_in_flight shows whether a concurrency limit held)"""
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
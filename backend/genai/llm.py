@@ -4,8 +4,11 @@ Uses the Google Vertex AI SDK (google-genai) for Gemini models—no LangChain.
 """
 import os
 import logging
+from typing import Iterator, Optional
 from dotenv import load_dotenv
 
+from .client import get_llm_client
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -13,6 +16,9 @@ logger = logging.getLogger(__name__)
 # Google Gen AI client for Vertex AI (lazy init)
 _vertex_client = None
 
+# Use the local fake client (genai.fakes) instead of Vertex AI, e.g. for load tests
+GENAI_FAKE_CLIENT = os.getenv("GENAI_FAKE_CLIENT", "").lower() in ("true", "1", "yes")
+
 
 def _ensure_vertex_env():
     """Set env vars required for Vertex AI if not already set."""
@@ -32,6 +38,11 @@ def get_vertex_client():
     global _vertex_client
     if _vertex_client is not None:
         return _vertex_client
+    if GENAI_FAKE_CLIENT:
+        from .fakes import FakeGenAIClient
+        _vertex_client = FakeGenAIClient()
+        logger.info("Using fake Gen AI client (GENAI_FAKE_CLIENT)")
+        return _vertex_client
     _ensure_vertex_env()
     project = os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("GCP_PROJECT")
     if not project:
@@ -60,10 +71,32 @@ def get_vertex_client():
     return _vertex_client
 
 
+def set_vertex_client(client):
+    """Replace the Gen AI client (e.g. with genai.fakes.FakeGenAIClient); None resets to lazy init."""
+    global _vertex_client
+    _vertex_client = client
+
+
+def _generation_config(temperature: float, response_schema: Optional[dict] = None):
+    try:
+        from google.genai.types import GenerateContentConfig
+    except ImportError:
+        return None
+    if response_schema is None:
+        return GenerateContentConfig(temperature=temperature)
+    # JSON mode: output is constrained to the schema (see genai.structured_output)
+    return GenerateContentConfig(
+        temperature=temperature,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+    )
+
+
 def generate_content(
     prompt: str,
     model: str = None,
     temperature: float = 0.0,
+    response_schema: Optional[dict] = None,
 ) -> str:
     """
     Generate text from Vertex AI Gemini model.
@@ -72,30 +105,61 @@ def generate_content(
         prompt: The full prompt (e.g. system + user message combined).
         model: Model name; defaults to GEMINI_MODEL_NAME or gemini-2.5-flash-lite.
         temperature: Sampling temperature (0.0 = deterministic).
+        response_schema: Gemini schema the output must conform to (enables JSON output mode).
 
     Returns:
         Response text from the model.
+
+    Calls go through the process-wide ResilientLLMClient (genai.client), which limits
+    concurrency, applies a timeout, retries 429/5xx and fails fast when the circuit is open.
     """
     if model is None:
         model = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash-lite")
-    client = get_vertex_client()
-    try:
-        from google.genai.types import GenerateContentConfig
-        config = GenerateContentConfig(temperature=temperature)
-    except ImportError:
-        config = None
-    response = client.models.generate_content(
-        model=model,
-        contents=prompt,
-        config=config,
-    )
+    return get_llm_client().generate_sync(prompt, model, _generation_config(temperature, response_schema))
+
+
+async def agenerate_content(
+    prompt: str,
+    model: str = None,
+    temperature: float = 0.0,
+    response_schema: Optional[dict] = None,
+) -> str:
+    """Async variant of generate_content (does not hold a thread while waiting)."""
+    if model is None:
+        model = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash-lite")
+    return await get_llm_client().generate(prompt, model, _generation_config(temperature, response_schema))
+
+
+def generate_content_stream(
+    prompt: str,
+    model: str = None,
+    temperature: float = 0.0,
+    response_schema: Optional[dict] = None,
+) -> Iterator[str]:
+    """
+    Stream text from Vertex AI Gemini model as it is generated.
+
+    Same arguments as generate_content; yields the text of each streamed chunk
+    (chunks without text are skipped).
+    """
+    if model is None:
+        model = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash-lite")
+    produced = False
+    for text in get_llm_client().stream_sync(prompt, model, _generation_config(temperature, response_schema)):
+        produced = True
+        yield text
+    if not produced:
+        raise ValueError("Vertex AI returned no text in response.")
+
+
+def _response_text(response) -> str:
+    """Text of a response (or streamed chunk), falling back to the candidate parts"""
     if hasattr(response, "text") and response.text:
         return response.text
-    # Fallback: extract text from candidates
     if getattr(response, "candidates", None):
         for c in response.candidates:
             if getattr(c, "content", None) and getattr(c.content, "parts", None):
                 for p in c.content.parts:
                     if getattr(p, "text", None):
                         return p.text
-    raise ValueError("Vertex AI returned no text in response.")
+    return ""
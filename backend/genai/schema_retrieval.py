@@ -0,0 +1,226 @@
+"""
+Schema retrieval for data cube generation.
+
+Large data sources do not fit in a prompt, so before building it we rank tables by
+lexical relevance (BM25 over table names, column names and descriptions) to the
+user's request, keep the top-K, add their join neighbours, and trim the result to a
+token budget. Small schemas that already fit the budget are passed through untouched.
+"""
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set
+
+SCHEMA_TOP_K = int(os.getenv("SCHEMA_TOP_K", "8"))
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", "12000"))
+
+# BM25 parameters
+_K1 = 1.5
+_B = 0.75
+# Table-name terms count this many times as much as column terms
+_TABLE_NAME_WEIGHT = 3
+
+_CAMEL_BOUNDARY = re.compile(r"([a-z0-9])([A-Z])")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "is", "of", "on", "or",
+    "per", "show", "the", "to", "with", "me", "my", "all", "each", "what", "which",
+    "cube", "data", "create", "build", "make", "want", "need", "please",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Split identifiers and prose into lowercase terms (snake_case, camelCase, plurals)"""
+    if not text:
+        return []
+    text = _CAMEL_BOUNDARY.sub(r"\1 \2", text).lower()
+    terms = []
+    for term in _NON_WORD.split(text):
+        if not term or term in _STOPWORDS:
+            continue
+        if len(term) > 4 and term.endswith("ies"):
+            term = term[:-3] + "y"
+        elif len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for schema text)"""
+    return (len(text) + 3) // 4
+
+
+class SchemaSelection:
+    """Tables chosen for a prompt and how much of the schema they cover"""
+
+    __slots__ = ("tables", "indexes", "total_tables", "estimated_tokens", "pruned")
+
+    def __init__(
+        self,
+        tables: List[Dict[str, Any]],
+        indexes: List[int],
+        total_tables: int,
+        estimated_tokens: int,
+        pruned: bool,
+    ):
+        self.tables = tables
+        # Positions of the chosen tables in the full schema
+        self.indexes = indexes
+        self.total_tables = total_tables
+        self.estimated_tokens = estimated_tokens
+        self.pruned = pruned
+
+    @property
+    def included_tables(self) -> int:
+        return len(self.tables)
+
+
+def table_terms(table: Dict[str, Any]) -> Counter:
+    """Term frequencies of one table (the BM25 document for it)"""
+    return Counter(_table_terms(table))
+
+
+def _table_terms(table: Dict[str, Any]) -> List[str]:
+    terms = tokenize(table.get("name", "")) * _TABLE_NAME_WEIGHT
+    terms += tokenize(table.get("description") or "")
+    for col in table.get("columns", []):
+        terms += tokenize(col.get("name", ""))
+        terms += tokenize(col.get("description") or "")
+    return terms
+
+
+def rank_tables(
+    user_request: str,
+    tables: List[Dict[str, Any]],
+    docs: Optional[List[Counter]] = None,
+) -> List[float]:
+    """BM25 score of every table against the request (same order as `tables`)"""
+    query_terms = set(tokenize(user_request))
+    if docs is None:
+        docs = [table_terms(table) for table in tables]
+    if not docs or not query_terms:
+        return [0.0] * len(tables)
+
+    lengths = [sum(doc.values()) for doc in docs]
+    avg_length = (sum(lengths) / len(lengths)) or 1.0
+    n_docs = len(docs)
+    doc_freq = {term: sum(1 for doc in docs if term in doc) for term in query_terms}
+
+    scores = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (_K1 + 1) / (tf + _K1 * (1 - _B + _B * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+def _key_columns(table: Dict[str, Any]) -> Set[str]:
+    """Column names that look like join keys"""
+    keys = set()
+    for col in table.get("columns", []):
+        name = (col.get("name") or "").lower()
+        if col.get("primary_key") or col.get("foreign_key") or name == "id" or name.endswith("_id"):
+            keys.add(name)
+    return keys
+
+
+def _referenced_tables(table: Dict[str, Any]) -> Set[str]:
+    """Table names this table points at, via declared foreign keys or <table>_id columns"""
+    refs = set()
+    for col in table.get("columns", []):
+        fk = col.get("foreign_key") or {}
+        target = fk.get("referencedTable") or fk.get("table")
+        if target:
+            refs.add(target.lower())
+        name = (col.get("name") or "").lower()
+        if name.endswith("_id") and len(name) > 3:
+            refs.add(name[:-3])
+    return refs
+
+
+def _singular(name: str) -> str:
+    terms = tokenize(name)
+    return "_".join(terms) if terms else name.lower()
+
+
+def join_index(tables: List[Dict[str, Any]]) -> tuple:
+    """(names, key columns, referenced names) per table, as used by join_neighbours"""
+    names = [_singular(t.get("name", "")) for t in tables]
+    keys = [_key_columns(t) - {"id"} for t in tables]
+    refs = [{_singular(r) for r in _referenced_tables(t)} for t in tables]
+    return names, keys, refs
+
+
+def join_neighbours(
+    selected: List[int],
+    tables: List[Dict[str, Any]],
+    index: Optional[tuple] = None,
+) -> List[int]:
+    """Indexes of tables joinable to any selected table (shared key column or reference)"""
+    selected_set = set(selected)
+    names, keys, refs = index if index is not None else join_index(tables)
+
+    neighbours = []
+    for idx in range(len(tables)):
+        if idx in selected_set:
+            continue
+        for sel in selected:
+            if (
+                keys[idx] & keys[sel]
+                or names[idx] in refs[sel]
+                or names[sel] in refs[idx]
+            ):
+                neighbours.append(idx)
+                break
+    return neighbours
+
+
+def select_relevant_tables(
+    user_request: str,
+    tables: List[Dict[str, Any]],
+    render_table: Optional[Callable[[Dict[str, Any]], str]] = None,
+    top_k: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    costs: Optional[List[int]] = None,
+    docs: Optional[List[Counter]] = None,
+    joins: Optional[tuple] = None,
+) -> SchemaSelection:
+    """
+    Choose which tables go into the prompt.
+
+    Tables are measured against the token budget with `costs` (tokens per table) when
+    given, otherwise by rendering each one with `render_table`. `docs` and `joins`
+    optionally hold precomputed table_terms() and join_index() results. Returned
+    tables keep their original order.
+    """
+    top_k = SCHEMA_TOP_K if top_k is None else top_k
+    token_budget = SCHEMA_TOKEN_BUDGET if token_budget is None else token_budget
+
+    if costs is None:
+        costs = [estimate_tokens(render_table(table)) for table in tables]
+    total_cost = sum(costs)
+    if total_cost <= token_budget:
+        return SchemaSelection(list(tables), list(range(len(tables))), len(tables), total_cost, pruned=False)
+
+    scores = rank_tables(user_request, tables, docs)
+    ranked = sorted(range(len(tables)), key=lambda i: (-scores[i], i))
+    seeds = [i for i in ranked[:top_k] if scores[i] > 0] or ranked[:top_k]
+    neighbours = sorted(join_neighbours(seeds, tables, joins), key=lambda i: (-scores[i], i))
+
+    chosen: List[int] = []
+    used = 0
+    for idx in seeds + neighbours:
+        if chosen and used + costs[idx] > token_budget:
+            continue
+        chosen.append(idx)
+        used += costs[idx]
+
+    chosen.sort()
+    return SchemaSelection([tables[i] for i in chosen], chosen, len(tables), used, pruned=True)
@@ -0,0 +1,277 @@
+"""
+Lightweight validation of generated SQL against a data source catalog.
+
+This is not a full SQL parser. It tokenizes the query and checks what commonly goes
+wrong in generated cube SQL:
+
+- the text is a single SELECT/WITH statement with balanced parentheses and closed
+  quotes/comments
+- every table after FROM/JOIN exists in the catalog (matched on the last name part,
+  so ``project.dataset.table``, ``dataset.table`` and ``table`` all resolve)
+- qualified column references (``alias.column``) exist in the aliased table
+- unqualified identifiers are known columns of the referenced tables, select aliases,
+  or SQL keywords/functions. This check is skipped when a query reads from subqueries
+  or CTEs, whose columns are not known from the catalog.
+
+Checks are deliberately conservative: when in doubt an identifier is accepted.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`[^`]*`)
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<param>@\w+|:\w+|\?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<dot>\.)
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<comma>,)
+  | (?P<semicolon>;)
+  | (?P<op><>|!=|>=|<=|\|\||::|[-+*/%<>=~&|^\[\]{}])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Words that are never column names in generated cube SQL (keywords, date parts, types)
+SQL_KEYWORDS = frozenset("""
+    all and any array as asc at between both by case cast collate cross cube current current_date
+    current_datetime current_time current_timestamp date datetime day dayofweek dayofyear desc
+    distinct else end escape except exclude exists extract false fetch filter first following for
+    from full group grouping groups having hour if ignore ilike in inner intersect interval into is
+    isoweek isoyear join lateral last left like limit microsecond millisecond minute month natural
+    not null nulls of offset on or order outer over partition preceding qualify quarter range
+    recursive replace respect right rollup row rows second select set some struct table tablesample
+    then to true unbounded union unnest using values week when where window with within year
+    int int64 integer bigint smallint numeric bignumeric decimal float float64 double real bool
+    boolean string varchar char text bytes timestamp time json signed unsigned
+    sunday monday tuesday wednesday thursday friday saturday
+""".split())
+
+_SOURCE_KEYWORDS = frozenset({"from", "join"})
+_FROM_FUNCTIONS = frozenset({"extract", "trim", "substring", "substr", "overlay", "position"})
+_ALIAS_STOPWORDS = SQL_KEYWORDS | {"on", "using", "where", "group", "order", "limit", "left", "right",
+                                   "inner", "outer", "full", "cross", "join", "union", "window", "qualify"}
+
+
+def _tokenize(sql: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """(kind, text) tokens without whitespace/comments, plus lexical problems"""
+    tokens, problems = [], []
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN.match(sql, pos)
+        if match is None:
+            char = sql[pos]
+            if char in "'\"`":
+                problems.append(f"unterminated quote {char} at position {pos}")
+            elif sql.startswith("/*", pos):
+                problems.append(f"unterminated comment at position {pos}")
+            else:
+                problems.append(f"unexpected character {char!r} at position {pos}")
+            break
+        kind = match.lastgroup
+        if kind not in ("ws", "line_comment", "block_comment"):
+            tokens.append((kind, match.group()))
+        pos = match.end()
+    return tokens, problems
+
+
+def _name(token_text: str) -> str:
+    return token_text.strip("`").lower()
+
+
+def _read_dotted(tokens: List[Tuple[str, str]], i: int) -> Tuple[List[str], int]:
+    """Read `a.b.c` (identifiers/quoted parts) starting at i; returns (parts, next index)"""
+    parts = []
+    while i < len(tokens) and tokens[i][0] in ("ident", "quoted"):
+        parts.extend(p for p in _name(tokens[i][1]).split(".") if p)
+        if i + 2 < len(tokens) and tokens[i + 1][0] == "dot" and tokens[i + 2][0] in ("ident", "quoted", "op"):
+            if tokens[i + 2][0] == "op":  # alias.*
+                parts.append("*")
+                return parts, i + 3
+            i += 2
+            continue
+        i += 1
+        break
+    return parts, i
+
+
+class SqlCatalog:
+    """Table and column names of a data source, for validate_sql"""
+
+    __slots__ = ("tables",)
+
+    def __init__(self, available_tables: List[Dict[str, Any]]):
+        # table name (lowercase) -> set of column names (lowercase)
+        self.tables: Dict[str, Set[str]] = {}
+        for table in available_tables:
+            columns = {str(col.get("name", "")).lower() for col in table.get("columns", [])}
+            self.tables.setdefault(str(table.get("name", "")).lower(), set()).update(columns)
+
+
+def validate_sql(sql: str, catalog: SqlCatalog) -> List[str]:
+    """Problems found in `sql` (an empty list means it looks valid)"""
+    if not sql or not sql.strip():
+        return ["query is empty"]
+    tokens, problems = _tokenize(sql)
+    if problems:
+        return problems
+
+    while tokens and tokens[-1][0] == "semicolon":
+        tokens.pop()
+    if not tokens:
+        return ["query is empty"]
+    if any(kind == "semicolon" for kind, _ in tokens):
+        problems.append("query contains more than one statement")
+    first = tokens[0][1].lower() if tokens[0][0] == "ident" else ""
+    if first not in ("select", "with"):
+        problems.append("query must start with SELECT or WITH")
+
+    depth = 0
+    for kind, _ in tokens:
+        depth += kind == "lparen"
+        depth -= kind == "rparen"
+        if depth < 0:
+            problems.append("unbalanced parentheses")
+            break
+    if depth > 0:
+        problems.append("unbalanced parentheses")
+    if problems:
+        return problems
+
+    # CTE names and explicit aliases (AS x), which may be referenced like tables/columns
+    derived: Set[str] = set()
+    select_aliases: Set[str] = set()
+    for i, (kind, text) in enumerate(tokens):
+        if kind != "ident" or text.lower() != "as" or i + 1 >= len(tokens):
+            continue
+        if tokens[i + 1][0] == "lparen" and i and tokens[i - 1][0] in ("ident", "quoted"):
+            derived.add(_name(tokens[i - 1][1]))  # WITH name AS ( ... )
+        elif tokens[i + 1][0] in ("ident", "quoted"):
+            select_aliases.add(_name(tokens[i + 1][1]))
+    # Implicit aliases: `SUM(x) total,` / `amount total FROM`
+    for i in range(1, len(tokens) - 1):
+        kind, text = tokens[i]
+        prev_kind, prev_text = tokens[i - 1]
+        next_kind, next_text = tokens[i + 1]
+        if (
+            kind in ("ident", "quoted")
+            and _name(text) not in SQL_KEYWORDS
+            and (prev_kind in ("rparen", "number", "string", "quoted")
+                 or prev_kind == "ident" and prev_text.lower() not in SQL_KEYWORDS)
+            and (next_kind == "comma" or next_kind == "ident" and next_text.lower() == "from")
+        ):
+            select_aliases.add(_name(text))
+
+    # Sources: FROM/JOIN <table or (subquery)> [AS] [alias] [, <source> ...]
+    aliases: Dict[str, Optional[str]] = {}  # alias/table -> catalog table (None = derived/unknown columns)
+    opaque_sources = False
+    source_tokens: Set[int] = set()
+    calls: List[Optional[str]] = []  # function name per open parenthesis
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == "lparen":
+            calls.append(tokens[i - 1][1].lower() if i and tokens[i - 1][0] == "ident" else None)
+        elif kind == "rparen":
+            calls.pop()
+        is_source = (
+            kind == "ident"
+            and text.lower() in _SOURCE_KEYWORDS
+            # EXTRACT(part FROM x), TRIM(... FROM x), SUBSTRING(x FROM n) are not sources
+            and not (calls and calls[-1] in _FROM_FUNCTIONS)
+        )
+        if not is_source:
+            i += 1
+            continue
+        j = i + 1
+        while j < len(tokens):
+            if tokens[j][0] == "lparen":
+                # Derived table: its columns are whatever the subquery selects
+                opaque_sources = True
+                table = None
+                i = j  # the subquery itself is scanned by the outer loop
+                break
+            if tokens[j][0] == "ident" and tokens[j][1].lower() == "unnest":
+                opaque_sources = True
+                i = j
+                break
+            start_j = j
+            parts, j = _read_dotted(tokens, j)
+            if not parts:
+                i = j
+                break
+            source_tokens.update(range(start_j, j))
+            table_name = parts[-1]
+            if table_name in derived:
+                opaque_sources = True
+                table = None
+            elif table_name in catalog.tables:
+                table = table_name
+            else:
+                problems.append(f"unknown table {'.'.join(parts)}")
+                opaque_sources = True
+                table = None
+            aliases[table_name] = table
+            if j < len(tokens) and tokens[j][0] == "ident" and tokens[j][1].lower() == "as":
+                j += 1
+            if j < len(tokens) and tokens[j][0] in ("ident", "quoted") and _name(tokens[j][1]) not in _ALIAS_STOPWORDS:
+                alias = _name(tokens[j][1])
+                aliases[alias] = table
+                select_aliases.discard(alias)
+                source_tokens.add(j)
+                j += 1
+            # Comma join: FROM a, b
+            if j + 1 < len(tokens) and tokens[j][0] == "comma" and tokens[j + 1][0] in ("ident", "quoted") \
+                    and tokens[j + 1][1].lower() not in SQL_KEYWORDS:
+                j += 1
+                continue
+            i = j
+            break
+        else:
+            i = j
+
+    known_columns: Set[str] = set()
+    for table in aliases.values():
+        if table is not None:
+            known_columns |= catalog.tables[table]
+    check_unqualified = bool(aliases) and not opaque_sources
+
+    # Column references
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind not in ("ident", "quoted") or i in source_tokens:
+            i += 1
+            continue
+        if i and tokens[i - 1][0] == "ident" and tokens[i - 1][1].lower() == "as":
+            i += 1  # alias definition
+            continue
+        parts, next_i = _read_dotted(tokens, i)
+        if not parts or (next_i < len(tokens) and tokens[next_i][0] == "lparen"):
+            i = max(next_i, i + 1)  # function call
+            continue
+        if len(parts) >= 2:
+            qualifier, column = parts[-2], parts[-1]
+            table = aliases.get(qualifier)
+            if table is not None and column != "*" and column not in catalog.tables[table]:
+                problems.append(f"unknown column {qualifier}.{column}")
+        elif check_unqualified:
+            name = parts[0]
+            if not (
+                name in SQL_KEYWORDS
+                or name in known_columns
+                or name in select_aliases
+                or name in aliases
+                or name in derived
+            ):
+                problems.append(f"unknown column {name}")
+        i = next_i
+
+    # Report each problem once, in order of appearance
+    return list(dict.fromkeys(problems))
@@ -0,0 +1,139 @@
+"""
+Schema-constrained (JSON mode) model output.
+
+response_schema_for() turns a pydantic model into the OpenAPI-subset schema Gemini
+accepts as ``response_schema``, so the model can only emit JSON of that shape and the
+result can be validated with ``Model.model_validate_json`` instead of being scraped
+out of free text. Free-form object fields (e.g. ``Dict[str, Any]``) have no Gemini
+equivalent and are left out of the constrained schema; they stay optional on the model.
+
+Parse outcomes are counted per task (first try / repaired / failed) so failure and
+repair rates can be monitored (structured_output_stats).
+"""
+import threading
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+_JSON_TO_GEMINI_TYPES = {
+    "string": "STRING",
+    "integer": "INTEGER",
+    "number": "NUMBER",
+    "boolean": "BOOLEAN",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+OUTCOME_FIRST_TRY = "first_try"
+OUTCOME_REPAIRED = "repaired"
+OUTCOME_FAILED = "failed"
+
+REPAIR_PROMPT_OUTPUT_CHARS = 4000
+
+
+def _convert(schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Convert one JSON-schema node; None when it cannot be expressed for Gemini"""
+    nullable = False
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        nullable = len(options) < len(schema["anyOf"])
+        if len(options) != 1:
+            return None
+        merged = dict(options[0])
+        if "description" in schema:
+            merged.setdefault("description", schema["description"])
+        schema = merged
+
+    gemini_type = _JSON_TO_GEMINI_TYPES.get(schema.get("type"))
+    if gemini_type is None:
+        return None
+
+    converted: Dict[str, Any] = {"type": gemini_type}
+    if schema.get("description"):
+        converted["description"] = schema["description"]
+    if schema.get("enum"):
+        converted["enum"] = [str(value) for value in schema["enum"]]
+    if nullable:
+        converted["nullable"] = True
+
+    if gemini_type == "ARRAY":
+        items = _convert(schema.get("items", {}))
+        if items is None:
+            return None
+        converted["items"] = items
+    elif gemini_type == "OBJECT":
+        properties = {}
+        for name, prop in (schema.get("properties") or {}).items():
+            prop_schema = _convert(prop)
+            if prop_schema is not None:
+                properties[name] = prop_schema
+        if not properties:
+            return None
+        converted["properties"] = properties
+        converted["required"] = [name for name in schema.get("required", []) if name in properties]
+        converted["property_ordering"] = list(properties)
+    return converted
+
+
+def response_schema_for(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Gemini ``response_schema`` for a pydantic model (flat models; $refs are not followed)"""
+    schema = _convert(model.model_json_schema())
+    if schema is None:
+        raise ValueError(f"{model.__name__} cannot be expressed as a Gemini response schema")
+    return schema
+
+
+def repair_prompt(prompt: str, output: str, error: Exception) -> str:
+    """Prompt for the single repair attempt after output failed validation"""
+    return (
+        f"{prompt}\n\n"
+        "Your previous response did not match the required JSON schema.\n"
+        f"Validation error: {error}\n"
+        f"Previous response:\n{output[:REPAIR_PROMPT_OUTPUT_CHARS]}\n\n"
+        "Return only the corrected JSON object."
+    )
+
+
+class StructuredOutputStats:
+    """Thread-safe per-task counters of parse outcomes"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, task: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(task, {OUTCOME_FIRST_TRY: 0, OUTCOME_REPAIRED: 0, OUTCOME_FAILED: 0})
+            counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            counts = {task: dict(values) for task, values in self._counts.items()}
+        result = {}
+        for task, values in counts.items():
+            total = sum(values.values())
+            needed_repair = values[OUTCOME_REPAIRED] + values[OUTCOME_FAILED]
+            result[task] = {
+                **values,
+                "total": total,
+                # Share of generations that needed the repair call (i.e. an extra LLM round trip)
+                "repair_rate": round(needed_repair / total, 4) if total else 0.0,
+                "failure_rate": round(values[OUTCOME_FAILED] / total, 4) if total else 0.0,
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+_stats = StructuredOutputStats()
+
+
+def record_structured_output(task: str, outcome: str):
+    _stats.record(task, outcome)
+
+
+def structured_output_stats() -> Dict[str, Dict[str, Any]]:
+    """Parse outcome counts and rates per task"""
+    return _stats.snapshot()
@@ -0,0 +1,302 @@
+"""
+Lightweight tracing: nested spans for the phases of a request, exported locally.
+
+``with span("name", key=value) as s:`` opens a span that is the child of the span
+current in this context (contextvars, so it follows requests into the threadpool,
+asyncio tasks and the LLM client loop). Spans carry a 32-hex trace id shared by the whole
+tree, a 16-hex span id, attributes, duration and error; each is handed to the configured
+exporters when it ends:
+
+- TRACING_EXPORTER=console (default none): one line per span on stderr
+- TRACING_EXPORTER=jsonl: one JSON object per span appended to TRACING_FILE
+  (default traces.jsonl)
+- several, comma separated (``console,jsonl``)
+
+TraceContextFilter adds ``trace_id`` and ``span_id`` to log records so log lines can be
+joined with their spans. Trace ids are kept even when no exporter is configured.
+
+Code that cannot keep a span current across its whole lifetime (generators resumed in
+other tasks or threads) uses start_span()/Span.end() instead, which parents the span
+without making it current.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+
+# Longest string attribute kept on a span (e.g. SQL statements)
+MAX_ATTRIBUTE_LENGTH = 500
+
+
+def _new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def _new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+class Span:
+    """One timed phase of a trace"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_time",
+                 "duration", "error", "_started")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = {}
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+        if attributes:
+            self.set_attributes(**attributes)
+
+    def set_attribute(self, key: str, value: Any):
+        if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_LENGTH:
+            value = value[:MAX_ATTRIBUTE_LENGTH] + "..."
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"[:MAX_ATTRIBUTE_LENGTH]
+
+    def end(self):
+        """Finish the span and export it (only the first call counts)"""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        _export(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current_span.get()
+    return active.trace_id if active is not None else None
+
+
+def start_span(name: str, parent: Optional[Span] = None, trace_id: Optional[str] = None,
+               parent_id: Optional[str] = None, **attributes: Any) -> Span:
+    """
+    Start a span without making it current; call end() when done.
+
+    The parent defaults to the current span. `trace_id`/`parent_id` continue a trace
+    started elsewhere (e.g. from an incoming traceparent header).
+    """
+    if parent is None:
+        parent = _current_span.get()
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+    return Span(name, trace_id or _new_trace_id(), parent_id, attributes)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Child span of the current one, current for the duration of the block; errors are recorded and re-raised"""
+    active = start_span(name, **attributes)
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        active.end()
+
+
+@contextlib.contextmanager
+def use_span(active: Span) -> Iterator[Span]:
+    """Make an already started span current for the block (does not end it)"""
+    token = _current_span.set(active)
+    try:
+        yield active
+    finally:
+        _current_span.reset(token)
+
+
+# -- W3C trace context ------------------------------------------------------------
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace id, parent span id) from a W3C ``traceparent`` header, or None if invalid"""
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, parent_id = parts[1], parts[2]
+    try:
+        int(trace_id, 16)
+        int(parent_id, 16)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id
+
+
+def format_traceparent(active: Span) -> str:
+    return f"00-{active.trace_id}-{active.span_id}-01"
+
+
+# -- exporters ----------------------------------------------------------------------
+
+
+class SpanExporter:
+    def export(self, finished: Span):
+        raise NotImplementedError
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """One human-readable line per span"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        attributes = " ".join(f"{key}={value}" for key, value in finished.attributes.items())
+        line = (
+            f"[span] trace={finished.trace_id} span={finished.span_id} parent={finished.parent_id or '-'} "
+            f"{finished.name} {(finished.duration or 0.0) * 1000:.1f}ms"
+            f"{' ' + attributes if attributes else ''}"
+            f"{' error=' + finished.error if finished.error else ''}\n"
+        )
+        stream = self._stream or sys.stderr
+        with self._lock:
+            stream.write(line)
+            stream.flush()
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a file (JSON Lines)"""
+
+    def __init__(self, path: str = TRACING_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+
+    def export(self, finished: Span):
+        line = json.dumps(finished.as_dict(), default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in a list (benchmarks and debugging)"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        with self._lock:
+            self.spans.append(finished)
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+_exporters: List[SpanExporter] = []
+
+
+def _export(finished: Span):
+    for exporter in list(_exporters):
+        try:
+            exporter.export(finished)
+        except Exception as e:
+            logger.warning("Span export failed", extra={"exporter": type(exporter).__name__, "error": str(e)})
+
+
+def _exporters_from_env(names: str) -> List[SpanExporter]:
+    exporters: List[SpanExporter] = []
+    for name in (part.strip() for part in names.split(",")):
+        if name in ("", "none"):
+            continue
+        if name == "console":
+            exporters.append(ConsoleSpanExporter())
+        elif name in ("jsonl", "json", "file"):
+            exporters.append(JsonFileSpanExporter(TRACING_FILE))
+        else:
+            logger.warning("Ignoring unknown TRACING_EXPORTER", extra={"exporter": name})
+    return exporters
+
+
+def configure_tracing(exporters: Optional[List[SpanExporter]] = None):
+    """Replace the span exporters (default: from TRACING_EXPORTER)"""
+    global _exporters
+    _exporters = list(exporters) if exporters is not None else _exporters_from_env(TRACING_EXPORTER)
+
+
+def tracing_enabled() -> bool:
+    return bool(_exporters)
+
+
+configure_tracing()
+
+
+# -- logging ------------------------------------------------------------------------
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds ``trace_id`` and ``span_id`` ("-" outside a trace) to every log record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        active = _current_span.get()
+        record.trace_id = active.trace_id if active is not None else "-"
+        record.span_id = active.span_id if active is not None else "-"
+        return True
+
+
+def install_log_trace_context(target: Optional[logging.Logger] = None):
+    """Attach TraceContextFilter to the handlers of a logger (default: root)"""
+    target = target or logging.getLogger()
+    for handler in target.handlers:
+        if not any(isinstance(existing, TraceContextFilter) for existing in handler.filters):
+            handler.addFilter(TraceContextFilter())
@@ -0,0 +1,349 @@
+"""
+Per-call LLM usage accounting: tokens, cost, latency, retries and cache hits.
+
+Every call made through ResilientLLMClient is recorded once it finishes, and every
+response-cache hit that saved a call is recorded too. Records are attributed to the
+LLMCallContext current when the call starts (endpoint, data source, user; set by the
+API layer with set_llm_call_context) and aggregated in memory per
+(endpoint, data source, user, model) series, which llm_usage_summary() rolls up by any
+subset of those dimensions.
+
+Token counts come from the response ``usage_metadata`` (prompt, candidates and thoughts
+tokens). Responses without usage metadata are counted with a ~4 characters per token
+estimate and flagged as estimated. Cost uses per-million-token prices per model
+(LLM_PRICING_JSON overrides/extends the built-in table, e.g.
+``{"gemini-2.5-flash": [0.30, 2.50]}`` for input and output USD per 1M tokens).
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M (input, output) tokens; matched on the longest model name prefix
+DEFAULT_LLM_PRICING: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.15, 0.60),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+LLM_USAGE_MAX_SERIES = int(os.getenv("LLM_USAGE_MAX_SERIES", "5000"))
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+GROUP_BY_FIELDS = ("endpoint", "data_source_id", "user_id", "model")
+OVERFLOW_LABEL = "_other"
+
+OUTCOME_SUCCEEDED = "succeeded"
+OUTCOME_FAILED = "failed"
+OUTCOME_CACHE_HIT = "cache_hit"
+
+
+def _load_pricing() -> Dict[str, Tuple[float, float]]:
+    pricing = dict(DEFAULT_LLM_PRICING)
+    raw = os.getenv("LLM_PRICING_JSON")
+    if raw:
+        try:
+            for model, prices in json.loads(raw).items():
+                pricing[model] = (float(prices[0]), float(prices[1]))
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            logger.warning("Ignoring invalid LLM_PRICING_JSON", extra={"error": str(e)})
+    return pricing
+
+
+LLM_PRICING = _load_pricing()
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    """(input, output) USD per 1M tokens for a model, or None when unknown"""
+    name = model.rsplit("/", 1)[-1]
+    matches = [prefix for prefix in LLM_PRICING if name.startswith(prefix)]
+    return LLM_PRICING[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    """USD cost of a call (0.0 for models without a price)"""
+    price = model_price(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+# -- attribution ------------------------------------------------------------------
+
+
+class LLMCallContext:
+    """Who/what an LLM call is made for; fields may be filled in after it is set"""
+
+    __slots__ = ("endpoint", "data_source_id", "user_id")
+
+    def __init__(self, endpoint: Optional[str] = None, data_source_id: Optional[str] = None, user_id: Optional[str] = None):
+        self.endpoint = endpoint
+        self.data_source_id = data_source_id
+        self.user_id = user_id
+
+
+_call_context: contextvars.ContextVar[Optional[LLMCallContext]] = contextvars.ContextVar("llm_call_context", default=None)
+
+
+def set_llm_call_context(
+    endpoint: Optional[str] = None,
+    data_source_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> LLMCallContext:
+    """Attribute LLM calls made from the current context (request) to these labels"""
+    context = LLMCallContext(endpoint, data_source_id, user_id)
+    _call_context.set(context)
+    return context
+
+
+def current_llm_call_context() -> Optional[LLMCallContext]:
+    return _call_context.get()
+
+
+# -- per-call records -------------------------------------------------------------
+
+
+class LLMUsage:
+    """Token usage of one call, filled in by the transport from response usage metadata"""
+
+    __slots__ = ("prompt_tokens", "output_tokens", "reported")
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.reported = False
+
+    def update(self, response: Any):
+        """Take usage from a response or streamed chunk (counts are cumulative, so keep the max)"""
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is None:
+            return
+        prompt = getattr(metadata, "prompt_token_count", None) or 0
+        output = (getattr(metadata, "candidates_token_count", None) or 0) + \
+            (getattr(metadata, "thoughts_token_count", None) or 0)
+        if prompt or output:
+            self.reported = True
+            self.prompt_tokens = max(self.prompt_tokens, prompt)
+            self.output_tokens = max(self.output_tokens, output)
+
+
+def _estimate_tokens(chars: int) -> int:
+    return (chars + 3) // 4
+
+
+class _Series:
+    __slots__ = ("calls", "failed", "cache_hits", "retries", "prompt_tokens", "output_tokens",
+                 "estimated_calls", "cost_usd", "latency_sum", "latency_max", "latency_buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.failed = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.estimated_calls = 0
+        self.cost_usd = 0.0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, other: "_Series"):
+        for name in self.__slots__:
+            if name == "latency_max":
+                self.latency_max = max(self.latency_max, other.latency_max)
+            elif name == "latency_buckets":
+                self.latency_buckets = [a + b for a, b in zip(self.latency_buckets, other.latency_buckets)]
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self) -> Dict[str, Any]:
+        llm_calls = self.calls - self.cache_hits
+        return {
+            "calls": self.calls,
+            "llm_calls": llm_calls,
+            "failed": self.failed,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "estimated_token_calls": self.estimated_calls,
+            "cost_usd": round(self.cost_usd, 6),
+            "avg_prompt_tokens": round(self.prompt_tokens / llm_calls, 1) if llm_calls else 0.0,
+            "avg_latency_ms": round(self.latency_sum / llm_calls * 1000, 1) if llm_calls else 0.0,
+            "max_latency_ms": round(self.latency_max * 1000, 1),
+        }
+
+
+class LLMUsageStats:
+    """Thread-safe usage aggregates per (endpoint, data source, user, model) series"""
+
+    def __init__(self, max_series: int = LLM_USAGE_MAX_SERIES):
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, str, str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def _series_for(self, context: Optional[LLMCallContext], model: str) -> _Series:
+        key = (
+            (context.endpoint if context else None) or "unknown",
+            (context.data_source_id if context else None) or "unknown",
+            (context.user_id if context else None) or "unknown",
+            model,
+        )
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                # Bound memory: new users beyond the limit share one series per endpoint/source/model
+                key = key[:2] + (OVERFLOW_LABEL,) + key[3:]
+                series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+        return series
+
+    def record(
+        self,
+        context: Optional[LLMCallContext],
+        model: str,
+        outcome: str,
+        latency: float = 0.0,
+        prompt_tokens: int = 0,
+        output_tokens: int = 0,
+        retries: int = 0,
+        estimated: bool = False,
+    ) -> float:
+        """Add one call (or cache hit); returns its cost in USD"""
+        cost = estimate_cost(model, prompt_tokens, output_tokens)
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            series = self._series_for(context, model)
+            series.calls += 1
+            series.failed += outcome == OUTCOME_FAILED
+            series.cache_hits += outcome == OUTCOME_CACHE_HIT
+            series.retries += retries
+            series.prompt_tokens += prompt_tokens
+            series.output_tokens += output_tokens
+            series.estimated_calls += estimated
+            series.cost_usd += cost
+            if outcome != OUTCOME_CACHE_HIT:
+                series.latency_sum += latency
+                series.latency_max = max(series.latency_max, latency)
+                series.latency_buckets[bucket] += 1
+        return cost
+
+    def series(self) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """(labels, raw counters incl. latency buckets) per series, e.g. for metric exporters"""
+        with self._lock:
+            items = [(key, _copy(series)) for key, series in self._series.items()]
+        return [
+            (dict(zip(GROUP_BY_FIELDS, key)), {
+                **series.as_dict(),
+                "latency_seconds_sum": series.latency_sum,
+                "latency_buckets": list(zip(LATENCY_BUCKETS + (float("inf"),), _cumulative(series.latency_buckets))),
+            })
+            for key, series in items
+        ]
+
+    def summary(self, group_by: Iterable[str] = ("endpoint",), limit: Optional[int] = None) -> Dict[str, Any]:
+        """Totals plus usage rolled up by `group_by` fields, most expensive first"""
+        group_by = [field for field in GROUP_BY_FIELDS if field in set(group_by)]
+        totals = _Series()
+        groups: Dict[Tuple[str, ...], _Series] = {}
+        with self._lock:
+            for key, series in self._series.items():
+                labels = dict(zip(GROUP_BY_FIELDS, key))
+                totals.add(series)
+                groups.setdefault(tuple(labels[field] for field in group_by), _Series()).add(series)
+        ranked = sorted(groups.items(), key=lambda item: (item[1].cost_usd, item[1].prompt_tokens), reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return {
+            "group_by": group_by,
+            "totals": totals.as_dict(),
+            "groups": [{**dict(zip(group_by, key)), **series.as_dict()} for key, series in ranked],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _copy(series: _Series) -> _Series:
+    copy = _Series()
+    copy.add(series)
+    return copy
+
+
+def _cumulative(counts: List[int]) -> List[int]:
+    total, result = 0, []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+_stats = LLMUsageStats()
+
+
+def get_llm_usage_stats() -> LLMUsageStats:
+    """Process-wide LLM usage aggregates"""
+    return _stats
+
+
+def record_llm_call(
+    model: str,
+    prompt_chars: int,
+    output_chars: int,
+    usage: Optional[LLMUsage],
+    started: float,
+    attempts: int,
+    failed: bool,
+    context: Optional[LLMCallContext] = None,
+):
+    """Record a finished client call (`started` from time.perf_counter())"""
+    latency = time.perf_counter() - started
+    estimated = usage is None or not usage.reported
+    if estimated and failed:
+        prompt_tokens = output_tokens = 0  # calls that never got a response are not billed
+    elif estimated:
+        prompt_tokens, output_tokens = _estimate_tokens(prompt_chars), _estimate_tokens(output_chars)
+    else:
+        prompt_tokens, output_tokens = usage.prompt_tokens, usage.output_tokens
+    context = context if context is not None else current_llm_call_context()
+    retries = max(0, attempts - 1)
+    cost = _stats.record(
+        context, model, OUTCOME_FAILED if failed else OUTCOME_SUCCEEDED,
+        latency=latency,
+        prompt_tokens=prompt_tokens,
+        output_tokens=output_tokens,
+        retries=retries,
+        estimated=estimated,
+    )
+    logger.info("LLM call", extra={
+        "model": model,
+        "endpoint": context.endpoint if context else None,
+        "data_source_id": context.data_source_id if context else None,
+        "user_id": context.user_id if context else None,
+        "outcome": OUTCOME_FAILED if failed else OUTCOME_SUCCEEDED,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "tokens_estimated": estimated,
+        "retries": retries,
+        "latency_ms": round(latency * 1000, 1),
+        "cost_usd": round(cost, 6),
+    })
+
+
+def record_llm_cache_hit(model: str):
+    """Record a generation served from the response cache (no LLM call was made)"""
+    _stats.record(current_llm_call_context(), model, OUTCOME_CACHE_HIT)
+
+
+def llm_usage_summary(group_by: Iterable[str] = ("endpoint",), limit: Optional[int] = None) -> Dict[str, Any]:
+    return _stats.summary(group_by, limit)